@@ -52,6 +52,23 @@ def create_app(config_name='default'):
     mail.init_app(app)
     login_manager.login_view = 'auth.login'
     
+    from app.services.analytics_cache import analytics_cache
+    analytics_cache.init_app(app)
+    from app.services.analytics_charts import chart_renderer
+    chart_renderer.init_app(app)
+    from app.services.analytics_warmer import analytics_warmer
+    analytics_warmer.init_app(app)
+    from app.services.request_metrics import request_metrics
+    request_metrics.init_app(app)
+    from app.services.query_guard import query_guard
+    query_guard.init_app(app)
+    from app.services.import_jobs import import_job_runner
+    import_job_runner.init_app(app)
+    from app.services.import_staging import import_staging
+    import_staging.init_app(app)
+    from app.services.progress_events import progress_events
+    progress_events.init_app(app)
+    
     # Register blueprints
     from app.routes.auth import auth_bp
     from app.routes.dashboard import dashboard_bp
@@ -1,4 +1,5 @@
 import click
+import time
 from flask.cli import with_appcontext
 from app import db
 from app.utils.db_init import initialize_database
@@ -328,6 +329,142 @@ Your company's data is completely isolated from other companies and only accessi
         db.session.commit()
         click.echo(f'Successfully created {created_count} FAQs.')
 
+    @app.cli.command('rebuild-rollups')
+    @click.option('--company-id', type=int, default=None, help='Only rebuild this company.')
+    @with_appcontext
+    def rebuild_rollups(company_id):
+        """Backfill the sales_daily_rollup table from the sales table."""
+        from app.services.sales_rollup import SalesRollupService
+        
+        target = f'company {company_id}' if company_id else 'all companies'
+        click.echo(f'Rebuilding daily sales rollups for {target}...')
+        
+        try:
+            row_count = SalesRollupService.rebuild(company_id)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            click.echo(f'Error rebuilding rollups: {str(e)}')
+            return
+        
+        click.echo(f'Wrote {row_count} rollup rows.')
+
+    @app.cli.command('refresh-snapshots')
+    @click.option('--company-id', type=int, default=None, help='Only refresh this company.')
+    @click.option('--active-days', type=int, default=None,
+                  help='Refresh companies active in this many days (default ANALYTICS_WARM_ACTIVE_DAYS).')
+    @with_appcontext
+    def refresh_snapshots(company_id, active_days):
+        """Bring the on-disk sales snapshots of recently active companies up to date.
+
+        Snapshots are shared by every process on the host, so the first
+        analytics load after a quiet period only merges the latest changes.
+        This does not fill the analytics cache, which lives in each web
+        worker; set ANALYTICS_WARM_INTERVAL for the workers to warm it.
+        """
+        from app.services.analytics_warmer import analytics_warmer, recently_active_companies
+        from app.services.sales_snapshot import sales_snapshot_for
+        
+        if company_id:
+            company_ids = [company_id]
+        else:
+            company_ids = recently_active_companies(active_days or analytics_warmer.active_days)
+        click.echo(f'Refreshing sales snapshots for {len(company_ids)} companies...')
+        
+        for cid in company_ids:
+            started = time.perf_counter()
+            try:
+                snapshot = sales_snapshot_for(cid)
+                if snapshot is None:
+                    click.echo(f'Company {cid}: no snapshot (fewer than ANALYTICS_SNAPSHOT_MIN_ROWS sales)')
+                    continue
+                meta = snapshot.refresh()
+            except Exception as e:
+                click.echo(f'Error refreshing company {cid}: {str(e)}')
+                continue
+            finally:
+                db.session.rollback()
+            click.echo(f'Company {cid}: {meta["rows"]} sales in {len(meta["parts"])} parts, '
+                       f'refreshed in {time.perf_counter() - started:.2f}s')
+
+    @app.cli.command('seed-sales')
+    @click.option('--companies', type=int, default=1, show_default=True, help='Companies to create.')
+    @click.option('--stores', type=int, default=3, show_default=True, help='Stores per company.')
+    @click.option('--products', type=int, default=40, show_default=True, help='Products per company.')
+    @click.option('--sales', type=int, default=100000, show_default=True, help='Sales per company.')
+    @click.option('--days', type=int, default=730, show_default=True, help='Spread sales over this many days.')
+    @click.option('--profile', 'profile_path', default=None,
+                  help='CSV in the import format to copy the shape of (default newfile.csv).')
+    @click.option('--seed', type=int, default=None, help='Random seed for a reproducible run.')
+    @click.option('--batch-size', type=int, default=10000, show_default=True, help='Sales per insert batch.')
+    @click.option('--prefix', default='Seed', show_default=True, help='Company name prefix.')
+    @with_appcontext
+    def seed_sales(companies, stores, products, sales, days, profile_path, seed, batch_size, prefix):
+        """Generate synthetic companies, catalogs and sales for load testing.
+
+        Catalogs, embellishments, payment mixes and weekday patterns follow
+        the profile CSV. Every company's admin can log in as
+        <company-name-slug>@example.com with the password "seed-password".
+        """
+        import os
+        from app.services.sales_seeder import DEFAULT_PROFILE_CSV, SEED_PASSWORD, SalesSeeder, load_profile
+        
+        if profile_path is None:
+            profile_path = os.path.join(os.path.dirname(app.root_path), DEFAULT_PROFILE_CSV)
+        seeder = SalesSeeder(load_profile(profile_path), seed=seed, batch_size=batch_size, days=days)
+        
+        def progress(written, total):
+            if written == total or written % (batch_size * 10) == 0:
+                click.echo(f'  {written}/{total} sales')
+        
+        started = time.perf_counter()
+        click.echo(f'Seeding {companies} companies with {sales} sales each...')
+        try:
+            company_ids = seeder.seed(companies, stores, products, sales, prefix=prefix,
+                                      progress_callback=progress)
+        except Exception as e:
+            db.session.rollback()
+            click.echo(f'Error seeding sales: {str(e)}')
+            return
+        
+        click.echo(f'Created companies {", ".join(map(str, company_ids))} in {time.perf_counter() - started:.1f}s '
+                   f'(admin password "{SEED_PASSWORD}").')
+
+    @app.cli.command('benchmark-sales')
+    @click.option('--company-id', type=int, required=True, help='Company to benchmark (e.g. one from seed-sales).')
+    @click.option('--repeat', type=int, default=3, show_default=True, help='Runs per measurement.')
+    @click.option('--import-rows', type=int, default=5000, show_default=True,
+                  help='Rows per import run (0 skips the import benchmark).')
+    @click.option('--group', 'groups', multiple=True, type=click.Choice(['export', 'import', 'analytics', 'routes']),
+                  help='Only run these groups (repeatable; all by default).')
+    @click.option('--output', type=click.Path(dir_okay=False), default=None,
+                  help='Write the JSON results to this file instead of stdout.')
+    @with_appcontext
+    def benchmark_sales(company_id, repeat, import_rows, groups, output):
+        """Time sales import/export, every analysis and the main routes.
+
+        Results are JSON so runs can be kept and compared over time. Run it
+        against a database you can write to: import runs create and then
+        drop a temporary company.
+        """
+        import json
+        from app.services.sales_benchmark import SalesBenchmark
+        
+        try:
+            benchmark = SalesBenchmark(app, company_id, repeat=repeat, import_rows=import_rows)
+            results = benchmark.run(list(groups) or None)
+        except ValueError as e:
+            click.echo(f'Error: {str(e)}', err=True)
+            return
+        
+        report = json.dumps(results, indent=2)
+        if output:
+            with open(output, 'w') as f:
+                f.write(report + '\n')
+            click.echo(f'Wrote {len(results["results"])} results to {output}')
+        else:
+            click.echo(report)
+
     @click.command('migrate-products-to-embellishments')
     @with_appcontext
     def migrate_products_to_embellishments():
@@ -17,6 +17,41 @@ class Config:
     UPLOAD_FOLDER = os.path.join(basedir, 'static', 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     
+    # Per-process cache of computed analytics pages and charts
+    ANALYTICS_CACHE_MAX_BYTES = int(os.environ.get('ANALYTICS_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    
+    # Worker processes used to render PNG charts (0 renders in the request thread).
+    # Workers are spawned and re-import the __main__ module, so only turn them on
+    # when the entry point guards its startup with if __name__ == '__main__'.
+    ANALYTICS_CHART_WORKERS = int(os.environ.get('ANALYTICS_CHART_WORKERS', 0))
+    ANALYTICS_CHART_TIMEOUT = int(os.environ.get('ANALYTICS_CHART_TIMEOUT', 30))
+    
+    # On-disk columnar snapshots of sales for companies with large histories
+    ANALYTICS_SNAPSHOTS = os.environ.get('ANALYTICS_SNAPSHOTS', 'true').lower() in ['true', 'on', '1']
+    ANALYTICS_SNAPSHOT_DIR = os.environ.get('ANALYTICS_SNAPSHOT_DIR')  # defaults to <instance>/analytics_snapshots
+    ANALYTICS_SNAPSHOT_MIN_ROWS = int(os.environ.get('ANALYTICS_SNAPSHOT_MIN_ROWS', 50000))
+    
+    # Background warming of the analytics cache (interval in seconds, 0 = no schedule)
+    ANALYTICS_WARM_INTERVAL = int(os.environ.get('ANALYTICS_WARM_INTERVAL', 0))
+    ANALYTICS_WARM_ACTIVE_DAYS = int(os.environ.get('ANALYTICS_WARM_ACTIVE_DAYS', 7))
+    ANALYTICS_WARM_AFTER_IMPORT = os.environ.get('ANALYTICS_WARM_AFTER_IMPORT', 'true').lower() in ['true', 'on', '1']
+    ANALYTICS_WARM_MIN_IMPORT_ROWS = int(os.environ.get('ANALYTICS_WARM_MIN_IMPORT_ROWS', 500))
+    
+    # Per-request timings and SQL counts (Server-Timing headers, admin metrics page)
+    REQUEST_METRICS = os.environ.get('REQUEST_METRICS', 'false').lower() in ['true', 'on', '1']
+    
+    # Background sales imports (worker threads, 0 = run in the request; minutes without progress before a job is failed)
+    IMPORT_JOB_WORKERS = int(os.environ.get('IMPORT_JOB_WORKERS', 2))
+    IMPORT_JOB_STALE_MINUTES = int(os.environ.get('IMPORT_JOB_STALE_MINUTES', 30))
+    IMPORT_STAGING_DIR = os.environ.get('IMPORT_STAGING_DIR')  # defaults to <instance>/import_staging
+    IMPORT_STAGING_MAX_AGE_HOURS = int(os.environ.get('IMPORT_STAGING_MAX_AGE_HOURS', 24))  # unconfirmed uploads
+    
+    # Server-Sent Events for import/export progress (re-read interval without a push; seconds before the browser reconnects)
+    # Each open stream holds a worker for up to PROGRESS_STREAM_MAX_SECONDS, so deploy with threaded or
+    # gevent workers (e.g. gunicorn -k gthread --threads 8, or -k gevent), not one request per sync worker
+    PROGRESS_STREAM_POLL_SECONDS = float(os.environ.get('PROGRESS_STREAM_POLL_SECONDS', 2))
+    PROGRESS_STREAM_MAX_SECONDS = int(os.environ.get('PROGRESS_STREAM_MAX_SECONDS', 300))
+    
     # Server configuration for URL generation
     SERVER_NAME = os.environ.get('SERVER_NAME')
     PREFERRED_URL_SCHEME = os.environ.get('PREFERRED_URL_SCHEME', 'http')
@@ -91,6 +126,10 @@ class TestingConfig(Config):
     SQLALCHEMY_DATABASE_URI = (os.environ.get('TEST_DATABASE_URL') or 
         f"postgresql://{Config.DB_USER}:{safe_quote(Config.DB_PASSWORD)}@{Config.DB_HOST}:{Config.DB_PORT}/{DB_NAME}")
     WTF_CSRF_ENABLED = False
+    # Fail requests that run one SELECT with more than this many different parameters (N+1)
+    QUERY_GUARD_MAX_SELECTS = int(os.environ.get('QUERY_GUARD_MAX_SELECTS', 10))
+    # Run imports inline so tests see their results when the upload request returns
+    IMPORT_JOB_WORKERS = 0
     
 class ProductionConfig(Config):
     """Production config"""
@@ -100,6 +139,9 @@ class ProductionConfig(Config):
     # Fix for Heroku's "postgres://" vs "postgresql://" URL format
     if SQLALCHEMY_DATABASE_URI.startswith('postgres://'):
         SQLALCHEMY_DATABASE_URI = SQLALCHEMY_DATABASE_URI.replace('postgres://', 'postgresql://', 1)
+    
+    # Served by a WSGI server, whose entry point is safe to re-import in chart workers
+    ANALYTICS_CHART_WORKERS = int(os.environ.get('ANALYTICS_CHART_WORKERS', min(4, os.cpu_count() or 1)))
         
     @classmethod
     def init_app(cls, app):
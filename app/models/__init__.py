@@ -9,6 +9,11 @@ from app.models.product_category import ProductCategory
 from app.models.product import Product, Embellishment
 from app.models.store import Store
 from app.models.sales import Sale, SaleItem
+from app.models.sales_rollup import SalesDailyRollup
+from app.models.data_version import CompanyDataVersion
+from app.models.sale_tombstone import SaleTombstone
+from app.models.import_job import ImportJob
+from app.models.export_progress import ExportProgress
 from app.models.schema import CompanySchema
 from app.models.mailing_list import MailingList
 from app.models.join_request import EmailVerificationCode, JoinRequest, ModeratorInvite, DirectModeratorInvite
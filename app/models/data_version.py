@@ -0,0 +1,94 @@
+from app import db
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+class CompanyDataVersion(db.Model):
+    """Counters bumped whenever a company's data changes, used to invalidate caches and ETags"""
+    __tablename__ = 'company_data_versions'
+
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), primary_key=True)
+    sales_version = db.Column(db.Integer, nullable=False, default=0)
+    # Products, product categories and embellishments
+    catalog_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<CompanyDataVersion {self.company_id} sales={self.sales_version} catalog={self.catalog_version}>'
+
+    @classmethod
+    def sales_version_for(cls, company_id):
+        """Current sales version for a company (0 if it never changed)"""
+        version = db.session.query(cls.sales_version).filter_by(company_id=company_id).scalar()
+        return version or 0
+
+    @classmethod
+    def catalog_version_for(cls, company_id):
+        """Current catalog version for a company (0 if it never changed)"""
+        version = db.session.query(cls.catalog_version).filter_by(company_id=company_id).scalar()
+        return version or 0
+
+    @classmethod
+    def versions_for(cls, company_id):
+        """(sales_version, catalog_version) for a company in one query ((0, 0) if it never changed)"""
+        row = db.session.query(cls.sales_version, cls.catalog_version).filter_by(company_id=company_id).first()
+        return (row.sales_version, row.catalog_version) if row else (0, 0)
+
+    @classmethod
+    def bump_sales(cls, company_id):
+        """Increment the sales version inside the caller's transaction"""
+        cls._bump(company_id, 'sales_version')
+
+    @classmethod
+    def bump_catalog(cls, company_id, session=None):
+        """Increment the catalog version inside the caller's transaction"""
+        cls._bump(company_id, 'catalog_version', session)
+
+    @classmethod
+    def _bump(cls, company_id, column, session=None):
+        session = session or db.session
+        dialect = session.get_bind().dialect.name
+
+        if dialect in ('postgresql', 'sqlite'):
+            # Single statement, safe against another request creating the row first
+            dialect_insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+            stmt = dialect_insert(cls.__table__).values(
+                company_id=company_id, **{column: 1}, updated_at=datetime.utcnow())
+            stmt = stmt.on_conflict_do_update(index_elements=['company_id'], set_={
+                column: cls.__table__.c[column] + 1, 'updated_at': stmt.excluded.updated_at})
+            session.execute(stmt)
+            return
+
+        updated = session.execute(
+            db.update(cls).where(cls.company_id == company_id).values(
+                **{column: getattr(cls, column) + 1}, updated_at=datetime.utcnow())
+        ).rowcount
+        if updated:
+            return
+
+        # First change for this company - another request may be inserting the same row
+        try:
+            with session.begin_nested():
+                session.add(cls(company_id=company_id, **{column: 1}))
+        except IntegrityError:
+            session.execute(
+                db.update(cls).where(cls.company_id == company_id).values(
+                    **{column: getattr(cls, column) + 1}, updated_at=datetime.utcnow())
+            )
+
+
+@event.listens_for(Session, 'before_flush')
+def _bump_catalog_versions(session, flush_context, instances):
+    """Bump the catalog version of every company whose catalog is about to change"""
+    from app.models.product import Product, Embellishment
+    from app.models.product_category import ProductCategory
+
+    catalog_models = (Product, ProductCategory, Embellishment)
+    changed = [obj for obj in session.new | session.deleted if isinstance(obj, catalog_models)]
+    changed += [obj for obj in session.dirty
+                if isinstance(obj, catalog_models) and session.is_modified(obj)]
+
+    for company_id in sorted({obj.company_id for obj in changed if obj.company_id is not None}):
+        CompanyDataVersion.bump_catalog(company_id, session)
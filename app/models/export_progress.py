@@ -0,0 +1,44 @@
+from app import db
+from datetime import datetime, timedelta
+import json
+
+# Progress rows older than this are removed when the company starts another export
+EXPORT_PROGRESS_RETENTION = timedelta(days=1)
+
+class ExportProgress(db.Model):
+    """Latest progress of a sales CSV download, so any worker can stream it to the export page"""
+    __tablename__ = 'export_progress'
+
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), primary_key=True)
+    # Chosen by the export page and passed along with the download
+    progress_id = db.Column(db.String(64), primary_key=True)
+    _state = db.Column('state', db.Text, nullable=False)  # JSON progress dict
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ExportProgress {self.company_id} {self.progress_id}>'
+
+    @classmethod
+    def save(cls, company_id, progress_id, state):
+        """
+        Store the export's latest state in a transaction of its own
+
+        The download streams from the request's session, so this never
+        commits or flushes it.
+        """
+        now = datetime.utcnow()
+        values = {'state': json.dumps(state, default=str), 'updated_at': now}
+        table = cls.__table__
+        key = (table.c.company_id == company_id) & (table.c.progress_id == progress_id)
+        with db.engine.begin() as connection:
+            if connection.execute(table.update().where(key).values(**values)).rowcount:
+                return
+            connection.execute(table.delete().where(
+                (table.c.company_id == company_id) & (table.c.updated_at < now - EXPORT_PROGRESS_RETENTION)))
+            connection.execute(table.insert().values(company_id=company_id, progress_id=progress_id, **values))
+
+    @classmethod
+    def state_for(cls, company_id, progress_id):
+        """The export's latest state dict, or None before its first update"""
+        state = db.session.query(cls._state).filter_by(company_id=company_id, progress_id=progress_id).scalar()
+        return json.loads(state) if state else None
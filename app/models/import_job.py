@@ -0,0 +1,172 @@
+from app import db
+from datetime import datetime, timedelta
+import json
+
+# Errors kept on the job row; the rest are only counted
+MAX_STORED_ERRORS = 100
+
+# Rows the one-active-import-per-company index covers
+ACTIVE_JOB_WHERE = db.text("status IN ('queued', 'running')")
+
+class ImportJob(db.Model):
+    """A sales CSV import run in the background, with its progress and results"""
+    __tablename__ = 'import_jobs'
+
+    STAGED = 'staged'  # Uploaded and previewed, not confirmed yet
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+    # uuid4, also the name of the staged upload
+    id = db.Column(db.String(36), primary_key=True)
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    file_path = db.Column(db.String(500), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=QUEUED)
+
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    status_message = db.Column(db.String(200))
+    detail = db.Column(db.String(500))
+    total_rows = db.Column(db.Integer)
+    processed_rows = db.Column(db.Integer, nullable=False, default=0)
+    successful_rows = db.Column(db.Integer, nullable=False, default=0)
+    failed_rows = db.Column(db.Integer, nullable=False, default=0)
+    _errors = db.Column('errors', db.Text, nullable=True)  # JSON list of row errors
+    error = db.Column(db.Text)  # Why the whole job failed
+
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    company = db.relationship('Company')
+    user = db.relationship('User')
+
+    __table_args__ = (
+        db.Index('ix_import_jobs_company_status', 'company_id', 'status'),
+        # A company has at most one queued or running import; queuing a second fails
+        db.Index('uq_import_jobs_company_active', 'company_id', unique=True,
+                 postgresql_where=ACTIVE_JOB_WHERE, sqlite_where=ACTIVE_JOB_WHERE),
+    )
+
+    def __repr__(self):
+        return f'<ImportJob {self.id} {self.status} {self.progress}%>'
+
+    @property
+    def errors(self):
+        """Row error messages (at most MAX_STORED_ERRORS)"""
+        if self._errors:
+            return json.loads(self._errors)
+        return []
+
+    @errors.setter
+    def errors(self, value):
+        self._errors = json.dumps(value[:MAX_STORED_ERRORS]) if value else None
+
+    @property
+    def is_finished(self):
+        return self.status in (self.COMPLETED, self.FAILED)
+
+    @property
+    def rows_per_second(self):
+        """Throughput up to the last progress update, None before the first batch"""
+        if not self.started_at or not self.processed_rows:
+            return None
+        elapsed = ((self.finished_at or self.updated_at) - self.started_at).total_seconds()
+        return round(self.processed_rows / elapsed, 1) if elapsed > 0 else None
+
+    def to_dict(self, max_errors=10):
+        """Progress fields in the shape the import progress page polls for"""
+        data = {
+            'job_id': self.id,
+            'state': self.status,
+            'progress': self.progress,
+            'status': self.status_message or 'Waiting to start...',
+            'detail': self.detail or '',
+            'total_rows': self.total_rows,
+            'processed_rows': self.processed_rows,
+            'successful': self.successful_rows,
+            'failed': self.failed_rows,
+            'rows_per_second': self.rows_per_second
+        }
+        if self.status == self.COMPLETED:
+            data['results'] = {
+                'successful': self.successful_rows,
+                'failed': self.failed_rows,
+                'errors': self.errors[:max_errors]
+            }
+        elif self.status == self.FAILED:
+            data['error'] = self.error
+        return data
+
+    @classmethod
+    def active_for_company(cls, company_id):
+        """The company's queued or running job, if any"""
+        return cls.query.filter(cls.company_id == company_id,
+                                cls.status.in_(cls.ACTIVE_STATUSES)).first()
+
+    @classmethod
+    def queue(cls, job_id):
+        """
+        Move a staged import to queued; False if it was already confirmed
+
+        Raises IntegrityError (uq_import_jobs_company_active) if the company
+        already has a queued or running import.
+        """
+        queued = db.session.execute(
+            db.update(cls).where(cls.id == job_id, cls.status == cls.STAGED).values(
+                status=cls.QUEUED, updated_at=datetime.utcnow())
+        ).rowcount
+        db.session.commit()
+        return queued == 1
+
+    @classmethod
+    def claim(cls, job_id):
+        """Move a queued job to running; False if another worker already took it"""
+        now = datetime.utcnow()
+        claimed = db.session.execute(
+            db.update(cls).where(cls.id == job_id, cls.status == cls.QUEUED).values(
+                status=cls.RUNNING, started_at=now, updated_at=now,
+                status_message='Starting import...', detail='Preparing to process data')
+        ).rowcount
+        db.session.commit()
+        return claimed == 1
+
+    @classmethod
+    def update_progress(cls, job_id, **values):
+        """
+        Save progress on a connection of its own, so it is visible to
+        status requests straight away whatever the import's session is doing
+        """
+        values['updated_at'] = datetime.utcnow()
+        with db.engine.begin() as connection:
+            connection.execute(db.update(cls.__table__).where(cls.__table__.c.id == job_id).values(**values))
+
+    @classmethod
+    def finish(cls, job_id, successful, failed, errors):
+        now = datetime.utcnow()
+        cls.update_progress(
+            job_id, status=cls.COMPLETED, progress=100, finished_at=now,
+            status_message='Import Complete!', detail=f'Processed {successful + failed} records',
+            successful_rows=successful, failed_rows=failed,
+            errors=json.dumps(errors[:MAX_STORED_ERRORS]) if errors else None)
+
+    @classmethod
+    def fail(cls, job_id, error):
+        cls.update_progress(job_id, status=cls.FAILED, finished_at=datetime.utcnow(),
+                            status_message='Import Failed', detail=error[:500], error=error)
+
+    @classmethod
+    def fail_stale(cls, company_id, after=timedelta(minutes=30)):
+        """Mark the company's unfinished jobs that stopped reporting (their worker died) as failed"""
+        failed = db.session.execute(
+            db.update(cls).where(
+                cls.company_id == company_id, cls.status.in_(cls.ACTIVE_STATUSES),
+                cls.updated_at < datetime.utcnow() - after
+            ).values(status=cls.FAILED, finished_at=datetime.utcnow(), status_message='Import Failed',
+                     detail='The import stopped responding', error='The import stopped responding')
+        ).rowcount
+        db.session.commit()
+        return failed
@@ -16,4 +16,14 @@ class ProductCategory(db.Model):
     products = db.relationship('Product', backref='category', lazy='dynamic')
     
     def __repr__(self):
-        return f'<ProductCategory {self.name}>' 
\ No newline at end of file
+        return f'<ProductCategory {self.name}>'
+
+    @classmethod
+    def product_counts(cls, company_id):
+        """Number of products in each of a company's categories, in one query"""
+        from app.models.product import Product
+
+        rows = db.session.query(Product.category_id, db.func.count(Product.id)).filter(
+            Product.company_id == company_id, Product.category_id.isnot(None)
+        ).group_by(Product.category_id).all()
+        return {category_id: count for category_id, count in rows}
@@ -0,0 +1,47 @@
+from app import db
+from datetime import datetime, timedelta
+
+# Incremental readers whose watermark is older than this rebuild from scratch
+# instead of relying on tombstones, so older ones can be pruned
+TOMBSTONE_RETENTION = timedelta(days=30)
+
+class SaleTombstone(db.Model):
+    """Record of a deleted sale, so incremental readers can drop it without a full reload"""
+    __tablename__ = 'sale_tombstones'
+
+    id = db.Column(db.Integer, primary_key=True)
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), nullable=False)
+    # Not a foreign key - the sale row is gone by the time this is read
+    sale_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_sale_tombstones_company_deleted_at', 'company_id', 'deleted_at'),
+    )
+
+    def __repr__(self):
+        return f'<SaleTombstone {self.company_id} sale={self.sale_id}>'
+
+    @classmethod
+    def record(cls, sale):
+        """Add a tombstone for a sale inside the caller's transaction (before deleting it)"""
+        now = datetime.utcnow()
+        cls.prune(sale.company_id, now - TOMBSTONE_RETENTION)
+        db.session.add(cls(company_id=sale.company_id, sale_id=sale.id, deleted_at=now))
+
+    @classmethod
+    def deleted_since(cls, company_id, since):
+        """Ids of the company's sales deleted at or after since"""
+        return [row[0] for row in db.session.query(cls.sale_id).filter(
+            cls.company_id == company_id, cls.deleted_at >= since)]
+
+    @classmethod
+    def latest(cls, company_id):
+        """Time of the company's most recent delete (None if there is none)"""
+        return db.session.query(db.func.max(cls.deleted_at)).filter_by(company_id=company_id).scalar()
+
+    @classmethod
+    def prune(cls, company_id, before):
+        """Remove tombstones older than before; returns the number removed"""
+        return db.session.query(cls).filter(
+            cls.company_id == company_id, cls.deleted_at < before).delete(synchronize_session=False)
@@ -0,0 +1,36 @@
+from app import db
+from datetime import datetime
+
+class SalesDailyRollup(db.Model):
+    """Per-day sales totals, maintained alongside every write to the sales table"""
+    __tablename__ = 'sales_daily_rollup'
+
+    id = db.Column(db.Integer, primary_key=True)
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), nullable=False)
+
+    # Rollup key - store_id is 0 for sales that are not linked to a store
+    sale_date = db.Column(db.Date, nullable=False)
+    store_id = db.Column(db.Integer, nullable=False, default=0)
+    product_category = db.Column(db.String(200), nullable=False)
+    product_name = db.Column(db.String(200), nullable=False)
+    payment_method = db.Column(db.String(50), nullable=False)
+
+    # Latest store name seen for store_id
+    store_name = db.Column(db.String(200), nullable=False)
+
+    # Sums over the sales in the group
+    total = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    sale_count = db.Column(db.Integer, nullable=False, default=0)
+    card_amount = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    cash_amount = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('company_id', 'sale_date', 'store_id', 'product_category',
+                            'product_name', 'payment_method', name='uq_sales_daily_rollup_key'),
+    )
+
+    def __repr__(self):
+        return f'<SalesDailyRollup {self.company_id} {self.sale_date} {self.product_name} x{self.sale_count}>'
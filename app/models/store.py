@@ -17,4 +17,14 @@ class Store(db.Model):
     sales = db.relationship('Sale', backref='store', lazy='dynamic')
     
     def __repr__(self):
-        return f'<Store {self.name}>' 
\ No newline at end of file
+        return f'<Store {self.name}>'
+    
+    @classmethod
+    def sale_counts(cls, company_id):
+        """Number of sales at each of a company's stores, in one query"""
+        from app.models.sales import Sale
+        
+        rows = db.session.query(Sale.store_id, db.func.count(Sale.id)).filter(
+            Sale.company_id == company_id, Sale.store_id.isnot(None)
+        ).group_by(Sale.store_id).all()
+        return {store_id: count for store_id, count in rows} 
\ No newline at end of file
@@ -39,6 +39,17 @@ class UserPermissions(db.Model):
     def __repr__(self):
         return f'<UserPermissions {self.user_id} in Company {self.company_id}>'
     
+    @classmethod
+    def for_users(cls, user_ids, company_id):
+        """Permissions of several users in a company, in one query (None for users without any)"""
+        permissions = {user_id: None for user_id in user_ids}
+        if permissions:
+            rows = cls.query.filter(cls.company_id == company_id, cls.user_id.in_(permissions)).all()
+            for row in rows:
+                if permissions[row.user_id] is None:
+                    permissions[row.user_id] = row
+        return permissions
+    
     def set_permissions(self, access_level, data_range, allowed_store_ids=None):
         """Set permissions based on the 3 simple settings"""
         self.access_level = access_level
@@ -7,6 +7,7 @@ from app.utils.decorators import admin_required
 from app import db
 from datetime import datetime
 from app.config import Config
+from app.services.request_metrics import request_metrics
 
 # Create admin blueprint with a complex URL prefix to hide it
 admin_bp = Blueprint('admin', __name__, url_prefix='/adminr0ute$S19ou4w91048')
@@ -79,4 +80,22 @@ def companies():
     """Admin page to manage companies"""
     page = request.args.get('page', 1, type=int)
     companies = Company.query.order_by(Company.created_at.desc()).paginate(page=page, per_page=20)
-    return render_template('admin/companies.html', companies=companies.items, pagination=companies) 
\ No newline at end of file
+    return render_template('admin/companies.html', companies=companies.items, pagination=companies)
+
+@admin_bp.route('/metrics')
+@login_required
+@admin_required
+def metrics():
+    """Admin page with per-endpoint request timings and SQL counts"""
+    return render_template('admin/metrics.html',
+                           enabled=request_metrics.enabled,
+                           endpoints=request_metrics.snapshot())
+
+@admin_bp.route('/metrics/reset', methods=['POST'])
+@login_required
+@admin_required
+def reset_metrics():
+    """Clear the collected request metrics"""
+    request_metrics.reset()
+    flash('Request metrics cleared.', 'success')
+    return redirect(url_for('admin.metrics')) 
\ No newline at end of file
@@ -1,11 +1,17 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify
+from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, Response, stream_with_context, current_app
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
-from app.services.analytics_service import AnalyticsService
+from app.services.analytics_service import AnalyticsService, ANALYSIS_METHODS, PAGE_DEFAULT_DAYS
+from app.services.analytics_cache import analytics_cache
+from app.services.analytics_charts import CHART_FORMATS
+from app.services.sales_timeseries import SalesTimeSeries, GRANULARITIES, METRICS
 from app.utils.decorators import company_required, subscriber_required
+from app.utils.http_cache import conditional_response, version_etag
 
 analytics_bp = Blueprint('analytics', __name__, url_prefix='/analytics')
 
+API_ANALYSIS_TYPES = tuple(ANALYSIS_METHODS)
+
 @analytics_bp.route('/')
 @login_required
 @company_required
@@ -24,20 +30,20 @@ def index():
         end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
     
     if not start_date:
-        start_date = end_date - timedelta(days=30)
+        start_date = end_date - timedelta(days=PAGE_DEFAULT_DAYS['dashboard'])
     else:
         start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
     
-    # Get sales data
-    df = analytics_service.get_company_sales_data(current_user.company_id, start_date, end_date)
+    # Get dashboard summary (cached until the company's sales change)
+    dashboard_data = analytics_cache.get_or_compute(
+        current_user.company_id, 'dashboard', start_date, end_date,
+        lambda: analytics_service.compute_page('dashboard', current_user.company_id, start_date, end_date)
+    )
     
-    if df.empty:
+    if not dashboard_data:
         flash('No sales data found for the selected period.', 'info')
         return render_template('analytics/index.html', no_data=True)
     
-    # Get dashboard summary
-    dashboard_data = analytics_service.get_dashboard_summary(df)
-    
     return render_template('analytics/index.html', 
                          dashboard=dashboard_data,
                          start_date=start_date,
@@ -61,18 +67,19 @@ def stores():
         end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
     
     if not start_date:
-        start_date = end_date - timedelta(days=90)  # 3 months for store analysis
+        start_date = end_date - timedelta(days=PAGE_DEFAULT_DAYS['stores'])
     else:
         start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
     
-    df = analytics_service.get_company_sales_data(current_user.company_id, start_date, end_date)
+    store_analytics = analytics_cache.get_or_compute(
+        current_user.company_id, 'stores', start_date, end_date,
+        lambda: analytics_service.compute_page('stores', current_user.company_id, start_date, end_date)
+    )
     
-    if df.empty:
+    if not store_analytics:
         flash('No sales data found for the selected period.', 'info')
         return render_template('analytics/stores.html', no_data=True)
     
-    store_analytics = analytics_service.get_store_analytics(df)
-    
     return render_template('analytics/stores.html', 
                          analytics=store_analytics,
                          start_date=start_date,
@@ -96,18 +103,19 @@ def categories():
         end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
     
     if not start_date:
-        start_date = end_date - timedelta(days=90)
+        start_date = end_date - timedelta(days=PAGE_DEFAULT_DAYS['categories'])
     else:
         start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
     
-    df = analytics_service.get_company_sales_data(current_user.company_id, start_date, end_date)
+    category_analytics = analytics_cache.get_or_compute(
+        current_user.company_id, 'categories', start_date, end_date,
+        lambda: analytics_service.compute_page('categories', current_user.company_id, start_date, end_date)
+    )
     
-    if df.empty:
+    if not category_analytics:
         flash('No sales data found for the selected period.', 'info')
         return render_template('analytics/categories.html', no_data=True)
     
-    category_analytics = analytics_service.get_category_analytics(df)
-    
     return render_template('analytics/categories.html', 
                          analytics=category_analytics,
                          start_date=start_date,
@@ -131,18 +139,19 @@ def products():
         end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
     
     if not start_date:
-        start_date = end_date - timedelta(days=90)
+        start_date = end_date - timedelta(days=PAGE_DEFAULT_DAYS['products'])
     else:
         start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
     
-    df = analytics_service.get_company_sales_data(current_user.company_id, start_date, end_date)
+    product_analytics = analytics_cache.get_or_compute(
+        current_user.company_id, 'products', start_date, end_date,
+        lambda: analytics_service.compute_page('products', current_user.company_id, start_date, end_date)
+    )
     
-    if df.empty:
+    if not product_analytics:
         flash('No sales data found for the selected period.', 'info')
         return render_template('analytics/products.html', no_data=True)
     
-    product_analytics = analytics_service.get_product_analytics(df)
-    
     return render_template('analytics/products.html', 
                          analytics=product_analytics,
                          start_date=start_date,
@@ -166,18 +175,19 @@ def payments():
         end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
     
     if not start_date:
-        start_date = end_date - timedelta(days=90)
+        start_date = end_date - timedelta(days=PAGE_DEFAULT_DAYS['payments'])
     else:
         start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
     
-    df = analytics_service.get_company_sales_data(current_user.company_id, start_date, end_date)
+    payment_analytics = analytics_cache.get_or_compute(
+        current_user.company_id, 'payments', start_date, end_date,
+        lambda: analytics_service.compute_page('payments', current_user.company_id, start_date, end_date)
+    )
     
-    if df.empty:
+    if not payment_analytics:
         flash('No sales data found for the selected period.', 'info')
         return render_template('analytics/payments.html', no_data=True)
     
-    payment_analytics = analytics_service.get_payment_analytics(df)
-    
     return render_template('analytics/payments.html', 
                          analytics=payment_analytics,
                          start_date=start_date,
@@ -201,18 +211,19 @@ def embellishments():
         end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
     
     if not start_date:
-        start_date = end_date - timedelta(days=90)
+        start_date = end_date - timedelta(days=PAGE_DEFAULT_DAYS['embellishments'])
     else:
         start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
     
-    df = analytics_service.get_company_sales_data(current_user.company_id, start_date, end_date)
+    embellishment_analytics = analytics_cache.get_or_compute(
+        current_user.company_id, 'embellishments', start_date, end_date,
+        lambda: analytics_service.compute_page('embellishments', current_user.company_id, start_date, end_date)
+    )
     
-    if df.empty:
+    if not embellishment_analytics:
         flash('No sales data found for the selected period.', 'info')
         return render_template('analytics/embellishments.html', no_data=True)
     
-    embellishment_analytics = analytics_service.get_embellishment_analytics(df)
-    
     return render_template('analytics/embellishments.html', 
                          analytics=embellishment_analytics,
                          start_date=start_date,
@@ -236,18 +247,21 @@ def time_analysis():
         end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
     
     if not start_date:
-        start_date = end_date - timedelta(days=365)  # 1 year for time analysis
+        start_date = end_date - timedelta(days=PAGE_DEFAULT_DAYS['time_analysis'])
     else:
         start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
     
-    df = analytics_service.get_company_sales_data(current_user.company_id, start_date, end_date)
+    time_data = analytics_cache.get_or_compute(
+        current_user.company_id, 'time_analysis', start_date, end_date,
+        lambda: analytics_service.compute_page('time_analysis', current_user.company_id, start_date, end_date)
+    )
     
-    if df.empty:
+    if not time_data:
         flash('No sales data found for the selected period.', 'info')
         return render_template('analytics/time_analysis.html', no_data=True)
     
-    day_analytics = analytics_service.get_day_analytics(df)
-    month_analytics = analytics_service.get_monthly_analytics(df)
+    day_analytics = time_data['days']
+    month_analytics = time_data['months']
     
     return render_template('analytics/time_analysis.html', 
                          day_analytics=day_analytics,
@@ -273,18 +287,19 @@ def reports():
         end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
     
     if not start_date:
-        start_date = end_date - timedelta(days=90)
+        start_date = end_date - timedelta(days=PAGE_DEFAULT_DAYS['reports'])
     else:
         start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
     
-    df = analytics_service.get_company_sales_data(current_user.company_id, start_date, end_date)
+    reports_data = analytics_cache.get_or_compute(
+        current_user.company_id, 'reports', start_date, end_date,
+        lambda: analytics_service.compute_page('reports', current_user.company_id, start_date, end_date)
+    )
     
-    if df.empty:
+    if not reports_data:
         flash('No sales data found for the selected period.', 'info')
         return render_template('analytics/reports.html', no_data=True)
     
-    reports_data = analytics_service.generate_reports(df)
-    
     return render_template('analytics/reports.html', 
                          reports=reports_data,
                          start_date=start_date,
@@ -296,10 +311,9 @@ def reports():
 @subscriber_required
 def api_data():
     """API endpoint for analytics data (for AJAX requests)"""
-    analytics_service = AnalyticsService()
-    
     # Get parameters
     analysis_type = request.args.get('type', 'dashboard')
+    chart_format = request.args.get('format', 'png')
     end_date = request.args.get('end_date')
     start_date = request.args.get('start_date')
     
@@ -313,31 +327,132 @@ def api_data():
     else:
         start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
     
-    df = analytics_service.get_company_sales_data(current_user.company_id, start_date, end_date)
-    
-    if df.empty:
-        return jsonify({'error': 'No data found'})
-    
-    # Return different data based on type
-    if analysis_type == 'dashboard':
-        data = analytics_service.get_dashboard_summary(df)
-    elif analysis_type == 'stores':
-        data = analytics_service.get_store_analytics(df)
-    elif analysis_type == 'categories':
-        data = analytics_service.get_category_analytics(df)
-    elif analysis_type == 'products':
-        data = analytics_service.get_product_analytics(df)
-    elif analysis_type == 'payments':
-        data = analytics_service.get_payment_analytics(df)
-    elif analysis_type == 'embellishments':
-        data = analytics_service.get_embellishment_analytics(df)
-    elif analysis_type == 'days':
-        data = analytics_service.get_day_analytics(df)
-    elif analysis_type == 'months':
-        data = analytics_service.get_monthly_analytics(df)
-    elif analysis_type == 'reports':
-        data = analytics_service.generate_reports(df)
-    else:
+    if analysis_type not in API_ANALYSIS_TYPES:
         return jsonify({'error': 'Invalid analysis type'})
+    if chart_format not in CHART_FORMATS:
+        return jsonify({'error': 'Invalid format'})
+    
+    company_id = current_user.company_id
+    analytics_service = AnalyticsService(chart_format=chart_format)
+    
+    def build():
+        data = analytics_cache.get_or_compute(
+            company_id, f'api:{analysis_type}:{chart_format}', start_date, end_date,
+            lambda: analytics_service.compute_page(analysis_type, company_id, start_date, end_date)
+        )
+        if not data:
+            return jsonify({'error': 'No data found'})
+        return jsonify(data)
+    
+    # Unchanged data means an unchanged result, so pollers get a 304 without any work
+    etag = version_etag('api_data', company_id, analytics_cache.data_version(company_id),
+                        analysis_type, chart_format, start_date, end_date)
+    return conditional_response(etag, build)
+
+@analytics_bp.route('/api/timeseries')
+@login_required
+@company_required
+@subscriber_required
+def api_timeseries():
+    """API endpoint for a metric bucketed by time, computed in the database
+    
+    Query parameters:
+        granularity: hour, day, week, month, quarter or year (default day)
+        metric: revenue, quantity, transactions or average_ticket (default revenue)
+        store, category, product: Optional name filters
+        start_date, end_date: Date range (default last 30 days)
+    """
+    granularity = request.args.get('granularity', 'day')
+    metric = request.args.get('metric', 'revenue')
+    store = request.args.get('store') or None
+    category = request.args.get('category') or None
+    product = request.args.get('product') or None
+    end_date = request.args.get('end_date')
+    start_date = request.args.get('start_date')
+    
+    if not end_date:
+        end_date = datetime.now().date()
+    else:
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+    
+    if not start_date:
+        start_date = end_date - timedelta(days=30)
+    else:
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+    
+    if granularity not in GRANULARITIES:
+        return jsonify({'error': 'Invalid granularity'})
+    if metric not in METRICS:
+        return jsonify({'error': 'Invalid metric'})
+    
+    series = SalesTimeSeries(current_user.company_id, start_date, end_date,
+                             store=store, category=category, product=product)
+    cache_key = f'timeseries:{granularity}:{metric}:{store}:{category}:{product}'
+    data = analytics_cache.get_or_compute(
+        current_user.company_id, cache_key, start_date, end_date,
+        lambda: series.compute(granularity, metric)
+    )
+    
+    return jsonify(data)
+
+@analytics_bp.route('/api/batch')
+@login_required
+@company_required
+@subscriber_required
+def api_batch():
+    """API endpoint returning several analyses computed from shared sales reads
+    
+    Results are cached under the same keys as /api/data, which computes
+    each analysis the same way.
+    
+    Query parameters:
+        types: Comma-separated analysis types (e.g. types=stores,days,months)
+        format: Chart format, png (default) or series
+        stream: When 1, stream one JSON line per analysis as it finishes
+    """
+    analysis_types = []
+    for value in request.args.getlist('types'):
+        for analysis_type in value.split(','):
+            analysis_type = analysis_type.strip()
+            if analysis_type and analysis_type not in analysis_types:
+                analysis_types.append(analysis_type)
+    chart_format = request.args.get('format', 'png')
+    stream = request.args.get('stream', '0').lower() in ['1', 'true', 'on']
+    end_date = request.args.get('end_date')
+    start_date = request.args.get('start_date')
+    
+    if not end_date:
+        end_date = datetime.now().date()
+    else:
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+    
+    if not start_date:
+        start_date = end_date - timedelta(days=30)
+    else:
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
     
-    return jsonify(data) 
\ No newline at end of file
+    if not analysis_types:
+        return jsonify({'error': 'No analysis types requested'})
+    invalid = [t for t in analysis_types if t not in API_ANALYSIS_TYPES]
+    if invalid:
+        return jsonify({'error': f"Invalid analysis type: {', '.join(invalid)}"})
+    if chart_format not in CHART_FORMATS:
+        return jsonify({'error': 'Invalid format'})
+    
+    analytics_service = AnalyticsService(chart_format=chart_format)
+    company_id = current_user.company_id
+    
+    def sections():
+        for analysis_type, compute in analytics_service.batch_analyses(
+                company_id, analysis_types, start_date, end_date):
+            data = analytics_cache.get_or_compute(
+                company_id, f'api:{analysis_type}:{chart_format}', start_date, end_date, compute)
+            yield analysis_type, data or {'error': 'No data found'}
+    
+    if stream:
+        def generate():
+            for analysis_type, data in sections():
+                yield current_app.json.dumps({'type': analysis_type, 'data': data}) + '\n'
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
+    return jsonify(dict(sections()))
@@ -97,13 +97,7 @@ def manage_moderators():
     stores = Store.query.filter_by(company_id=company.id).all()
     
     # Get permissions for each moderator
-    moderator_permissions = {}
-    for moderator in moderators:
-        permissions = UserPermissions.query.filter_by(
-            user_id=moderator.id, 
-            company_id=company.id
-        ).first()
-        moderator_permissions[moderator.id] = permissions
+    moderator_permissions = UserPermissions.for_users([moderator.id for moderator in moderators], company.id)
     
     return render_template('company_admin/settings/manage_moderators.html',
                          company=company,
@@ -217,17 +211,19 @@ def bulk_update_permissions():
             user_ids = form.user_ids.data.split(',') if form.user_ids.data else []
             user_ids = [int(uid) for uid in user_ids if uid.strip()]
             
+            # Only users that are moderators of this company
+            moderator_ids = [row[0] for row in db.session.query(User.id).filter(
+                User.id.in_(user_ids), User.company_id == company.id, User.role_company == 'moderator'
+            ).all()] if user_ids else []
+            moderator_permissions = UserPermissions.for_users(moderator_ids, company.id)
+            
             for user_id in user_ids:
                 # Verify user belongs to company
-                user = User.query.filter_by(id=user_id, company_id=company.id, role_company='moderator').first()
-                if not user:
+                if user_id not in moderator_permissions:
                     continue
                 
                 # Get or create permissions
-                permissions = UserPermissions.query.filter_by(
-                    user_id=user_id, 
-                    company_id=company.id
-                ).first()
+                permissions = moderator_permissions[user_id]
                 
                 if not permissions:
                     permissions = UserPermissions(
@@ -235,6 +231,7 @@ def bulk_update_permissions():
                         company_id=company.id
                     )
                     db.session.add(permissions)
+                    moderator_permissions[user_id] = permissions
                 
                 # Update fields that were selected for update
                 if form.data_range_access.data:
@@ -244,7 +241,6 @@ def bulk_update_permissions():
                     if form.store_access_mode.data == 'all':
                         permissions.allowed_store_ids = []  # Empty means all stores
                     elif form.store_access_mode.data == 'none':
-                        all_stores = Store.query.filter_by(company_id=company.id).all()
                         permissions.allowed_store_ids = [-1]  # No stores
                     elif form.store_access_mode.data == 'specific':
                         permissions.allowed_store_ids = form.allowed_stores.data
@@ -1,7 +1,11 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
 from app import db
-from app.models.product import Product, Embellishment, product_embellishments
+from app.models.product import Product, Embellishment, product_embellishments, sale_embellishments
+from app.models.sales import Sale
+from app.models.data_version import CompanyDataVersion
+from app.utils.http_cache import conditional_response, version_etag
+from datetime import datetime
 from app.models.product_category import ProductCategory
 from app.forms.product import ProductForm, ProductCategoryForm, EmbellishmentForm
 from app.forms.schema import DynamicProductForm
@@ -11,6 +15,28 @@ from app.utils.decorators import company_required
 # Create blueprint
 products_bp = Blueprint('products', __name__, url_prefix='/products')
 
+def _catalog_etag(*parts):
+    """ETag that changes whenever the company's products, categories or embellishments do"""
+    company_id = current_user.company_id
+    return version_etag(company_id, CompanyDataVersion.catalog_version_for(company_id), *parts)
+
+def _stamp_embellishment_sales(embellishment):
+    """
+    Stamp the sales that use an embellishment after it is renamed or removed,
+    so analytics snapshots pick the change up, and invalidate cached analytics
+
+    Returns:
+        Number of sales stamped
+    """
+    used_by = db.select(sale_embellishments.c.sale_id).where(
+        sale_embellishments.c.embellishment_id == embellishment.id)
+    stamped = db.session.execute(
+        db.update(Sale).where(Sale.id.in_(used_by)).values(updated_at=datetime.utcnow())
+    ).rowcount
+    if stamped:
+        CompanyDataVersion.bump_sales(embellishment.company_id)
+    return stamped
+
 # Helper function to check if user belongs to a company
 def check_company():
     """Check if user belongs to a company and redirect if not"""
@@ -25,7 +51,9 @@ def check_company():
 def index():
     """Show products list"""
     try:
-        products = Product.query.filter_by(company_id=current_user.company_id).order_by(Product.name).all()
+        products = Product.query.filter_by(company_id=current_user.company_id).options(
+            db.joinedload(Product.category), db.selectinload(Product.embellishments)
+        ).order_by(Product.name).all()
         categories = ProductCategory.query.filter_by(company_id=current_user.company_id).order_by(ProductCategory.name).all()
         return render_template('products/index.html', products=products, categories=categories)
     except Exception as e:
@@ -41,18 +69,21 @@ def index():
 def embellishments():
     """Show embellishments list"""
     try:
-        embellishments = Embellishment.query.filter_by(company_id=current_user.company_id).order_by(Embellishment.name).all()
+        embellishments = Embellishment.query.filter_by(company_id=current_user.company_id).options(
+            db.selectinload(Embellishment.product_types)
+        ).order_by(Embellishment.name).all()
         
         # Calculate product counts for each embellishment
-        embellishment_product_counts = {}
-        for embellishment in embellishments:
-            count = db.session.query(Product).join(
-                product_embellishments, 
-                Product.id == product_embellishments.c.product_id
-            ).filter(
-                product_embellishments.c.embellishment_id == embellishment.id
-            ).count()
-            embellishment_product_counts[embellishment.id] = count
+        counts = dict(db.session.query(
+            product_embellishments.c.embellishment_id, db.func.count(product_embellishments.c.product_id)
+        ).join(
+            Embellishment, Embellishment.id == product_embellishments.c.embellishment_id
+        ).filter(
+            Embellishment.company_id == current_user.company_id
+        ).group_by(product_embellishments.c.embellishment_id).all())
+        embellishment_product_counts = {
+            embellishment.id: counts.get(embellishment.id, 0) for embellishment in embellishments
+        }
         
         return render_template('products/embellishments.html', 
                               embellishments=embellishments,
@@ -109,6 +140,9 @@ def edit_embellishment(embellishment_id):
         form.product_types.data = [pt.id for pt in embellishment.product_types]
     
     if form.validate_on_submit():
+        # Analytics show sales under the embellishment's name
+        if form.name.data != embellishment.name:
+            _stamp_embellishment_sales(embellishment)
         embellishment.name = form.name.data
         embellishment.description = form.description.data
         
@@ -149,6 +183,9 @@ def delete_embellishment(embellishment_id):
         flash(f'Cannot delete embellishment: It is used by {product_count} products.', 'warning')
         return redirect(url_for('products.embellishments'))
     
+    # Sales that used it lose the embellishment
+    _stamp_embellishment_sales(embellishment)
+    
     db.session.delete(embellishment)
     db.session.commit()
     flash('Embellishment deleted successfully!', 'success')
@@ -169,23 +206,26 @@ def api_embellishments_for_category():
     if category.company_id != current_user.company_id:
         return jsonify({'error': 'Permission denied'}), 403
     
-    # Get embellishments for this category
-    embellishments = Embellishment.query.filter_by(company_id=current_user.company_id)\
-                    .filter(Embellishment.product_types.any(id=category_id))\
-                    .order_by(Embellishment.name).all()
-    
-    result = {
-        'embellishments': [
-            {
-                'id': emb.id,
-                'name': emb.name,
-                'description': emb.description
-            }
-            for emb in embellishments
-        ]
-    }
-    
-    return jsonify(result)
+    def build():
+        # Get embellishments for this category
+        embellishments = Embellishment.query.filter_by(company_id=current_user.company_id)\
+                        .filter(Embellishment.product_types.any(id=category_id))\
+                        .order_by(Embellishment.name).all()
+        
+        result = {
+            'embellishments': [
+                {
+                    'id': emb.id,
+                    'name': emb.name,
+                    'description': emb.description
+                }
+                for emb in embellishments
+            ]
+        }
+        
+        return jsonify(result)
+    
+    return conditional_response(_catalog_etag('embellishments-for-category', category_id), build)
 
 @products_bp.route('/categories')
 @login_required
@@ -195,28 +235,23 @@ def categories():
     try:
         categories = ProductCategory.query.filter_by(company_id=current_user.company_id).order_by(ProductCategory.name).all()
         
-        # Count fields per category
+        # Count fields per category (category_id None holds the global fields)
+        try:
+            field_counts = dict(db.session.query(
+                CompanySchema.category_id, db.func.count(CompanySchema.schema_id)
+            ).filter_by(company_id=current_user.company_id).group_by(CompanySchema.category_id).all())
+        except Exception as field_error:
+            # If there's an error counting fields, just set them to 0
+            print(f"Error counting fields: {str(field_error)}")
+            field_counts = {}
+
+        global_fields = field_counts.get(None, 0)
         for category in categories:
-            try:
-                category.field_count = CompanySchema.query.filter_by(
-                    company_id=current_user.company_id, 
-                    category_id=category.id
-                ).count()
-                
-                # Count global fields that apply to all categories
-                global_fields = CompanySchema.query.filter_by(
-                    company_id=current_user.company_id, 
-                    category_id=None
-                ).count()
-                
-                category.total_fields = category.field_count + global_fields
-            except Exception as field_error:
-                # If there's an error counting fields, just set them to 0
-                print(f"Error counting fields: {str(field_error)}")
-                category.field_count = 0
-                category.total_fields = 0
+            category.field_count = field_counts.get(category.id, 0)
+            category.total_fields = category.field_count + global_fields
             
-        return render_template('products/categories.html', categories=categories)
+        return render_template('products/categories.html', categories=categories,
+                               product_counts=ProductCategory.product_counts(current_user.company_id))
     except Exception as e:
         # Log the error
         print(f"Error in products.categories: {str(e)}")
@@ -240,7 +275,8 @@ def new_product():
     elif has_schema:
         # If schema exists but no category selected, show category selection
         categories = ProductCategory.query.filter_by(company_id=current_user.company_id).order_by(ProductCategory.name).all()
-        return render_template('products/category_select.html', categories=categories)
+        return render_template('products/category_select.html', categories=categories,
+                               product_counts=ProductCategory.product_counts(current_user.company_id))
     else:
         # Use regular form if no schema exists
         form = ProductForm(company_id=current_user.company_id)
@@ -462,19 +498,21 @@ def api_product_details(product_id):
     if product.company_id != current_user.company_id:
         return jsonify({'error': 'Permission denied'}), 403
     
-    result = {
-        'product_id': product.product_id,
-        'name': product.name,
-        'base_price': float(product.base_price),
-        'category_id': product.category_id,
-        'active': product.active
-    }
-    
-    # Add additional fields if they exist
-    if product.additional_fields:
-        result['additional_fields'] = product.additional_fields
+    def build():
+        result = {
+            'product_id': product.id,
+            'name': product.name,
+            'base_price': float(product.base_price or 0),
+            'category_id': product.category_id
+        }
+        
+        # Add additional fields if they exist
+        if product.additional_fields:
+            result['additional_fields'] = product.additional_fields
+        
+        return jsonify(result)
     
-    return jsonify(result)
+    return conditional_response(_catalog_etag('product', product_id), build)
 
 @products_bp.route('/select-category')
 @login_required
@@ -482,7 +520,8 @@ def api_product_details(product_id):
 def select_category():
     """Select a category before adding a product"""
     categories = ProductCategory.query.filter_by(company_id=current_user.company_id).order_by(ProductCategory.name).all()
-    return render_template('products/category_select.html', categories=categories)
+    return render_template('products/category_select.html', categories=categories,
+                           product_counts=ProductCategory.product_counts(current_user.company_id))
 
 @products_bp.route('/view/<int:product_id>')
 @login_required
@@ -535,15 +574,18 @@ def api_product_embellishments(product_id):
     if product.company_id != current_user.company_id:
         return jsonify({'error': 'Permission denied'}), 403
     
-    result = {
-        'embellishments': [
-            {
-                'id': emb.id,
-                'name': emb.name,
-                'description': emb.description
-            }
-            for emb in product.embellishments
-        ]
-    }
-    
-    return jsonify(result) 
\ No newline at end of file
+    def build():
+        result = {
+            'embellishments': [
+                {
+                    'id': emb.id,
+                    'name': emb.name,
+                    'description': emb.description
+                }
+                for emb in product.embellishments
+            ]
+        }
+        
+        return jsonify(result)
+    
+    return conditional_response(_catalog_etag('product-embellishments', product_id), build)
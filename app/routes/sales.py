@@ -1,26 +1,39 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, session, make_response, send_file
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, session, make_response, send_file, Response, stream_with_context
 from flask_login import login_required, current_user
+from werkzeug.exceptions import RequestEntityTooLarge
 from sqlalchemy import func, desc, and_
 from app import db
 from app.models.store import Store
 from app.models.product import Product, Embellishment
 from app.models.product_category import ProductCategory
 from app.models.sales import Sale
+from app.models.sale_tombstone import SaleTombstone
 from app.models.roles import RoleCompany
 from app.forms.sales_setup_forms import SaleEntryForm
 from app.utils.decorators import company_required, subscriber_required
 from app.models.subscription import CompanySubscription
 from app.services.sales_import_export import SalesImportExportService
+from app.services.sales_rollup import SalesRollupService
+from app.services.import_jobs import import_job_runner
+from app.services.progress_events import progress_events
+from app.services.import_staging import import_staging
+from app.models.sales_rollup import SalesDailyRollup
+from app.models.data_version import CompanyDataVersion
+from app.models.import_job import ImportJob
+from app.models.export_progress import ExportProgress
+from app.utils.http_cache import conditional_response, version_etag
 from datetime import datetime, date
+from itertools import chain
 import json
 import io
-import tempfile
-import os
-import uuid
+import time
 
 # Create blueprint
 sales_bp = Blueprint('sales', __name__, url_prefix='/sales')
 
+# Least time between two saves of a running export's progress
+EXPORT_PROGRESS_SAVE_SECONDS = 1
+
 @sales_bp.route('/')
 @login_required
 @company_required
@@ -55,13 +68,7 @@ def index():
         missing_setup = []
     else:
         # Check if any categories have products
-        has_products = False
-        if categories:
-            for category in categories:
-                product_count = Product.query.filter_by(company_id=company_id, category_id=category.id).count()
-                if product_count > 0:
-                    has_products = True
-                    break
+        has_products = bool(categories) and any(ProductCategory.product_counts(company_id).values())
         
         # Setup is complete if there are stores, categories, and at least one product
         setup_complete = bool(stores and categories and has_products)
@@ -78,18 +85,18 @@ def index():
     # Get recent sales
     recent_sales = Sale.query.filter_by(company_id=company_id).order_by(desc(Sale.created_at)).limit(10).all()
     
-    # Calculate daily sales total
+    # Calculate daily sales total from the daily rollup
     today = date.today()
-    daily_sales = db.session.query(func.sum(Sale.card_amount + Sale.cash_amount)).filter(
-        Sale.company_id == company_id,
-        func.date(Sale.created_at) == today
+    daily_sales = db.session.query(func.sum(SalesDailyRollup.card_amount + SalesDailyRollup.cash_amount)).filter(
+        SalesDailyRollup.company_id == company_id,
+        SalesDailyRollup.sale_date == today
     ).scalar() or 0
     
     # Calculate monthly sales total
-    monthly_sales = db.session.query(func.sum(Sale.card_amount + Sale.cash_amount)).filter(
-        Sale.company_id == company_id,
-        func.extract('month', Sale.created_at) == today.month,
-        func.extract('year', Sale.created_at) == today.year
+    monthly_sales = db.session.query(func.sum(SalesDailyRollup.card_amount + SalesDailyRollup.cash_amount)).filter(
+        SalesDailyRollup.company_id == company_id,
+        SalesDailyRollup.sale_date >= today.replace(day=1),
+        SalesDailyRollup.sale_date <= today
     ).scalar() or 0
     
     return render_template(
@@ -134,12 +141,7 @@ def new_sale():
         return redirect(url_for('products.categories'))
     
     # Check if there are products in any category
-    has_products = False
-    for category in categories:
-        product_count = Product.query.filter_by(company_id=company_id, category_id=category.id).count()
-        if product_count > 0:
-            has_products = True
-            break
+    has_products = any(ProductCategory.product_counts(company_id).values())
     
     if not has_products:
         flash('You need to add products to at least one category before recording sales.', 'warning')
@@ -151,9 +153,13 @@ def new_sale():
     form.store_id.choices = [(store.id, store.name) for store in stores]
     
     # Get product choices grouped by category
+    products_by_category = {}
+    for product in Product.query.filter_by(company_id=company_id).order_by(Product.id).all():
+        products_by_category.setdefault(product.category_id, []).append(product)
+
     product_choices_by_category = {}
     for category in categories:
-        category_products = Product.query.filter_by(company_id=company_id, category_id=category.id).all()
+        category_products = products_by_category.get(category.id)
         if category_products:  # Only add categories that have products
             product_choices_by_category[category.id] = {
                 'name': category.name,
@@ -177,13 +183,19 @@ def new_sale():
                 product_choices=product_choices_by_category
             )
         
-        # Create new sale
+        # Create new sale, copying the names the rollup and analytics group by
+        store = Store.query.filter_by(id=form.store_id.data, company_id=company_id).first()
+        product = Product.query.filter_by(id=form.product_id.data, company_id=company_id).first()
         new_sale = Sale(
             company_id=company_id,
             user_id=current_user.id,
             store_id=form.store_id.data,
+            store_name=store.name if store else 'Unknown Store',
             product_id=form.product_id.data,
+            product_category=product.category.name if product and product.category else 'Unknown Category',
+            product_name=product.name if product else 'Unknown Product',
             quantity=form.quantity.data,
+            total=total_amount,
             cash_amount=form.cash_amount.data,
             card_amount=form.card_amount.data,
             notes=form.notes.data if form.notes.data else None,
@@ -191,6 +203,7 @@ def new_sale():
         )
         db.session.add(new_sale)
         db.session.flush()  # Get the sale ID without committing
+        SalesRollupService.add_sale(new_sale)
         
         # Process embellishments
         embellishment_ids = request.form.getlist('embellishment_ids')
@@ -248,12 +261,15 @@ def edit_sale(sale_id):
     form = SaleEntryForm(obj=sale)
     
     # Get product choices grouped by category
+    products_by_category = {}
+    for product in Product.query.filter_by(company_id=company_id).order_by(Product.id).all():
+        products_by_category.setdefault(product.category_id, []).append(product)
+
     product_choices_by_category = {}
     for category in categories:
-        category_products = Product.query.filter_by(company_id=company_id, category_id=category.id).all()
         product_choices_by_category[category.id] = {
             'name': category.name,
-            'products': [(product.id, product.name) for product in category_products]
+            'products': [(product.id, product.name) for product in products_by_category.get(category.id, [])]
         }
     
     # Set the product's category for the form
@@ -278,14 +294,34 @@ def edit_sale(sale_id):
         available_embellishments = product.embellishments
     
     if form.validate_on_submit():
+        # Take the old values out of the rollup before changing them
+        SalesRollupService.remove_sale(sale)
+        
         # Update the sale
         sale.store_id = form.store_id.data
         sale.product_id = form.product_id.data
         sale.quantity = form.quantity.data
         sale.cash_amount = form.cash_amount.data
         sale.card_amount = form.card_amount.data
+        sale.total = sale.cash_amount + sale.card_amount
         sale.notes = form.notes.data if form.notes.data else None
         
+        # Keep the denormalised names in step with the linked store and product
+        store = Store.query.filter_by(id=sale.store_id, company_id=company_id).first()
+        if store:
+            sale.store_name = store.name
+        edited_product = Product.query.filter_by(id=sale.product_id, company_id=company_id).first()
+        if edited_product:
+            sale.product_name = edited_product.name
+            if edited_product.category:
+                sale.product_category = edited_product.category.name
+        
+        SalesRollupService.add_sale(sale)
+        
+        # Embellishment changes do not touch the sales row itself, so stamp it
+        # explicitly for watermark-based readers (analytics snapshots)
+        sale.updated_at = datetime.utcnow()
+        
         # Update embellishments
         sale.embellishments = []
         embellishment_ids = request.form.getlist('embellishment_ids')
@@ -324,7 +360,10 @@ def delete_sale(sale_id):
     # Get the sale and check if it belongs to the user's company
     sale = Sale.query.filter_by(id=sale_id, company_id=company_id).first_or_404()
     
-    # Delete the sale
+    # Delete the sale and its rollup contribution together, leaving a
+    # tombstone for incremental readers (analytics snapshots)
+    SalesRollupService.remove_sale(sale)
+    SaleTombstone.record(sale)
     db.session.delete(sale)
     db.session.commit()
     
@@ -340,8 +379,9 @@ def locations():
     
     # Get sales grouped by store
     stores = Store.query.filter_by(company_id=company_id).all()
+    sale_counts = Store.sale_counts(company_id)
     
-    return render_template('sales/locations.html', stores=stores)
+    return render_template('sales/locations.html', stores=stores, sale_counts=sale_counts)
 
 @sales_bp.route('/api/products/<int:category_id>')
 @login_required
@@ -350,13 +390,17 @@ def get_products(category_id):
     """Get products for a specific category (AJAX endpoint)"""
     company_id = current_user.company_id
     
-    products = Product.query.filter_by(
-        company_id=company_id,
-        category_id=category_id
-    ).all()
+    def build():
+        products = Product.query.filter_by(
+            company_id=company_id,
+            category_id=category_id
+        ).all()
+        
+        product_list = [{'id': p.id, 'name': p.name} for p in products]
+        return jsonify(product_list)
     
-    product_list = [{'id': p.id, 'name': p.name} for p in products]
-    return jsonify(product_list)
+    etag = version_etag('products', company_id, CompanyDataVersion.catalog_version_for(company_id), category_id)
+    return conditional_response(etag, build)
 
 @sales_bp.route('/export')
 @login_required
@@ -395,16 +439,20 @@ def export_sales():
         # Create export service
         export_service = SalesImportExportService(company_id)
         
-        # Generate CSV content
-        csv_content = export_service.export_sales_to_csv(start_date, end_date)
-        
-        # Create response
-        output = io.StringIO(csv_content)
-        response = make_response(output.getvalue())
+        # Stream the CSV; the first chunk is read here so errors still redirect
+        progress_id = request.args.get('progress_id', '')[:64]
+        if progress_id:
+            # The export page follows this download through export_events
+            chunks = export_service.iter_sales_csv_with_progress(
+                start_date, end_date, export_progress_callback(company_id, progress_id)
+            )
+        else:
+            chunks = export_service.iter_sales_csv(start_date, end_date)
+        first_chunk = next(chunks, '')
+        response = Response(stream_with_context(chain([first_chunk], chunks)), mimetype='text/csv')
         
         # Set headers for file download
         filename = f"sales_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        response.headers['Content-Type'] = 'text/csv'
         response.headers['Content-Disposition'] = f'attachment; filename={filename}'
         
         flash('Sales data exported successfully.', 'success')
@@ -414,6 +462,74 @@ def export_sales():
         flash(f'Error exporting sales data: {str(e)}', 'error')
         return redirect(url_for('sales.export_form'))
 
+def export_event_key(company_id, progress_id):
+    """progress_events key for a company's export download"""
+    return f'export:{company_id}:{progress_id}'
+
+def export_progress_callback(company_id, progress_id):
+    """
+    Callback publishing export progress, with throughput, to progress_events
+    and saving it on the ExportProgress row, so export_events works from any worker
+    """
+    event_key = export_event_key(company_id, progress_id)
+    started = time.monotonic()
+    saved = {'at': None, 'progress': None}
+    
+    def publish(progress, status, detail, processed=0, total=None, state='running'):
+        now = time.monotonic()
+        elapsed = now - started
+        data = {
+            'state': state,
+            'progress': progress,
+            'status': status,
+            'detail': detail,
+            'processed_rows': processed,
+            'total_rows': total,
+            'rows_per_second': round(processed / elapsed, 1) if processed and elapsed > 0 else None
+        }
+        # Chunks go by many times a second; save new percentages at most once a second
+        if (state != 'running' or saved['at'] is None
+                or (progress != saved['progress'] and now - saved['at'] >= EXPORT_PROGRESS_SAVE_SECONDS)):
+            ExportProgress.save(company_id, progress_id, data)
+            saved.update(at=now, progress=progress)
+        progress_events.publish(event_key, data)
+    
+    return publish
+
+@sales_bp.route('/export/events')
+@login_required
+@company_required
+def export_events():
+    """Stream export download progress as Server-Sent Events"""
+    if current_user.role_company != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    progress_id = request.args.get('progress_id', '')[:64]
+    if not progress_id:
+        return jsonify({'error': 'No export specified'}), 400
+    
+    company_id = current_user.company_id
+    event_key = export_event_key(company_id, progress_id)
+    
+    def read_state():
+        # The worker serving the download has the latest state in memory; others read the saved row
+        state = progress_events.latest(event_key)[1]
+        if state is None:
+            state = ExportProgress.state_for(company_id, progress_id)
+            # Give the connection back to the pool between updates
+            db.session.rollback()
+        return state
+    
+    return event_stream_response(progress_events.stream(event_key, read_state))
+
+def event_stream_response(messages):
+    """Response sending SSE messages as they are produced"""
+    response = Response(stream_with_context(messages), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @sales_bp.route('/export/form')
 @login_required
 @company_required
@@ -448,33 +564,25 @@ def import_sales():
     
     # Handle confirmed import (from preview page)
     if action == 'import':
-        csv_content = request.form.get('csv_content', '')
+        job = import_staging.get(company_id, request.form.get('import_id'))
         
-        if not csv_content:
+        if not job:
             flash('No CSV data found for import. Please try uploading the file again.', 'error')
             return render_template('sales/import_form.html')
         
-        # Store CSV content in temporary file instead of session
-        import_id = str(uuid.uuid4())
-        temp_dir = tempfile.gettempdir()
-        temp_file_path = os.path.join(temp_dir, f'import_{import_id}.csv')
+        # Queue the staged upload and hand it to the workers. Only one import
+        # per company at a time: if another one is queued or running, this
+        # upload stays staged and the progress page shows the other one.
+        job_id = job.id
+        active = import_job_runner.enqueue(job)
+        if active is not None and active.id != job_id:
+            flash('An import is already running for your company. Please wait for it to finish.', 'error')
+            return redirect(url_for('sales.import_progress', job_id=active.id))
+        if active is not None:
+            session['import_job_id'] = job_id
         
-        try:
-            with open(temp_file_path, 'w', encoding='utf-8') as f:
-                f.write(csv_content)
-            
-            # Store only the import ID and metadata in session
-            session['import_id'] = import_id
-            session['import_user_id'] = current_user.id
-            session['import_company_id'] = company_id
-            session['import_temp_file'] = temp_file_path
-            
-            # Redirect to progress page
-            return redirect(url_for('sales.import_progress'))
-            
-        except Exception as e:
-            flash(f'Error preparing import: {str(e)}', 'error')
-            return render_template('sales/import_form.html')
+        # Redirect to progress page
+        return redirect(url_for('sales.import_progress', job_id=job_id))
     
     # Handle file upload for preview
     elif action == 'preview':
@@ -482,36 +590,11 @@ def import_sales():
         csv_content_from_form = request.form.get('csv_content', '').strip()
         if csv_content_from_form:
             try:
-                # Create import service
-                import_service = SalesImportExportService(company_id)
-                
-                # Validate CSV format first
-                is_valid, validation_errors = import_service.validate_csv_format(csv_content_from_form)
-                
-                if not is_valid:
-                    flash('CSV validation failed:', 'error')
-                    for error in validation_errors:
-                        flash(f'• {error}', 'error')
-                    return render_template('sales/import_form.html')
-                
-                # Show preview of first few rows
-                import csv
-                import io as csv_io
-                csv_reader = csv.DictReader(csv_io.StringIO(csv_content_from_form))
-                preview_rows = []
-                total_rows = 0
-                for i, row in enumerate(csv_reader):
-                    total_rows += 1
-                    if i < 5:  # Show first 5 rows
-                        preview_rows.append(row)
-                
-                return render_template('sales/import_preview.html', 
-                                     preview_rows=preview_rows,
-                                     headers=import_service.CSV_HEADERS,
-                                     csv_content=csv_content_from_form,
-                                     total_rows=total_rows)
-                
+                job = import_staging.stage(io.BytesIO(csv_content_from_form.encode('utf-8')),
+                                           company_id, current_user.id)
+                return redirect(url_for('sales.import_preview', import_id=job.id))
             except Exception as e:
+                db.session.rollback()
                 flash(f'Error processing CSV data: {str(e)}', 'error')
                 return render_template('sales/import_form.html')
         
@@ -530,39 +613,12 @@ def import_sales():
             return render_template('sales/import_form.html')
         
         try:
-            # Read file content
-            csv_content = file.read().decode('utf-8')
-            
-            # Create import service
-            import_service = SalesImportExportService(company_id)
-            
-            # Validate CSV format first
-            is_valid, validation_errors = import_service.validate_csv_format(csv_content)
-            
-            if not is_valid:
-                flash('CSV validation failed:', 'error')
-                for error in validation_errors:
-                    flash(f'• {error}', 'error')
-                return render_template('sales/import_form.html')
-            
-            # Show preview of first few rows
-            import csv
-            import io as csv_io
-            csv_reader = csv.DictReader(csv_io.StringIO(csv_content))
-            preview_rows = []
-            total_rows = 0
-            for i, row in enumerate(csv_reader):
-                total_rows += 1
-                if i < 5:  # Show first 5 rows
-                    preview_rows.append(row)
-            
-            return render_template('sales/import_preview.html', 
-                                 preview_rows=preview_rows,
-                                 headers=import_service.CSV_HEADERS,
-                                 csv_content=csv_content,
-                                 total_rows=total_rows)
+            # Copy the file into the staging area and preview it from there
+            job = import_staging.stage(file.stream, company_id, current_user.id)
+            return redirect(url_for('sales.import_preview', import_id=job.id))
             
         except Exception as e:
+            db.session.rollback()
             flash(f'Error processing file: {str(e)}', 'error')
             return render_template('sales/import_form.html')
     
@@ -570,105 +626,87 @@ def import_sales():
     flash('Invalid request. Please try again.', 'error')
     return render_template('sales/import_form.html')
 
-@sales_bp.route('/import/progress')
+@sales_bp.route('/import/upload', methods=['POST'])
 @login_required
 @company_required
-def import_progress():
-    """Show import progress page"""
+def upload_import():
+    """Stage a CSV sent as the raw request body (Admin only)"""
     if current_user.role_company != 'admin':
-        flash('Only company administrators can import sales data.', 'error')
-        return redirect(url_for('sales.index'))
+        return jsonify({'error': 'Unauthorized'}), 403
     
-    # Check if we have import data in session
-    if 'import_id' not in session:
-        flash('No import data found. Please start the import process again.', 'error')
-        return redirect(url_for('sales.import_sales'))
+    try:
+        # Written to disk chunk by chunk as it arrives, never held in memory
+        job = import_staging.stage(request.stream, current_user.company_id, current_user.id)
+    except RequestEntityTooLarge:
+        return jsonify({'error': 'The file is too large to import.'}), 413
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Error processing file: {str(e)}'}), 500
     
-    return render_template('sales/import_progress.html')
+    return jsonify({
+        'import_id': job.id,
+        'preview_url': url_for('sales.import_preview', import_id=job.id)
+    })
 
-@sales_bp.route('/import/execute', methods=['POST'])
+@sales_bp.route('/import/preview/<import_id>')
 @login_required
 @company_required
-def execute_import():
-    """Execute the actual import with progress updates"""
-    if current_user.role_company != 'admin':
-        return jsonify({'error': 'Unauthorized'}), 403
-    
-    # Get import data from session
-    import_id = session.get('import_id')
-    temp_file_path = session.get('import_temp_file')
-    user_id = session.get('import_user_id')
-    company_id = session.get('import_company_id')
+def import_preview(import_id):
+    """Preview the head of a staged upload before importing it (Admin only)"""
+    company_id = current_user.company_id
     
-    if not import_id or not temp_file_path or not user_id or not company_id:
-        return jsonify({'error': 'No import data found'}), 400
+    if current_user.role_company != 'admin':
+        flash('Only company administrators can import sales data.', 'error')
+        return redirect(url_for('sales.index'))
     
-    # Read CSV content from temporary file
-    try:
-        with open(temp_file_path, 'r', encoding='utf-8') as f:
-            csv_content = f.read()
-    except Exception as e:
-        return jsonify({'error': f'Error reading import file: {str(e)}'}), 400
+    job = import_staging.get(company_id, import_id)
+    if not job:
+        flash('No CSV data found for import. Please try uploading the file again.', 'error')
+        return redirect(url_for('sales.import_sales'))
     
     try:
-        # Initialize progress tracking
-        session['import_progress'] = 0
-        session['import_status'] = 'Starting import...'
-        session['import_detail'] = 'Preparing to process data'
-        
-        # Create import service
         import_service = SalesImportExportService(company_id)
         
-        # Count total rows for progress calculation
-        import csv
-        import io as csv_io
-        csv_reader = csv.DictReader(csv_io.StringIO(csv_content))
-        total_rows = sum(1 for _ in csv_reader)
-        session['import_total_rows'] = total_rows
-        
-        # Execute import with progress tracking
-        successful, failed, errors = import_service.import_sales_with_progress(
-            csv_content, user_id, progress_callback=update_import_progress
-        )
-        
-        # Final progress update
-        session['import_progress'] = 100
-        session['import_status'] = 'Import Complete!'
-        session['import_detail'] = f'Processed {successful + failed} records'
+        # Validate the CSV format and show the first few rows
+        with import_staging.open(job) as csv_file:
+            is_valid, validation_errors, preview_rows = import_service.preview_csv(csv_file)
         
-        # Store results in session
-        session['import_results'] = {
-            'successful': successful,
-            'failed': failed,
-            'errors': errors[:10]
-        }
+        if not is_valid:
+            import_staging.discard(job)
+            flash('CSV validation failed:', 'error')
+            for error in validation_errors:
+                flash(f'• {error}', 'error')
+            return render_template('sales/import_form.html')
         
-        return jsonify({
-            'success': True,
-            'successful': successful,
-            'failed': failed,
-            'errors': errors[:10]  # Limit errors shown
-        })
+        return render_template('sales/import_preview.html', 
+                             preview_rows=preview_rows,
+                             headers=import_service.CSV_HEADERS,
+                             import_id=job.id,
+                             total_rows=job.total_rows)
         
     except Exception as e:
-        session['import_progress'] = 0
-        session['import_status'] = 'Import Failed'
-        session['import_detail'] = str(e)
-        return jsonify({'error': str(e)}), 500
-    finally:
-        # Clean up temporary file
-        try:
-            if temp_file_path and os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
-        except Exception:
-            pass  # Ignore cleanup errors
+        flash(f'Error processing file: {str(e)}', 'error')
+        return render_template('sales/import_form.html')
 
-def update_import_progress(progress, status, detail=None):
-    """Callback function to update import progress in session"""
-    session['import_progress'] = progress
-    session['import_status'] = status
-    if detail:
-        session['import_detail'] = detail
+@sales_bp.route('/import/progress')
+@login_required
+@company_required
+def import_progress():
+    """Show import progress page"""
+    if current_user.role_company != 'admin':
+        flash('Only company administrators can import sales data.', 'error')
+        return redirect(url_for('sales.index'))
+    
+    # Check that the import job exists
+    job_id = request.args.get('job_id') or session.get('import_job_id')
+    job = ImportJob.query.filter_by(id=job_id, company_id=current_user.company_id).first() if job_id else None
+    if not job:
+        flash('No import data found. Please start the import process again.', 'error')
+        return redirect(url_for('sales.import_sales'))
+    
+    return render_template('sales/import_progress.html', job_id=job.id)
 
 @sales_bp.route('/import/status')
 @login_required
@@ -678,41 +716,41 @@ def import_status():
     if current_user.role_company != 'admin':
         return jsonify({'error': 'Unauthorized'}), 403
     
-    # Get real progress from session
-    progress = session.get('import_progress', 0)
-    status = session.get('import_status', 'Initializing...')
-    detail = session.get('import_detail', 'Starting import process')
-    results = session.get('import_results')
-    
-    response = {
-        'progress': progress,
-        'status': status,
-        'detail': detail
-    }
-    
-    # Include results if import is complete
-    if results:
-        response['results'] = results
-        # Clear session data after sending results
-        temp_file_path = session.pop('import_temp_file', None)
-        session.pop('import_id', None)
-        session.pop('import_user_id', None)
-        session.pop('import_company_id', None)
-        session.pop('import_progress', None)
-        session.pop('import_status', None)
-        session.pop('import_detail', None)
-        session.pop('import_results', None)
-        session.pop('import_total_rows', None)
-        
-        # Clean up temporary file
-        try:
-            if temp_file_path and os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
-        except Exception:
-            pass  # Ignore cleanup errors
+    # Progress is saved on the job row by the worker after every batch
+    job_id = request.args.get('job_id') or session.get('import_job_id')
+    job = import_job_runner.company_job(current_user.company_id, job_id) if job_id else None
+    if not job:
+        return jsonify({'error': 'No import data found'}), 404
+    
+    response = job.to_dict()
+    if job.is_finished and session.get('import_job_id') == job.id:
+        session.pop('import_job_id', None)
     
     return jsonify(response)
 
+@sales_bp.route('/import/events')
+@login_required
+@company_required
+def import_events():
+    """Stream import progress (batches, errors, rows/sec) as Server-Sent Events"""
+    if current_user.role_company != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    company_id = current_user.company_id
+    job_id = request.args.get('job_id') or session.get('import_job_id')
+    job = import_job_runner.company_job(company_id, job_id) if job_id else None
+    if not job:
+        return jsonify({'error': 'No import data found'}), 404
+    
+    def read_state():
+        job = ImportJob.query.filter_by(id=job_id, company_id=company_id).first()
+        state = job.to_dict() if job else None
+        # Give the connection back to the pool between updates
+        db.session.rollback()
+        return state
+    
+    return event_stream_response(progress_events.stream(import_job_runner.event_key(job_id), read_state))
+
 @sales_bp.route('/import/template')
 @login_required
 @company_required
@@ -51,13 +51,7 @@ def index():
     ).all()
     
     # Get permissions for each team member
-    member_permissions = {}
-    for member in team_members:
-        permissions = UserPermissions.query.filter_by(
-            user_id=member.id, 
-            company_id=company.id
-        ).first()
-        member_permissions[member.id] = permissions
+    member_permissions = UserPermissions.for_users([member.id for member in team_members], company.id)
     
     # Get stores for permission context
     stores = Store.query.filter_by(company_id=company.id).all()
@@ -314,11 +308,9 @@ def bulk_actions():
             # Bulk permission update
             data_range = request.form.get('bulk_data_range_access')
             
+            member_permissions = UserPermissions.for_users([member.id for member in members], company.id)
             for member in members:
-                permissions = UserPermissions.query.filter_by(
-                    user_id=member.id, 
-                    company_id=company.id
-                ).first()
+                permissions = member_permissions[member.id]
                 
                 if not permissions:
                     permissions = UserPermissions(
@@ -341,12 +333,10 @@ def bulk_actions():
                 flash('Cannot remove all team members. At least one member must remain.', 'error')
                 return redirect(url_for('team.index'))
             
+            member_permissions = UserPermissions.for_users([member.id for member in members], company.id)
             for member in members:
                 # Remove permissions
-                permissions = UserPermissions.query.filter_by(
-                    user_id=member.id, 
-                    company_id=company.id
-                ).first()
+                permissions = member_permissions[member.id]
                 if permissions:
                     db.session.delete(permissions)
                 
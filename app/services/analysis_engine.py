@@ -1,9 +1,13 @@
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
+from __future__ import annotations
+
 from typing import Dict, List, Any, Optional, Tuple
 import io
 import base64
+from app.utils.lazy_import import LazyModule
+
+pd = LazyModule('pandas')
+np = LazyModule('numpy')
+plt = LazyModule('matplotlib.pyplot')
 
 class AnalysisEngine:
     """
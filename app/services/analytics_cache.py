@@ -0,0 +1,104 @@
+"""
+Analytics Cache
+Size-bounded LRU cache for computed analytics results and their charts
+"""
+
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from app.models.data_version import CompanyDataVersion
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class AnalyticsCache:
+    """
+    In-process LRU cache keyed by (company_id, analysis type, start_date,
+    end_date, data version).
+
+    Values are stored pickled, which both bounds the cache by real byte size
+    and hands every caller its own copy. The data version is the company's
+    sales and catalog versions (embellishment names come from the catalog),
+    so any sales write or catalog change makes old entries unreachable; they
+    are then evicted as newer entries push them out.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Hashable, bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_bytes = app.config.get('ANALYTICS_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+
+    @staticmethod
+    def make_key(company_id: int, analysis_type: str, start_date, end_date, version: Hashable) -> Tuple:
+        return (company_id, analysis_type, str(start_date), str(end_date), version)
+
+    @staticmethod
+    def data_version(company_id: int) -> Tuple[int, int]:
+        """Version of everything cached analytics depend on; also used for their ETags"""
+        return CompanyDataVersion.versions_for(company_id)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return pickle.loads(payload)
+
+    def set(self, key: Hashable, value: Any):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= len(previous)
+            self._entries[key] = payload
+            self.current_bytes += len(payload)
+
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def get_or_compute(self, company_id: int, analysis_type: str, start_date, end_date,
+                       compute: Callable[[], Any]) -> Any:
+        """
+        Return the cached result for the current data version, computing it on a miss
+
+        Args:
+            company_id: Company the analysis belongs to
+            analysis_type: Name of the analysis (e.g. 'stores', 'dashboard')
+            start_date: Start of the date range
+            end_date: End of the date range
+            compute: Zero-argument callable producing the result
+
+        Returns:
+            The cached or freshly computed result
+        """
+        version = self.data_version(company_id)
+        key = self.make_key(company_id, analysis_type, start_date, end_date, version)
+
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.set(key, result)
+        return result
+
+
+analytics_cache = AnalyticsCache()
@@ -0,0 +1,229 @@
+"""
+Analytics Charts
+Rendering of the chart specs produced by AnalyticsService
+"""
+
+import base64
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import Any, Dict
+
+from app.services.request_metrics import request_metrics
+from app.utils.lazy_import import LazyModule
+
+# Only needed to draw PNGs, which mostly happens in the chart worker processes
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+sns = LazyModule('seaborn')
+
+# 'series' returns the chart spec itself (drawn client-side),
+# 'png' returns a base64 encoded PNG rendered on the server
+CHART_FORMATS = ('series', 'png')
+DEFAULT_CHART_FORMAT = 'series'
+
+DEFAULT_WORKERS = 0
+DEFAULT_TIMEOUT = 30
+
+DEFAULT_FIGSIZES = {
+    'bar': (10, 6),
+    'histogram': (10, 6),
+    'line': (12, 6),
+    'pie': (8, 8),
+    'heatmap': (10, 6),
+    'scatter': (10, 6),
+    'grid': (15, 10),
+}
+
+PALETTE = 'husl'
+
+
+def render_chart_png(spec: Dict[str, Any]) -> str:
+    """
+    Render a chart spec to a base64 encoded PNG
+
+    Uses the object-oriented Figure API only, so no pyplot global state is
+    touched and the function is safe to call from any thread or process.
+
+    Args:
+        spec: Chart spec as built by AnalyticsService (type, title, labels,
+            values, groups, ...)
+
+    Returns:
+        Base64 string suitable for a data:image/png URI
+    """
+    from matplotlib.figure import Figure
+
+    if spec['type'] == 'grid':
+        rows, cols = spec.get('shape', (2, 2))
+        fig = Figure(figsize=DEFAULT_FIGSIZES['grid'])
+        axes = fig.subplots(rows, cols)
+        for ax, panel in zip(np.ravel(axes), spec['panels']):
+            _draw(ax, panel)
+    else:
+        fig = Figure(figsize=DEFAULT_FIGSIZES[spec['type']])
+        _draw(fig.subplots(), spec)
+
+    fig.tight_layout()
+    buffer = BytesIO()
+    fig.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
+    image_png = buffer.getvalue()
+    buffer.close()
+
+    return base64.b64encode(image_png).decode('utf-8')
+
+
+def _colors(count):
+    return sns.color_palette(PALETTE, max(count, 1))
+
+
+def _draw(ax, spec: Dict[str, Any]):
+    """Draw one chart spec onto a matplotlib axis"""
+    ax.set_title(spec.get('title', ''))
+
+    if not spec.get('labels'):
+        ax.text(0.5, 0.5, spec.get('empty_message', 'No data available'), transform=ax.transAxes,
+                ha='center', va='center', fontsize=12)
+        return
+
+    chart_type = spec['type']
+    if chart_type == 'bar':
+        _draw_bar(ax, spec)
+    elif chart_type == 'histogram':
+        edges = spec['bin_edges']
+        ax.bar(edges[:-1], spec['values'], width=np.diff(edges), align='edge',
+               alpha=0.7, edgecolor='black', color=_colors(1)[0])
+    elif chart_type == 'line':
+        _draw_line(ax, spec)
+    elif chart_type == 'pie':
+        ax.pie(spec['values'], labels=spec['labels'], autopct='%1.1f%%',
+               colors=_colors(len(spec['labels'])))
+    elif chart_type == 'heatmap':
+        matrix = pd.DataFrame([group['values'] for group in spec['groups']],
+                              index=[group['name'] for group in spec['groups']],
+                              columns=spec['labels'], dtype=float)
+        sns.heatmap(matrix, annot=True, fmt='.0f', cmap=spec.get('colormap', 'YlOrRd'), ax=ax)
+    elif chart_type == 'scatter':
+        _draw_scatter(ax, spec)
+    else:
+        raise ValueError(f"Unknown chart type: {chart_type}")
+
+    if spec.get('x_label'):
+        ax.set_xlabel(spec['x_label'])
+    if spec.get('y_label'):
+        ax.set_ylabel(spec['y_label'])
+    if spec.get('reference_line') is not None:
+        ax.axhline(y=spec['reference_line'], color='red', linestyle='--')
+    if spec.get('rotate_labels'):
+        ax.tick_params(axis='x', rotation=45)
+
+
+def _draw_bar(ax, spec):
+    palette = _colors(len(spec['labels']))
+    if spec.get('horizontal'):
+        sns.barplot(x=spec['values'], y=spec['labels'], orient='h', palette=palette, ax=ax)
+    else:
+        sns.barplot(x=spec['labels'], y=spec['values'], palette=palette, ax=ax)
+
+
+def _draw_line(ax, spec):
+    positions = range(len(spec['labels']))
+    if spec.get('groups'):
+        colors = _colors(len(spec['groups']))
+        for color, group in zip(colors, spec['groups']):
+            values = [np.nan if v is None else v for v in group['values']]
+            ax.plot(positions, values, marker='o', label=group['name'], color=color)
+        ax.legend()
+    else:
+        ax.plot(positions, spec['values'], marker='o', linewidth=spec.get('line_width', 1.5),
+                color=_colors(1)[0])
+    ax.set_xticks(list(positions))
+    ax.set_xticklabels(spec['labels'])
+
+
+def _draw_scatter(ax, spec):
+    sizes = np.asarray(spec.get('sizes') or [1] * len(spec['values']), dtype=float)
+    span = sizes.max() - sizes.min()
+    scaled = 50 + (sizes - sizes.min()) / span * 450 if span else np.full(len(sizes), 150.0)
+    ax.scatter(spec['x'], spec['values'], s=scaled, alpha=0.7, color=_colors(1)[0])
+    if spec.get('annotate'):
+        for label, x, y in zip(spec['labels'], spec['x'], spec['values']):
+            ax.annotate(label, (x, y))
+
+
+class ChartRenderer:
+    """
+    Renders chart specs to PNG in a bounded pool of worker processes.
+
+    All charts of one page are submitted together and rendered concurrently.
+    The pool is created lazily and shared by every request thread; with
+    ANALYTICS_CHART_WORKERS = 0 (the default outside ProductionConfig) charts
+    are rendered inline instead. Workers are spawned, so they import the
+    parent's __main__ module again: an entry point that builds the app at
+    import time without a __main__ guard would run its startup in every worker.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, timeout: int = DEFAULT_TIMEOUT):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_workers = app.config.get('ANALYTICS_CHART_WORKERS', DEFAULT_WORKERS)
+        self.timeout = app.config.get('ANALYTICS_CHART_TIMEOUT', DEFAULT_TIMEOUT)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a multi-threaded WSGI worker is not safe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def _reset_executor(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def shutdown(self):
+        self._reset_executor()
+
+    def render_many(self, specs: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+        """
+        Render several chart specs concurrently
+
+        Args:
+            specs: Mapping of chart name to chart spec
+
+        Returns:
+            Mapping of chart name to base64 PNG, in the same order
+        """
+        if not specs:
+            return {}
+        with request_metrics.timed('render'):
+            return self._render_many(specs)
+
+    def _render_many(self, specs: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+        if self.max_workers <= 0:
+            return {name: render_chart_png(spec) for name, spec in specs.items()}
+
+        try:
+            executor = self._get_executor()
+            futures = {name: executor.submit(render_chart_png, spec) for name, spec in specs.items()}
+            return {name: future.result(timeout=self.timeout) for name, future in futures.items()}
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM); start a fresh pool next time and render inline now
+            self._reset_executor()
+            return {name: render_chart_png(spec) for name, spec in specs.items()}
+
+    def render(self, spec: Dict[str, Any]) -> str:
+        return self.render_many({'chart': spec})['chart']
+
+
+chart_renderer = ChartRenderer()
@@ -1,178 +1,293 @@
-import pandas as pd
-import numpy as np
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime, timedelta
-import base64
-from io import BytesIO
 from sqlalchemy import func, desc, and_
 from app.models.sales import Sale
 from app.models.product import Product, Embellishment
 from app.models.store import Store
 from app.models.product_category import ProductCategory
+from app.services.sales_frame import SalesFrameLoader
+from app.services.sales_snapshot import sales_snapshot_for
+from app.services.sales_aggregates import SalesAggregates, RollupAggregates, FrameAggregates, DAY_NAMES, year_month_label
+from app.services.analytics_charts import CHART_FORMATS, DEFAULT_CHART_FORMAT, chart_renderer
 from flask_login import current_user
+from app.utils.lazy_import import LazyModule
+
+# The scientific stack is imported on first use, not when blueprints are registered
+pd = LazyModule('pandas')
+np = LazyModule('numpy')
+
+# Analyses that can be requested by type, mapped to the method computing them
+ANALYSIS_METHODS = {
+    'dashboard': 'get_dashboard_summary',
+    'stores': 'get_store_analytics',
+    'categories': 'get_category_analytics',
+    'products': 'get_product_analytics',
+    'payments': 'get_payment_analytics',
+    'embellishments': 'get_embellishment_analytics',
+    'days': 'get_day_analytics',
+    'months': 'get_monthly_analytics',
+    'reports': 'generate_reports'
+}
+
+# Analyses that need row-level sales rather than grouped totals
+FRAME_ANALYSES = ('embellishments', 'reports')
+
+# Analytics pages (their cache keys) and the date range each shows by default
+PAGE_DEFAULT_DAYS = {
+    'dashboard': 30,
+    'stores': 90,
+    'categories': 90,
+    'products': 90,
+    'payments': 90,
+    'embellishments': 90,
+    'time_analysis': 365,
+    'reports': 90
+}
 
 class AnalyticsService:
-    def __init__(self):
-        # Set up styling
-        plt.style.use('default')
-        sns.set_palette("husl")
+    def __init__(self, chart_format=DEFAULT_CHART_FORMAT):
+        """
+        Args:
+            chart_format: 'series' to return charts as plain label/value specs
+                drawn client-side, 'png' to render them to base64 PNGs
+                (emails, exports, legacy API clients)
+        """
+        if chart_format not in CHART_FORMATS:
+            raise ValueError(f"Unknown chart format: {chart_format}")
+        self.chart_format = chart_format
         
     def get_company_sales_data(self, company_id, start_date=None, end_date=None):
         """Get sales data for analytics as a pandas DataFrame"""
-        query = Sale.query.filter_by(company_id=company_id)
+        snapshot = sales_snapshot_for(company_id)
+        if snapshot is not None:
+            return snapshot.load(start_date, end_date)
+        return SalesFrameLoader(company_id).load(start_date, end_date)
+    
+    def get_sales_aggregates(self, company_id, start_date=None, end_date=None):
+        """Get grouped sales totals from the daily rollup table"""
+        return RollupAggregates(company_id, start_date, end_date)
+    
+    def run_analysis(self, analysis_type, df=None, aggregates=None):
+        """
+        Run one analysis by type
+        
+        Args:
+            analysis_type: Key of ANALYSIS_METHODS
+            df: Sales DataFrame (required for FRAME_ANALYSES)
+            aggregates: SalesAggregates to use for grouped analyses, built
+                from df when omitted
+        """
+        method = getattr(self, ANALYSIS_METHODS[analysis_type])
+        if analysis_type in FRAME_ANALYSES:
+            return method(df)
+        return method(aggregates if aggregates is not None else df)
+    
+    def compute_page(self, page, company_id, start_date=None, end_date=None):
+        """
+        Compute everything one analytics page (or one API analysis) shows
+        
+        Args:
+            page: Key of PAGE_DEFAULT_DAYS or ANALYSIS_METHODS, also the
+                page's cache key
+        
+        Returns:
+            The page's data, or {} when the range has no sales
+        """
+        aggregates, frame = self._sales_sources(company_id, start_date, end_date)
+        if page == 'time_analysis':
+            if aggregates().empty:
+                return {}
+            return {
+                'days': self.get_day_analytics(aggregates()),
+                'months': self.get_monthly_analytics(aggregates())
+            }
+        return self._compute(page, aggregates, frame)
+    
+    def batch_analyses(self, company_id, analysis_types, start_date=None, end_date=None):
+        """
+        Yield (analysis_type, compute) pairs that share their sales reads
+        
+        Each analysis is computed exactly as compute_page computes it, so a
+        result cached by either is the same. Grouped analyses share one
+        RollupAggregates (totals grouped for one are reused by the next) and
+        row-level ones one sales frame, loaded on the first compute() that
+        needs it. Callers that serve some types from a cache never read at all.
+        """
+        aggregates, frame = self._sales_sources(company_id, start_date, end_date)
+        for analysis_type in analysis_types:
+            yield analysis_type, (lambda analysis_type=analysis_type: self._compute(analysis_type, aggregates, frame))
+    
+    def _sales_sources(self, company_id, start_date, end_date):
+        """Loaders for the grouped totals and the sales frame, each read at most once"""
+        loaded = {}
         
-        if start_date:
-            query = query.filter(Sale.sale_date >= start_date)
-        if end_date:
-            query = query.filter(Sale.sale_date <= end_date)
-            
-        sales = query.all()
-        
-        data = []
-        for sale in sales:
-            embellishment_names = [emb.name for emb in sale.embellishments]
-            data.append({
-                'sale_id': sale.id,
-                'sale_date': sale.sale_date,
-                'store_name': sale.store_name,
-                'product_category': sale.product_category,
-                'product_name': sale.product_name,
-                'quantity': sale.quantity,
-                'total': float(sale.total_amount),
-                'card_amount': float(sale.card_amount or 0),
-                'cash_amount': float(sale.cash_amount or 0),
-                'payment_method': sale.payment_method,
-                'embellishments': ', '.join(embellishment_names) if embellishment_names else 'None',
-                'day_of_week': sale.sale_date.strftime('%A'),
-                'month': sale.sale_date.strftime('%B'),
-                'year': sale.sale_date.year
-            })
-        
-        return pd.DataFrame(data)
+        def aggregates():
+            if 'aggregates' not in loaded:
+                loaded['aggregates'] = self.get_sales_aggregates(company_id, start_date, end_date)
+            return loaded['aggregates']
+        
+        def frame():
+            if 'df' not in loaded:
+                loaded['df'] = self.get_company_sales_data(company_id, start_date, end_date)
+            return loaded['df']
+        
+        return aggregates, frame
+    
+    def _compute(self, analysis_type, aggregates, frame):
+        """One analysis from the shared sources; {} when the range has no sales"""
+        if aggregates().empty:
+            return {}
+        if analysis_type in FRAME_ANALYSES:
+            return self.run_analysis(analysis_type, df=frame())
+        return self.run_analysis(analysis_type, aggregates=aggregates())
+    
+    def _aggregates(self, data):
+        """Accept either SalesAggregates or a sales DataFrame"""
+        if isinstance(data, SalesAggregates):
+            return data
+        return FrameAggregates(data)
+    
+    def _render_charts(self, charts):
+        """Return chart specs in the service's chart format, rendering PNGs concurrently"""
+        if self.chart_format == 'png':
+            return chart_renderer.render_many(charts)
+        return charts
+    
+    @staticmethod
+    def _values(series):
+        """JSON-safe list of numbers rounded to cents (NaN becomes None)"""
+        return [None if pd.isna(v) else round(v, 2) for v in pd.Series(series).astype(float).tolist()]
+    
+    @staticmethod
+    def _labels(series):
+        return [str(v) for v in series]
     
-    def _create_chart(self, fig, title):
-        """Convert matplotlib figure to base64 string"""
-        plt.tight_layout()
-        buffer = BytesIO()
-        fig.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
-        buffer.seek(0)
-        image_png = buffer.getvalue()
-        buffer.close()
-        plt.close(fig)
-        
-        graphic = base64.b64encode(image_png)
-        graphic = graphic.decode('utf-8')
-        return graphic
+    def _grouped_series(self, frame, x, group, value='total_revenue'):
+        """Labels plus one values list per group, with x in order of appearance"""
+        pivot = frame.pivot_table(values=value, index=x, columns=group, aggfunc='sum', sort=False)
+        return self._labels(pivot.index), [
+            {'name': str(name), 'values': self._values(pivot[name])} for name in pivot.columns
+        ]
+    
+    def _heatmap_groups(self, pivot):
+        return [{'name': str(name), 'values': self._values(row)} for name, row in pivot.iterrows()]
     
     # SHOP ANALYTICS
-    def get_store_analytics(self, df):
+    def get_store_analytics(self, data):
         """Analytics for stores/shops"""
-        if df.empty:
+        aggregates = self._aggregates(data)
+        if aggregates.empty:
             return {}
             
-        store_stats = df.groupby('store_name').agg({
-            'total': ['sum', 'mean', 'count'],
-            'quantity': 'sum'
-        }).round(2)
-        
-        store_stats.columns = ['total_revenue', 'avg_sale', 'total_transactions', 'total_quantity']
-        store_stats = store_stats.reset_index()
+        store_stats = aggregates.group('store_name')
+        store_stats.insert(2, 'avg_sale', store_stats['total_revenue'] / store_stats['total_transactions'])
+        store_stats = store_stats.round(2)
         
         # Charts
         charts = {}
         
         # 1. Revenue by Store (Bar Chart)
-        fig, ax = plt.subplots(figsize=(10, 6))
-        sns.barplot(data=store_stats, x='store_name', y='total_revenue', ax=ax)
-        ax.set_title('Total Revenue by Store')
-        ax.set_xlabel('Store')
-        ax.set_ylabel('Revenue ($)')
-        plt.xticks(rotation=45)
-        charts['revenue_bar'] = self._create_chart(fig, 'Revenue by Store')
+        charts['revenue_bar'] = {
+            'type': 'bar',
+            'title': 'Total Revenue by Store',
+            'labels': self._labels(store_stats['store_name']),
+            'values': self._values(store_stats['total_revenue']),
+            'x_label': 'Store',
+            'y_label': 'Revenue ($)',
+            'rotate_labels': True
+        }
         
         # 2. Store Performance Heatmap
-        fig, ax = plt.subplots(figsize=(8, 6))
-        pivot_data = df.pivot_table(values='total', index='store_name', columns='month', aggfunc='sum', fill_value=0)
-        sns.heatmap(pivot_data, annot=True, fmt='.0f', cmap='YlOrRd', ax=ax)
-        ax.set_title('Store Performance Heatmap (Revenue by Month)')
-        charts['store_heatmap'] = self._create_chart(fig, 'Store Heatmap')
+        pivot_data = aggregates.group('store_name', 'year_month').pivot_table(
+            values='total_revenue', index='store_name', columns='year_month', aggfunc='sum', fill_value=0)
+        pivot_data.columns = [year_month_label(key) for key in pivot_data.columns]
+        charts['store_heatmap'] = {
+            'type': 'heatmap',
+            'title': 'Store Performance Heatmap (Revenue by Month)',
+            'labels': self._labels(pivot_data.columns),
+            'groups': self._heatmap_groups(pivot_data),
+            'colormap': 'YlOrRd'
+        }
         
         # 3. Store Revenue Distribution (Pie Chart)
-        fig, ax = plt.subplots(figsize=(8, 8))
-        ax.pie(store_stats['total_revenue'], labels=store_stats['store_name'], autopct='%1.1f%%')
-        ax.set_title('Revenue Distribution by Store')
-        charts['revenue_pie'] = self._create_chart(fig, 'Revenue Distribution')
+        charts['revenue_pie'] = {
+            'type': 'pie',
+            'title': 'Revenue Distribution by Store',
+            'labels': self._labels(store_stats['store_name']),
+            'values': self._values(store_stats['total_revenue'])
+        }
         
         return {
             'stats': store_stats.to_dict('records'),
-            'charts': charts,
+            'charts': self._render_charts(charts),
             'peak_store': store_stats.loc[store_stats['total_revenue'].idxmax(), 'store_name'],
             'worst_store': store_stats.loc[store_stats['total_revenue'].idxmin(), 'store_name']
         }
     
     # CATEGORY ANALYTICS
-    def get_category_analytics(self, df):
+    def get_category_analytics(self, data):
         """Analytics for product categories"""
-        if df.empty:
+        aggregates = self._aggregates(data)
+        if aggregates.empty:
             return {}
             
-        category_stats = df.groupby('product_category').agg({
-            'total': ['sum', 'mean', 'count'],
-            'quantity': 'sum'
-        }).round(2)
-        
-        category_stats.columns = ['total_revenue', 'avg_sale', 'total_transactions', 'total_quantity']
-        category_stats = category_stats.reset_index()
+        category_stats = aggregates.group('product_category')
+        category_stats.insert(2, 'avg_sale', category_stats['total_revenue'] / category_stats['total_transactions'])
+        category_stats = category_stats.round(2)
         
         charts = {}
         
         # 1. Category Performance (Horizontal Bar)
-        fig, ax = plt.subplots(figsize=(10, 6))
-        sns.barplot(data=category_stats, y='product_category', x='total_revenue', ax=ax)
-        ax.set_title('Revenue by Product Category')
-        ax.set_xlabel('Revenue ($)')
-        charts['category_bar'] = self._create_chart(fig, 'Category Revenue')
+        charts['category_bar'] = {
+            'type': 'bar',
+            'horizontal': True,
+            'title': 'Revenue by Product Category',
+            'labels': self._labels(category_stats['product_category']),
+            'values': self._values(category_stats['total_revenue']),
+            'x_label': 'Revenue ($)'
+        }
         
         # 2. Category Trends Over Time
-        fig, ax = plt.subplots(figsize=(12, 6))
-        monthly_category = df.groupby(['month', 'product_category'])['total'].sum().reset_index()
-        sns.lineplot(data=monthly_category, x='month', y='total', hue='product_category', ax=ax)
-        ax.set_title('Category Performance Trends by Month')
-        plt.xticks(rotation=45)
-        charts['category_trends'] = self._create_chart(fig, 'Category Trends')
+        monthly_category = aggregates.group('year_month', 'product_category')
+        monthly_category['year_month'] = monthly_category['year_month'].map(year_month_label)
+        months, groups = self._grouped_series(monthly_category, 'year_month', 'product_category')
+        charts['category_trends'] = {
+            'type': 'line',
+            'title': 'Category Performance Trends by Month',
+            'labels': months,
+            'groups': groups,
+            'rotate_labels': True
+        }
         
         # 3. Category Quantity vs Revenue Scatter
-        fig, ax = plt.subplots(figsize=(10, 6))
-        sns.scatterplot(data=category_stats, x='total_quantity', y='total_revenue', 
-                       size='total_transactions', sizes=(50, 500), ax=ax)
-        for i, row in category_stats.iterrows():
-            ax.annotate(row['product_category'], (row['total_quantity'], row['total_revenue']))
-        ax.set_title('Category Analysis: Quantity vs Revenue')
-        charts['category_scatter'] = self._create_chart(fig, 'Category Scatter')
+        charts['category_scatter'] = {
+            'type': 'scatter',
+            'title': 'Category Analysis: Quantity vs Revenue',
+            'labels': self._labels(category_stats['product_category']),
+            'x': self._values(category_stats['total_quantity']),
+            'values': self._values(category_stats['total_revenue']),
+            'sizes': self._values(category_stats['total_transactions']),
+            'x_label': 'total_quantity',
+            'y_label': 'total_revenue',
+            'annotate': True
+        }
         
         return {
             'stats': category_stats.to_dict('records'),
-            'charts': charts,
+            'charts': self._render_charts(charts),
             'peak_category': category_stats.loc[category_stats['total_revenue'].idxmax(), 'product_category'],
             'worst_category': category_stats.loc[category_stats['total_revenue'].idxmin(), 'product_category']
         }
     
     # PRODUCT ANALYTICS
-    def get_product_analytics(self, df):
+    def get_product_analytics(self, data):
         """Analytics for individual products"""
-        if df.empty:
+        aggregates = self._aggregates(data)
+        if aggregates.empty:
             return {}
             
-        product_stats = df.groupby('product_name').agg({
-            'total': ['sum', 'mean', 'count'],
-            'quantity': 'sum'
-        }).round(2)
-        
-        product_stats.columns = ['total_revenue', 'avg_sale', 'total_transactions', 'total_quantity']
-        product_stats = product_stats.reset_index()
+        product_stats = aggregates.group('product_name')
+        product_stats.insert(2, 'avg_sale', product_stats['total_revenue'] / product_stats['total_transactions'])
+        product_stats = product_stats.round(2)
         
         # Get top 10 and bottom 10
         top_products = product_stats.nlargest(10, 'total_revenue')
@@ -181,156 +296,178 @@ class AnalyticsService:
         charts = {}
         
         # 1. Top 10 Products (Bar Chart)
-        fig, ax = plt.subplots(figsize=(12, 6))
-        sns.barplot(data=top_products, x='total_revenue', y='product_name', ax=ax)
-        ax.set_title('Top 10 Products by Revenue')
-        ax.set_xlabel('Revenue ($)')
-        charts['top_products'] = self._create_chart(fig, 'Top Products')
+        charts['top_products'] = {
+            'type': 'bar',
+            'horizontal': True,
+            'title': 'Top 10 Products by Revenue',
+            'labels': self._labels(top_products['product_name']),
+            'values': self._values(top_products['total_revenue']),
+            'x_label': 'Revenue ($)'
+        }
         
         # 2. Product Performance Distribution
-        fig, ax = plt.subplots(figsize=(10, 6))
-        ax.hist(product_stats['total_revenue'], bins=20, alpha=0.7, edgecolor='black')
-        ax.set_title('Product Revenue Distribution')
-        ax.set_xlabel('Revenue ($)')
-        ax.set_ylabel('Number of Products')
-        charts['product_dist'] = self._create_chart(fig, 'Product Distribution')
+        charts['product_dist'] = self._histogram(
+            product_stats['total_revenue'], 20, 'Product Revenue Distribution',
+            'Revenue ($)', 'Number of Products')
         
         # 3. Product Sales Frequency
-        fig, ax = plt.subplots(figsize=(10, 6))
-        ax.hist(product_stats['total_transactions'], bins=15, alpha=0.7, edgecolor='black')
-        ax.set_title('Product Sales Frequency Distribution')
-        ax.set_xlabel('Number of Transactions')
-        ax.set_ylabel('Number of Products')
-        charts['frequency_dist'] = self._create_chart(fig, 'Frequency Distribution')
+        charts['frequency_dist'] = self._histogram(
+            product_stats['total_transactions'], 15, 'Product Sales Frequency Distribution',
+            'Number of Transactions', 'Number of Products')
         
         return {
             'top_products': top_products.to_dict('records'),
             'bottom_products': bottom_products.to_dict('records'),
             'total_products': len(product_stats),
-            'charts': charts,
+            'charts': self._render_charts(charts),
             'peak_product': product_stats.loc[product_stats['total_revenue'].idxmax(), 'product_name'],
             'worst_product': product_stats.loc[product_stats['total_revenue'].idxmin(), 'product_name']
         }
     
+    def _histogram(self, values, bins, title, x_label, y_label):
+        """Histogram spec with the bins computed server-side"""
+        counts, edges = np.histogram(values.astype(float), bins=bins)
+        return {
+            'type': 'histogram',
+            'title': title,
+            'labels': [f'{lo:,.0f}-{hi:,.0f}' for lo, hi in zip(edges[:-1], edges[1:])],
+            'values': counts.tolist(),
+            'bin_edges': edges.tolist(),
+            'x_label': x_label,
+            'y_label': y_label
+        }
+    
     # PAYMENT METHOD ANALYTICS
-    def get_payment_analytics(self, df):
+    def get_payment_analytics(self, data):
         """Analytics for cash vs card payments"""
-        if df.empty:
+        aggregates = self._aggregates(data)
+        if aggregates.empty:
             return {}
             
-        payment_stats = df.groupby('payment_method').agg({
-            'total': ['sum', 'mean', 'count']
-        }).round(2)
-        
-        payment_stats.columns = ['total_revenue', 'avg_transaction', 'transaction_count']
-        payment_stats = payment_stats.reset_index()
+        payment_stats = aggregates.group('payment_method')
+        payment_stats['avg_transaction'] = payment_stats['total_revenue'] / payment_stats['total_transactions']
+        payment_stats = payment_stats.rename(columns={'total_transactions': 'transaction_count'})
+        payment_stats = payment_stats[['payment_method', 'total_revenue', 'avg_transaction', 'transaction_count']].round(2)
         
         charts = {}
         
         # 1. Payment Method Distribution (Pie Chart)
-        fig, ax = plt.subplots(figsize=(8, 8))
-        ax.pie(payment_stats['total_revenue'], labels=payment_stats['payment_method'], autopct='%1.1f%%')
-        ax.set_title('Revenue by Payment Method')
-        charts['payment_pie'] = self._create_chart(fig, 'Payment Distribution')
+        charts['payment_pie'] = {
+            'type': 'pie',
+            'title': 'Revenue by Payment Method',
+            'labels': self._labels(payment_stats['payment_method']),
+            'values': self._values(payment_stats['total_revenue'])
+        }
         
         # 2. Payment Method Trends
-        fig, ax = plt.subplots(figsize=(12, 6))
-        daily_payments = df.groupby(['sale_date', 'payment_method'])['total'].sum().reset_index()
-        sns.lineplot(data=daily_payments, x='sale_date', y='total', hue='payment_method', ax=ax)
-        ax.set_title('Payment Method Trends Over Time')
-        plt.xticks(rotation=45)
-        charts['payment_trends'] = self._create_chart(fig, 'Payment Trends')
+        dates, groups = self._grouped_series(
+            aggregates.group('sale_date', 'payment_method'), 'sale_date', 'payment_method')
+        charts['payment_trends'] = {
+            'type': 'line',
+            'title': 'Payment Method Trends Over Time',
+            'labels': dates,
+            'groups': groups,
+            'rotate_labels': True
+        }
         
         # 3. Average Transaction by Payment Method
-        fig, ax = plt.subplots(figsize=(8, 6))
-        sns.barplot(data=payment_stats, x='payment_method', y='avg_transaction', ax=ax)
-        ax.set_title('Average Transaction Value by Payment Method')
-        ax.set_ylabel('Average Transaction ($)')
-        charts['avg_payment'] = self._create_chart(fig, 'Average Payment')
+        charts['avg_payment'] = {
+            'type': 'bar',
+            'title': 'Average Transaction Value by Payment Method',
+            'labels': self._labels(payment_stats['payment_method']),
+            'values': self._values(payment_stats['avg_transaction']),
+            'y_label': 'Average Transaction ($)'
+        }
         
         return {
             'stats': payment_stats.to_dict('records'),
-            'charts': charts
+            'charts': self._render_charts(charts)
         }
     
+    @staticmethod
+    def _explode_embellishments(df, columns):
+        """One row per (sale, embellishment) with the requested sale columns"""
+        emb_df = df[['embellishments'] + columns].explode('embellishments')
+        emb_df = emb_df.dropna(subset=['embellishments'])
+        return emb_df.rename(columns={'embellishments': 'embellishment'})
+    
     # EMBELLISHMENT ANALYTICS
     def get_embellishment_analytics(self, df):
         """Analytics for embellishments"""
         if df.empty:
             return {}
         
-        # Filter out 'None' embellishments and split multiple embellishments
-        embellishment_data = []
-        for _, row in df.iterrows():
-            if row['embellishments'] != 'None':
-                embs = row['embellishments'].split(', ')
-                for emb in embs:
-                    embellishment_data.append({
-                        'embellishment': emb.strip(),
-                        'total': row['total'],
-                        'quantity': row['quantity'],
-                        'sale_date': row['sale_date']
-                    })
-        
-        if not embellishment_data:
-            return {'message': 'No embellishment data available'}
-        
-        emb_df = pd.DataFrame(embellishment_data)
+        emb_df = self._explode_embellishments(df, ['total_cents', 'quantity'])
         
-        emb_stats = emb_df.groupby('embellishment').agg({
-            'total': ['sum', 'mean', 'count'],
-            'quantity': 'sum'
-        }).round(2)
+        if emb_df.empty:
+            return {'message': 'No embellishment data available'}
         
-        emb_stats.columns = ['total_revenue', 'avg_sale', 'usage_count', 'total_quantity']
-        emb_stats = emb_stats.reset_index()
+        emb_stats = emb_df.groupby('embellishment').agg(
+            total_revenue=('total_cents', 'sum'),
+            avg_sale=('total_cents', 'mean'),
+            usage_count=('total_cents', 'count'),
+            total_quantity=('quantity', 'sum')
+        ).reset_index()
+        emb_stats['total_revenue'] = emb_stats['total_revenue'] / 100
+        emb_stats['avg_sale'] = emb_stats['avg_sale'] / 100
+        emb_stats = emb_stats.round(2)
         
         charts = {}
         
         # 1. Top Embellishments (Bar Chart)
-        fig, ax = plt.subplots(figsize=(10, 6))
         top_embs = emb_stats.nlargest(10, 'total_revenue')
-        sns.barplot(data=top_embs, x='total_revenue', y='embellishment', ax=ax)
-        ax.set_title('Top Embellishments by Revenue')
-        ax.set_xlabel('Revenue ($)')
-        charts['top_embellishments'] = self._create_chart(fig, 'Top Embellishments')
+        charts['top_embellishments'] = {
+            'type': 'bar',
+            'horizontal': True,
+            'title': 'Top Embellishments by Revenue',
+            'labels': self._labels(top_embs['embellishment']),
+            'values': self._values(top_embs['total_revenue']),
+            'x_label': 'Revenue ($)'
+        }
         
         # 2. Embellishment Usage Frequency
-        fig, ax = plt.subplots(figsize=(10, 6))
         usage_top = emb_stats.nlargest(10, 'usage_count')
-        sns.barplot(data=usage_top, x='usage_count', y='embellishment', ax=ax)
-        ax.set_title('Most Used Embellishments')
-        ax.set_xlabel('Number of Uses')
-        charts['embellishment_usage'] = self._create_chart(fig, 'Embellishment Usage')
+        charts['embellishment_usage'] = {
+            'type': 'bar',
+            'horizontal': True,
+            'title': 'Most Used Embellishments',
+            'labels': self._labels(usage_top['embellishment']),
+            'values': self._values(usage_top['usage_count']),
+            'x_label': 'Number of Uses'
+        }
         
         # 3. Embellishment Revenue vs Usage Scatter
-        fig, ax = plt.subplots(figsize=(10, 6))
-        sns.scatterplot(data=emb_stats, x='usage_count', y='total_revenue', 
-                       size='avg_sale', sizes=(50, 300), ax=ax)
-        ax.set_title('Embellishment Performance: Usage vs Revenue')
-        charts['emb_scatter'] = self._create_chart(fig, 'Embellishment Scatter')
+        charts['emb_scatter'] = {
+            'type': 'scatter',
+            'title': 'Embellishment Performance: Usage vs Revenue',
+            'labels': self._labels(emb_stats['embellishment']),
+            'x': self._values(emb_stats['usage_count']),
+            'values': self._values(emb_stats['total_revenue']),
+            'sizes': self._values(emb_stats['avg_sale']),
+            'x_label': 'usage_count',
+            'y_label': 'total_revenue'
+        }
         
         return {
             'stats': emb_stats.to_dict('records'),
-            'charts': charts,
+            'charts': self._render_charts(charts),
             'peak_embellishment': emb_stats.loc[emb_stats['total_revenue'].idxmax(), 'embellishment'],
             'worst_embellishment': emb_stats.loc[emb_stats['total_revenue'].idxmin(), 'embellishment']
         }
     
     # DAY OF WEEK ANALYTICS
-    def get_day_analytics(self, df):
+    def get_day_analytics(self, data):
         """Analytics for days of the week"""
-        if df.empty:
+        aggregates = self._aggregates(data)
+        if aggregates.empty:
             return {}
             
-        day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+        day_order = DAY_NAMES
         
-        day_stats = df.groupby('day_of_week').agg({
-            'total': ['sum', 'mean', 'count']
-        }).round(2)
-        
-        day_stats.columns = ['total_revenue', 'avg_sale', 'transaction_count']
-        day_stats = day_stats.reset_index()
+        day_stats = aggregates.group('day_of_week')
+        day_stats['avg_sale'] = day_stats['total_revenue'] / day_stats['total_transactions']
+        day_stats = day_stats.rename(columns={'total_transactions': 'transaction_count'})
+        day_stats = day_stats[['day_of_week', 'total_revenue', 'avg_sale', 'transaction_count']].round(2)
         
         # Reorder by day of week
         day_stats['day_order'] = day_stats['day_of_week'].map({day: i for i, day in enumerate(day_order)})
@@ -339,97 +476,107 @@ class AnalyticsService:
         charts = {}
         
         # 1. Revenue by Day (Line Chart)
-        fig, ax = plt.subplots(figsize=(10, 6))
-        sns.lineplot(data=day_stats, x='day_of_week', y='total_revenue', marker='o', ax=ax)
-        ax.set_title('Revenue by Day of Week')
-        ax.set_ylabel('Revenue ($)')
-        plt.xticks(rotation=45)
-        charts['day_line'] = self._create_chart(fig, 'Day Revenue Line')
+        charts['day_line'] = {
+            'type': 'line',
+            'title': 'Revenue by Day of Week',
+            'labels': self._labels(day_stats['day_of_week']),
+            'values': self._values(day_stats['total_revenue']),
+            'y_label': 'Revenue ($)',
+            'rotate_labels': True
+        }
         
         # 2. Day Performance Heatmap
-        fig, ax = plt.subplots(figsize=(10, 6))
-        pivot_day = df.pivot_table(values='total', index='day_of_week', columns='month', 
-                                  aggfunc='sum', fill_value=0)
+        pivot_day = aggregates.group('day_of_week', 'year_month').pivot_table(
+            values='total_revenue', index='day_of_week', columns='year_month', aggfunc='sum', fill_value=0)
+        pivot_day.columns = [year_month_label(key) for key in pivot_day.columns]
         # Reorder rows by day of week
         pivot_day = pivot_day.reindex(day_order)
-        sns.heatmap(pivot_day, annot=True, fmt='.0f', cmap='Blues', ax=ax)
-        ax.set_title('Daily Performance Heatmap (Revenue by Month)')
-        charts['day_heatmap'] = self._create_chart(fig, 'Day Heatmap')
+        charts['day_heatmap'] = {
+            'type': 'heatmap',
+            'title': 'Daily Performance Heatmap (Revenue by Month)',
+            'labels': self._labels(pivot_day.columns),
+            'groups': self._heatmap_groups(pivot_day),
+            'colormap': 'Blues'
+        }
         
         # 3. Transaction Count by Day
-        fig, ax = plt.subplots(figsize=(10, 6))
-        sns.barplot(data=day_stats, x='day_of_week', y='transaction_count', ax=ax)
-        ax.set_title('Number of Transactions by Day')
-        ax.set_ylabel('Transaction Count')
-        plt.xticks(rotation=45)
-        charts['day_transactions'] = self._create_chart(fig, 'Day Transactions')
+        charts['day_transactions'] = {
+            'type': 'bar',
+            'title': 'Number of Transactions by Day',
+            'labels': self._labels(day_stats['day_of_week']),
+            'values': self._values(day_stats['transaction_count']),
+            'y_label': 'Transaction Count',
+            'rotate_labels': True
+        }
         
         return {
             'stats': day_stats.to_dict('records'),
-            'charts': charts,
+            'charts': self._render_charts(charts),
             'peak_day': day_stats.loc[day_stats['total_revenue'].idxmax(), 'day_of_week'],
             'worst_day': day_stats.loc[day_stats['total_revenue'].idxmin(), 'day_of_week']
         }
     
     # MONTHLY ANALYTICS
-    def get_monthly_analytics(self, df):
-        """Analytics for months of the year"""
-        if df.empty:
+    def get_monthly_analytics(self, data):
+        """Analytics per calendar month (year-aware, in chronological order)"""
+        aggregates = self._aggregates(data)
+        if aggregates.empty:
             return {}
-            
-        month_order = ['January', 'February', 'March', 'April', 'May', 'June',
-                      'July', 'August', 'September', 'October', 'November', 'December']
         
-        month_stats = df.groupby('month').agg({
-            'total': ['sum', 'mean', 'count']
-        }).round(2)
-        
-        month_stats.columns = ['total_revenue', 'avg_sale', 'transaction_count']
-        month_stats = month_stats.reset_index()
-        
-        # Reorder by month
-        month_stats['month_order'] = month_stats['month'].map({month: i for i, month in enumerate(month_order)})
-        month_stats = month_stats.sort_values('month_order').drop('month_order', axis=1)
+        # Grouped by the integer YYYYMM key, which already sorts chronologically
+        month_stats = aggregates.group('year_month')
+        month_stats['month'] = month_stats['year_month'].map(year_month_label)
+        month_stats['avg_sale'] = month_stats['total_revenue'] / month_stats['total_transactions']
+        month_stats = month_stats.rename(columns={'total_transactions': 'transaction_count'})
+        month_stats = month_stats[['year_month', 'month', 'total_revenue', 'avg_sale', 'transaction_count']].round(2)
         
         charts = {}
         
         # 1. Monthly Revenue Trend
-        fig, ax = plt.subplots(figsize=(12, 6))
-        sns.lineplot(data=month_stats, x='month', y='total_revenue', marker='o', linewidth=3, ax=ax)
-        ax.set_title('Monthly Revenue Trend')
-        ax.set_ylabel('Revenue ($)')
-        plt.xticks(rotation=45)
-        charts['monthly_trend'] = self._create_chart(fig, 'Monthly Trend')
+        charts['monthly_trend'] = {
+            'type': 'line',
+            'title': 'Monthly Revenue Trend',
+            'labels': self._labels(month_stats['month']),
+            'values': self._values(month_stats['total_revenue']),
+            'y_label': 'Revenue ($)',
+            'line_width': 3,
+            'rotate_labels': True
+        }
         
         # 2. Monthly Performance (Bar Chart)
-        fig, ax = plt.subplots(figsize=(12, 6))
-        sns.barplot(data=month_stats, x='month', y='total_revenue', ax=ax)
-        ax.set_title('Revenue by Month')
-        ax.set_ylabel('Revenue ($)')
-        plt.xticks(rotation=45)
-        charts['monthly_bar'] = self._create_chart(fig, 'Monthly Bar')
+        charts['monthly_bar'] = {
+            'type': 'bar',
+            'title': 'Revenue by Month',
+            'labels': self._labels(month_stats['month']),
+            'values': self._values(month_stats['total_revenue']),
+            'y_label': 'Revenue ($)',
+            'rotate_labels': True
+        }
         
         # 3. Monthly Growth Rate
         month_stats['growth_rate'] = month_stats['total_revenue'].pct_change() * 100
-        fig, ax = plt.subplots(figsize=(12, 6))
-        sns.barplot(data=month_stats[1:], x='month', y='growth_rate', ax=ax)
-        ax.set_title('Month-over-Month Growth Rate (%)')
-        ax.set_ylabel('Growth Rate (%)')
-        ax.axhline(y=0, color='red', linestyle='--')
-        plt.xticks(rotation=45)
-        charts['growth_rate'] = self._create_chart(fig, 'Growth Rate')
+        charts['growth_rate'] = {
+            'type': 'bar',
+            'title': 'Month-over-Month Growth Rate (%)',
+            'labels': self._labels(month_stats['month'][1:]),
+            'values': self._values(month_stats['growth_rate'][1:]),
+            'y_label': 'Growth Rate (%)',
+            'reference_line': 0,
+            'rotate_labels': True
+        }
         
         return {
             'stats': month_stats.to_dict('records'),
-            'charts': charts,
+            'charts': self._render_charts(charts),
             'peak_month': month_stats.loc[month_stats['total_revenue'].idxmax(), 'month'],
             'worst_month': month_stats.loc[month_stats['total_revenue'].idxmin(), 'month']
         }
     
     # DASHBOARD SUMMARY
-    def get_dashboard_summary(self, df):
+    def get_dashboard_summary(self, data):
         """Get key metrics for dashboard"""
-        if df.empty:
+        aggregates = self._aggregates(data)
+        if aggregates.empty:
             return {}
         
         # Convert dates to pandas datetime for consistent comparison
@@ -438,93 +585,82 @@ class AnalyticsService:
         this_week_start = today - pd.Timedelta(days=today.weekday())
         last_week_start = this_week_start - pd.Timedelta(days=7)
         this_month_start = today.replace(day=1)
+        thirty_days_ago = today - pd.Timedelta(days=30)
         
-        # Convert sale_date to datetime for filtering
-        df['sale_date'] = pd.to_datetime(df['sale_date'])
+        # Revenue per calendar day: every period total and the 30-day trend are
+        # read off this small series. With rollup aggregates this never touches
+        # individual sales, since the rollup already folds each write in.
+        by_day = aggregates.group('sale_date')
+        day_totals = pd.Series(by_day['total_revenue'].to_numpy(), index=pd.DatetimeIndex(by_day['sale_date']))
+        days = day_totals.index
         
         # Calculate key metrics
-        total_revenue = df['total'].sum()
-        total_transactions = len(df)
-        avg_transaction = df['total'].mean()
-        
-        # Time-based comparisons - using pandas datetime comparison
-        today_sales = df[df['sale_date'].dt.normalize() == today]['total'].sum()
-        yesterday_sales = df[df['sale_date'].dt.normalize() == yesterday]['total'].sum()
-        
-        this_week_sales = df[df['sale_date'].dt.normalize() >= this_week_start]['total'].sum()
-        last_week_sales = df[(df['sale_date'].dt.normalize() >= last_week_start) & 
-                           (df['sale_date'].dt.normalize() < this_week_start)]['total'].sum()
-        
-        this_month_sales = df[df['sale_date'].dt.normalize() >= this_month_start]['total'].sum()
-        
-        # Top performers - handle empty groups
-        try:
-            top_product = df.groupby('product_name')['total'].sum().idxmax()
-        except ValueError:
-            top_product = "No products"
-            
-        try:
-            top_store = df.groupby('store_name')['total'].sum().idxmax()
-        except ValueError:
-            top_store = "No stores"
-        
-        # Create summary chart
-        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(15, 10))
-        
-        # Daily trend (last 30 days)
-        thirty_days_ago = today - pd.Timedelta(days=30)
-        last_30_days = df[df['sale_date'].dt.normalize() >= thirty_days_ago]
-        if not last_30_days.empty:
-            daily_trend = last_30_days.groupby(last_30_days['sale_date'].dt.date)['total'].sum()
-            ax1.plot(daily_trend.index, daily_trend.values, marker='o')
-            ax1.set_title('Last 30 Days Revenue Trend')
-            ax1.set_ylabel('Revenue ($)')
-            ax1.tick_params(axis='x', rotation=45)
-        else:
-            ax1.text(0.5, 0.5, 'No data available', transform=ax1.transAxes, 
-                    ha='center', va='center', fontsize=12)
-            ax1.set_title('Last 30 Days Revenue Trend')
-        
-        # Top 5 products
-        if not df.empty:
-            top_products = df.groupby('product_name')['total'].sum().nlargest(5)
-            if not top_products.empty:
-                ax2.barh(range(len(top_products)), top_products.values)
-                ax2.set_yticks(range(len(top_products)))
-                ax2.set_yticklabels(top_products.index)
-                ax2.set_title('Top 5 Products')
-                ax2.set_xlabel('Revenue ($)')
-            else:
-                ax2.text(0.5, 0.5, 'No products', transform=ax2.transAxes, 
-                        ha='center', va='center', fontsize=12)
-                ax2.set_title('Top 5 Products')
-        
-        # Payment method distribution
-        if not df.empty:
-            payment_dist = df.groupby('payment_method')['total'].sum()
-            if not payment_dist.empty:
-                ax3.pie(payment_dist.values, labels=payment_dist.index, autopct='%1.1f%%')
-                ax3.set_title('Payment Method Distribution')
-            else:
-                ax3.text(0.5, 0.5, 'No payment data', transform=ax3.transAxes, 
-                        ha='center', va='center', fontsize=12)
-                ax3.set_title('Payment Method Distribution')
-        
-        # Store performance
-        if not df.empty:
-            store_perf = df.groupby('store_name')['total'].sum()
-            if not store_perf.empty:
-                ax4.bar(store_perf.index, store_perf.values)
-                ax4.set_title('Store Performance')
-                ax4.set_ylabel('Revenue ($)')
-                ax4.tick_params(axis='x', rotation=45)
-            else:
-                ax4.text(0.5, 0.5, 'No store data', transform=ax4.transAxes, 
-                        ha='center', va='center', fontsize=12)
-                ax4.set_title('Store Performance')
-        
-        plt.tight_layout()
-        summary_chart = self._create_chart(fig, 'Dashboard Summary')
+        total_revenue = day_totals.sum()
+        total_transactions = int(aggregates.totals()['total_transactions'])
+        avg_transaction = total_revenue / total_transactions
+        
+        # Time-based comparisons
+        today_sales = day_totals[days == today].sum()
+        yesterday_sales = day_totals[days == yesterday].sum()
+        this_week_sales = day_totals[days >= this_week_start].sum()
+        last_week_sales = day_totals[(days >= last_week_start) & (days < this_week_start)].sum()
+        this_month_sales = day_totals[days >= this_month_start].sum()
+        daily_trend = day_totals[days >= thirty_days_ago]
+        
+        # Top performers
+        def revenue_by(dimension):
+            grouped = aggregates.group(dimension)
+            return pd.Series(grouped['total_revenue'].to_numpy(), index=grouped[dimension])
+        
+        product_totals = revenue_by('product_name')
+        store_totals = revenue_by('store_name')
+        payment_dist = revenue_by('payment_method')
+        
+        top_product = product_totals.idxmax() if not product_totals.empty else "No products"
+        top_store = store_totals.idxmax() if not store_totals.empty else "No stores"
+        top_products = product_totals.nlargest(5)
+        
+        # Summary chart: four panels drawn as one figure
+        summary_chart = {
+            'type': 'grid',
+            'shape': [2, 2],
+            'panels': [
+                {
+                    'type': 'line',
+                    'title': 'Last 30 Days Revenue Trend',
+                    'labels': [d.date().isoformat() for d in daily_trend.index],
+                    'values': self._values(daily_trend),
+                    'y_label': 'Revenue ($)',
+                    'rotate_labels': True
+                },
+                {
+                    'type': 'bar',
+                    'horizontal': True,
+                    'title': 'Top 5 Products',
+                    'labels': self._labels(top_products.index),
+                    'values': self._values(top_products),
+                    'x_label': 'Revenue ($)',
+                    'empty_message': 'No products'
+                },
+                {
+                    'type': 'pie',
+                    'title': 'Payment Method Distribution',
+                    'labels': self._labels(payment_dist.index),
+                    'values': self._values(payment_dist),
+                    'empty_message': 'No payment data'
+                },
+                {
+                    'type': 'bar',
+                    'title': 'Store Performance',
+                    'labels': self._labels(store_totals.index),
+                    'values': self._values(store_totals),
+                    'y_label': 'Revenue ($)',
+                    'rotate_labels': True,
+                    'empty_message': 'No store data'
+                }
+            ]
+        }
+        summary_chart = self._render_charts({'summary_chart': summary_chart})['summary_chart']
         
         return {
             'total_revenue': round(total_revenue, 2),
@@ -549,26 +685,20 @@ class AnalyticsService:
             return {}
         
         # Best and worst performers
-        product_performance = df.groupby('product_name')['total'].sum().sort_values(ascending=False)
-        category_performance = df.groupby('product_category')['total'].sum().sort_values(ascending=False)
-        store_performance = df.groupby('store_name')['total'].sum().sort_values(ascending=False)
+        def performance(frame, column):
+            totals = frame.groupby(column, observed=True)['total_cents'].sum() / 100
+            totals.index = totals.index.astype(object)
+            return totals.sort_values(ascending=False)
+        
+        product_performance = performance(df, 'product_name')
+        category_performance = performance(df, 'product_category')
+        store_performance = performance(df, 'store_name')
         
         # Embellishment performance
-        embellishment_data = []
-        for _, row in df.iterrows():
-            if row['embellishments'] != 'None':
-                embs = row['embellishments'].split(', ')
-                for emb in embs:
-                    embellishment_data.append({'embellishment': emb.strip(), 'total': row['total']})
-        
-        if embellishment_data:
-            emb_df = pd.DataFrame(embellishment_data)
-            embellishment_performance = emb_df.groupby('embellishment')['total'].sum().sort_values(ascending=False)
-        else:
-            embellishment_performance = pd.Series(dtype=float)
+        embellishment_performance = performance(self._explode_embellishments(df, ['total_cents']), 'embellishment')
         
         # Day performance
-        day_performance = df.groupby('day_of_week')['total'].sum().sort_values(ascending=False)
+        day_performance = performance(df, 'day_of_week')
         
         return {
             'best_products': product_performance.head(10).to_dict(),
@@ -0,0 +1,157 @@
+"""
+Analytics Warmer
+Precomputes the default analytics pages of active companies into the analytics cache
+"""
+
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from app import db
+from app.models.data_version import CompanyDataVersion
+from app.models.user import User
+from app.services.analytics_cache import analytics_cache
+from app.services.analytics_service import AnalyticsService, PAGE_DEFAULT_DAYS
+
+DEFAULT_INTERVAL = 0  # seconds between scheduled runs, 0 disables the schedule
+DEFAULT_ACTIVE_DAYS = 7
+DEFAULT_MIN_IMPORT_ROWS = 500
+
+
+def recently_active_companies(days: int = DEFAULT_ACTIVE_DAYS) -> List[int]:
+    """Companies with a user login or a sales change in the last ``days`` days"""
+    since = datetime.utcnow() - timedelta(days=days)
+    logged_in = db.session.query(User.company_id).filter(
+        User.company_id.isnot(None), User.last_login >= since)
+    changed = db.session.query(CompanyDataVersion.company_id).filter(
+        CompanyDataVersion.updated_at >= since)
+    return sorted({row[0] for row in logged_in.union(changed)})
+
+
+class AnalyticsWarmer:
+    """
+    Fills the analytics cache with each page's default date range, so the
+    first view of a page after a quiet period or a large import is a hit.
+
+    The cache lives in each server process, so warming has to happen there:
+    a daemon thread, started on the first request, warms recently active
+    companies every ANALYTICS_WARM_INTERVAL seconds and any company passed to
+    schedule() (e.g. after a large import) as soon as possible. The
+    ``flask refresh-snapshots`` CLI cannot fill these caches; it only brings
+    the on-disk sales snapshots that every process shares up to date.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.interval = DEFAULT_INTERVAL
+        self.active_days = DEFAULT_ACTIVE_DAYS
+        self.after_import = True
+        self.min_import_rows = DEFAULT_MIN_IMPORT_ROWS
+        self._pending = set()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config.get('ANALYTICS_WARM_INTERVAL', DEFAULT_INTERVAL)
+        self.active_days = app.config.get('ANALYTICS_WARM_ACTIVE_DAYS', DEFAULT_ACTIVE_DAYS)
+        self.after_import = app.config.get('ANALYTICS_WARM_AFTER_IMPORT', True)
+        self.min_import_rows = app.config.get('ANALYTICS_WARM_MIN_IMPORT_ROWS', DEFAULT_MIN_IMPORT_ROWS)
+        if self.interval > 0:
+            app.before_request(self._ensure_started)
+
+    @property
+    def enabled(self) -> bool:
+        return self.app is not None and not self.app.testing and (self.interval > 0 or self.after_import)
+
+    # Warming
+
+    def warm_company(self, company_id: int, pages: Optional[Iterable[str]] = None) -> int:
+        """
+        Compute a company's pages for their default date ranges unless cached
+
+        Must run inside an app context.
+
+        Returns:
+            Number of pages that were computed (0 if all were already cached)
+        """
+        analytics_service = AnalyticsService()
+        end_date = datetime.now().date()
+        computed = 0
+
+        for page in pages or PAGE_DEFAULT_DAYS:
+            start_date = end_date - timedelta(days=PAGE_DEFAULT_DAYS[page])
+            ran = []
+
+            def compute(page=page, start_date=start_date):
+                ran.append(page)
+                return analytics_service.compute_page(page, company_id, start_date, end_date)
+
+            analytics_cache.get_or_compute(company_id, page, start_date, end_date, compute)
+            computed += len(ran)
+        return computed
+
+    def warm(self, company_ids: Optional[Iterable[int]] = None) -> Dict[int, int]:
+        """
+        Warm several companies (recently active ones by default)
+
+        Returns:
+            Mapping of company id to the number of pages computed
+        """
+        if company_ids is None:
+            company_ids = recently_active_companies(self.active_days)
+
+        results = {}
+        for company_id in company_ids:
+            try:
+                results[company_id] = self.warm_company(company_id)
+            finally:
+                # Drop identity-map state between companies; warming only reads
+                db.session.rollback()
+        return results
+
+    # Background thread
+
+    def schedule(self, company_id: int):
+        """Ask the background thread to warm a company soon (no-op when disabled)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._pending.add(company_id)
+        self._ensure_started()
+        self._wake.set()
+
+    def schedule_after_import(self, company_id: int, imported_rows: int):
+        """Schedule a warm-up if an import was large enough to make pages slow"""
+        if self.after_import and imported_rows >= self.min_import_rows:
+            self.schedule(company_id)
+
+    def _ensure_started(self):
+        if self._thread is not None or not self.enabled:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='analytics-warmer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            woken = self._wake.wait(timeout=self.interval if self.interval > 0 else None)
+            self._wake.clear()
+            with self._lock:
+                pending, self._pending = sorted(self._pending), set()
+
+            with self.app.app_context():
+                try:
+                    company_ids = pending if woken else None
+                    results = self.warm(company_ids)
+                    self.app.logger.info(f"Analytics warmer computed {sum(results.values())} pages "
+                                         f"for {len(results)} companies")
+                except Exception as e:
+                    self.app.logger.error(f"Analytics warmer failed: {str(e)}")
+                finally:
+                    db.session.remove()
+
+
+analytics_warmer = AnalyticsWarmer()
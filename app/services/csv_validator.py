@@ -1,9 +1,13 @@
+from __future__ import annotations
+
 import csv
-import pandas as pd
 from typing import Dict, List, Any, Optional
 import re
 import json
 import datetime
+from app.utils.lazy_import import LazyModule
+
+pd = LazyModule('pandas')
 
 class CSVValidationError(Exception):
     """Exception raised for CSV validation errors"""
@@ -0,0 +1,150 @@
+"""
+Import Jobs
+Runs sales CSV imports on a worker pool instead of inside the HTTP request
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.import_job import ImportJob
+from app.services.analytics_warmer import analytics_warmer
+from app.services.progress_events import progress_events
+from app.services.sales_import_export import SalesImportExportService
+
+DEFAULT_WORKERS = 2
+DEFAULT_STALE_MINUTES = 30
+
+
+class ImportJobRunner:
+    """
+    Queues imports as ImportJob rows and runs them on a thread pool.
+
+    The upload is staged to a file (see import_staging), its job row queued
+    and its id handed to the pool, so the request returns at once and the
+    import carries on if the browser goes away. Workers claim a job with a
+    conditional UPDATE (so it runs once even if submitted twice), save
+    progress to the row after every batch and record the results or the
+    failure at the end. Status requests only ever read the row; each write
+    is also announced on progress_events (under event_key(job_id)) for the
+    SSE stream.
+
+    IMPORT_JOB_WORKERS sets the pool size (imports of different companies
+    run side by side; a unique index lets a company have one queued or
+    running import at a time). With 0 jobs run inline in the submitting
+    request, which is what tests want.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.workers = DEFAULT_WORKERS
+        self.stale_after = timedelta(minutes=DEFAULT_STALE_MINUTES)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.workers = app.config.get('IMPORT_JOB_WORKERS', DEFAULT_WORKERS)
+        self.stale_after = timedelta(minutes=app.config.get('IMPORT_JOB_STALE_MINUTES', DEFAULT_STALE_MINUTES))
+
+    # Submitting
+
+    def enqueue(self, job: ImportJob) -> Optional[ImportJob]:
+        """
+        Queue a staged import and hand it to the workers
+
+        Returns:
+            The company's active import: job once it is queued, or the import
+            that was already queued or running, in which case job stays
+            staged. None if job was not staged (it was confirmed already).
+        """
+        job_id, company_id = job.id, job.company_id
+        try:
+            queued = ImportJob.queue(job_id)
+        except IntegrityError:
+            # uq_import_jobs_company_active: another import got there first
+            db.session.rollback()
+            return ImportJob.active_for_company(company_id)
+        if not queued:
+            return None
+        self.submit(job_id)
+        return db.session.get(ImportJob, job_id)
+
+    def submit(self, job_id: str):
+        """Run a queued job on the pool (or right here when IMPORT_JOB_WORKERS is 0)"""
+        if self.workers <= 0:
+            self.run(job_id)
+            return
+
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                        thread_name_prefix='import-job')
+        self._executor.submit(self._run_in_context, job_id)
+
+    def company_job(self, company_id: int, job_id: str):
+        """A company's job for status requests, failing it first if its worker died"""
+        ImportJob.fail_stale(company_id, self.stale_after)
+        return ImportJob.query.filter_by(id=job_id, company_id=company_id).first()
+
+    @staticmethod
+    def event_key(job_id: str) -> str:
+        """progress_events key announcing changes to a job's row"""
+        return f'import:{job_id}'
+
+    # Running
+
+    def _run_in_context(self, job_id: str):
+        with self.app.app_context():
+            try:
+                self.run(job_id)
+            except Exception as e:
+                self.app.logger.error(f"Import job {job_id} crashed: {str(e)}")
+            finally:
+                db.session.remove()
+
+    def run(self, job_id: str):
+        """Claim and run one job; must run inside an app context"""
+        if not ImportJob.claim(job_id):
+            return
+        event_key = self.event_key(job_id)
+        progress_events.publish(event_key)
+        job = db.session.get(ImportJob, job_id)
+        company_id, user_id, file_path = job.company_id, job.user_id, job.file_path
+
+        def progress(percent, status, detail, processed=0, successful=0, failed=0, total=None):
+            ImportJob.update_progress(
+                job_id, progress=percent, status_message=status, detail=detail, total_rows=total,
+                processed_rows=processed, successful_rows=successful, failed_rows=failed)
+            progress_events.publish(event_key)
+
+        try:
+            import_service = SalesImportExportService(company_id)
+            with open(file_path, 'r', encoding='utf-8', newline='') as csv_file:
+                successful, failed, errors = import_service.import_sales_from_file(
+                    csv_file, user_id, progress_callback=progress
+                )
+            ImportJob.finish(job_id, successful, failed, errors)
+
+            # Precompute the analytics pages a large import just invalidated
+            analytics_warmer.schedule_after_import(company_id, successful)
+        except Exception as e:
+            db.session.rollback()
+            ImportJob.fail(job_id, str(e))
+        finally:
+            progress_events.publish(event_key)
+            # Clean up the staged upload
+            try:
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+            except OSError:
+                pass  # Ignore cleanup errors
+
+
+import_job_runner = ImportJobRunner()
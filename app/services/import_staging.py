@@ -0,0 +1,140 @@
+"""
+Import Staging
+Keeps uploaded sales CSVs on disk between upload, preview and import
+"""
+
+import codecs
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import BinaryIO, Optional, TextIO
+
+from app import db
+from app.models.import_job import ImportJob
+
+# Uploads are copied to disk this many bytes at a time
+STAGING_CHUNK_BYTES = 64 * 1024
+DEFAULT_MAX_AGE_HOURS = 24
+
+
+class ImportStaging:
+    """
+    Staging area for uploaded sales CSVs, keyed by import id.
+
+    An upload is copied to <IMPORT_STAGING_DIR>/<import id>.csv a chunk at a
+    time as it arrives (checking on the way that it is UTF-8 and counting its
+    lines), and recorded as a staged ImportJob under the same id. The preview
+    reads the head of that file and confirming queues the same job, so the
+    file is uploaded once and never held in memory whole. Uploads nobody
+    confirmed are removed after IMPORT_STAGING_MAX_AGE_HOURS.
+    """
+
+    def __init__(self):
+        self.directory = None
+        self.max_age = timedelta(hours=DEFAULT_MAX_AGE_HOURS)
+
+    def init_app(self, app):
+        self.directory = app.config.get('IMPORT_STAGING_DIR') or os.path.join(app.instance_path, 'import_staging')
+        self.max_age = timedelta(hours=app.config.get('IMPORT_STAGING_MAX_AGE_HOURS', DEFAULT_MAX_AGE_HOURS))
+
+    def path_for(self, import_id: str) -> str:
+        return os.path.join(self.directory, f'{import_id}.csv')
+
+    def stage(self, stream: BinaryIO, company_id: int, user_id: int) -> ImportJob:
+        """
+        Copy an upload into the staging area and record it as a staged import
+
+        Args:
+            stream: Binary stream of CSV bytes (request.stream, an uploaded file)
+            company_id: Company importing
+            user_id: User importing
+
+        Returns:
+            The staged ImportJob; its total_rows counts the lines after the
+            header, which is the number of records unless notes span lines
+
+        Raises:
+            ValueError: If the upload is empty or not UTF-8 text
+        """
+        self.discard_abandoned(company_id)
+        os.makedirs(self.directory, exist_ok=True)
+
+        import_id = str(uuid.uuid4())
+        path = self.path_for(import_id)
+        partial_path = f'{path}.part'
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        size = lines = 0
+        last_byte = b''
+
+        try:
+            with open(partial_path, 'wb') as f:
+                while True:
+                    chunk = stream.read(STAGING_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    decoder.decode(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+                    lines += chunk.count(b'\n')
+                    last_byte = chunk[-1:]
+                decoder.decode(b'', final=True)
+
+            if not size:
+                raise ValueError('The uploaded file is empty')
+            os.replace(partial_path, path)
+        except UnicodeDecodeError:
+            self._remove(partial_path)
+            raise ValueError('The file must be UTF-8 encoded text')
+        except Exception:
+            self._remove(partial_path)
+            raise
+
+        if last_byte != b'\n':
+            lines += 1
+
+        job = ImportJob(id=import_id, company_id=company_id, user_id=user_id, file_path=path,
+                        status=ImportJob.STAGED, total_rows=max(lines - 1, 0))
+        db.session.add(job)
+        db.session.commit()
+        return job
+
+    def get(self, company_id: int, import_id: str) -> Optional[ImportJob]:
+        """A company's staged (not yet confirmed) import"""
+        if not import_id:
+            return None
+        return ImportJob.query.filter_by(id=import_id, company_id=company_id, status=ImportJob.STAGED).first()
+
+    @staticmethod
+    def open(job: ImportJob) -> TextIO:
+        """The staged file as text, ready for the csv module"""
+        return open(job.file_path, 'r', encoding='utf-8', newline='')
+
+    def discard(self, job: ImportJob):
+        """Remove a staged import and its file"""
+        self._remove(job.file_path)
+        db.session.delete(job)
+        db.session.commit()
+
+    def discard_abandoned(self, company_id: int) -> int:
+        """Remove the company's staged imports older than IMPORT_STAGING_MAX_AGE_HOURS"""
+        abandoned = ImportJob.query.filter(
+            ImportJob.company_id == company_id, ImportJob.status == ImportJob.STAGED,
+            ImportJob.created_at < datetime.utcnow() - self.max_age
+        ).all()
+        for job in abandoned:
+            self._remove(job.file_path)
+            db.session.delete(job)
+        if abandoned:
+            db.session.commit()
+        return len(abandoned)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except OSError:
+            pass  # Ignore cleanup errors
+
+
+import_staging = ImportStaging()
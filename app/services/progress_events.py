@@ -0,0 +1,123 @@
+"""
+Progress Events
+Pushes import and export progress to the browser as Server-Sent Events
+"""
+
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+DEFAULT_POLL_SECONDS = 2
+DEFAULT_MAX_SECONDS = 300
+KEEPALIVE_SECONDS = 15
+RETRY_MILLISECONDS = 3000
+# How long a published state is kept after its last update
+RETENTION_SECONDS = 600
+
+FINISHED_STATES = ('completed', 'failed')
+
+
+def sse_message(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """One Server-Sent Events message carrying data as JSON"""
+    lines = [f'event: {event}'] if event else []
+    lines.append(f'data: {json.dumps(data, default=str)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+class ProgressEvents:
+    """
+    In-process publish/subscribe for progress updates, keyed by job.
+
+    Producers (the import progress callback, the export stream) call
+    publish() as each batch or chunk goes by; stream() wakes up on those
+    publishes and yields an SSE message whenever the state it reads has
+    changed. Publishing only reaches listeners in the same process, so
+    stream() also re-reads the state every PROGRESS_STREAM_POLL_SECONDS;
+    import state lives on the job row and export state on its
+    export_progress row, which makes both correct across processes, just
+    less immediate.
+
+    Each open stream holds a worker thread, so streams close after
+    PROGRESS_STREAM_MAX_SECONDS and the browser's EventSource reconnects.
+    Serve the app with threaded or gevent workers, or a few open progress
+    pages can take every worker.
+    """
+
+    def __init__(self):
+        self.poll_seconds = DEFAULT_POLL_SECONDS
+        self.max_seconds = DEFAULT_MAX_SECONDS
+        self._condition = threading.Condition()
+        self._entries: Dict[str, Tuple[int, Any, float]] = {}
+
+    def init_app(self, app):
+        self.poll_seconds = app.config.get('PROGRESS_STREAM_POLL_SECONDS', DEFAULT_POLL_SECONDS)
+        self.max_seconds = app.config.get('PROGRESS_STREAM_MAX_SECONDS', DEFAULT_MAX_SECONDS)
+
+    # Publishing
+
+    def publish(self, key: str, data: Any = None):
+        """Record a new state for key (None just signals a change) and wake its listeners"""
+        now = time.monotonic()
+        with self._condition:
+            version = self._entries.get(key, (0, None, now))[0] + 1
+            self._entries[key] = (version, data, now)
+            self._prune(now)
+            self._condition.notify_all()
+
+    def latest(self, key: str) -> Tuple[int, Any]:
+        """(version, data) last published for key; (0, None) if nothing was"""
+        with self._condition:
+            version, data, _ = self._entries.get(key, (0, None, 0))
+            return version, data
+
+    def wait(self, key: str, version: int, timeout: float) -> int:
+        """Block until key moves past version or timeout passes; returns the current version"""
+        def current():
+            return self._entries.get(key, (0, None, 0))[0]
+
+        with self._condition:
+            self._condition.wait_for(lambda: current() != version, timeout)
+            return current()
+
+    def _prune(self, now: float):
+        stale = [key for key, (_, _, updated) in self._entries.items() if now - updated > RETENTION_SECONDS]
+        for key in stale:
+            del self._entries[key]
+
+    # Streaming
+
+    def stream(self, key: str, read_state: Callable[[], Optional[Dict[str, Any]]]) -> Iterator[str]:
+        """
+        Yield SSE messages for key until its state is finished
+
+        Args:
+            key: Key producers publish under
+            read_state: Returns the current state dict (with a 'state' of
+                'running', 'completed', ...) or None while there is none yet
+        """
+        started = last_sent = time.monotonic()
+        last_state = None
+        yield f'retry: {RETRY_MILLISECONDS}\n\n'
+
+        while True:
+            # Take the version before reading, so a publish in between is not missed
+            version = self.latest(key)[0]
+            state = read_state()
+            now = time.monotonic()
+
+            if state is not None and state != last_state:
+                yield sse_message(state, event='progress')
+                last_state, last_sent = state, now
+                if state.get('state') in FINISHED_STATES:
+                    return
+            elif now - last_sent >= KEEPALIVE_SECONDS:
+                yield ': keepalive\n\n'
+                last_sent = now
+
+            if now - started >= self.max_seconds:
+                return
+            self.wait(key, version, self.poll_seconds)
+
+
+progress_events = ProgressEvents()
@@ -0,0 +1,86 @@
+"""
+Query Guard
+Fails requests that run the same SELECT against one table over and over (N+1 queries)
+"""
+
+import re
+from collections import defaultdict
+
+from flask import g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SELECT_FROM = re.compile(r'^\s*SELECT\b.*?\bFROM\s+["`]?(\w+)', re.IGNORECASE | re.DOTALL)
+
+
+class NPlusOneError(Exception):
+    """Raised when a request runs one SELECT on a table with too many different parameters"""
+    pass
+
+
+class QueryGuard:
+    """
+    N+1 detector for the test configuration.
+
+    With QUERY_GUARD_MAX_SELECTS set (TestingConfig does), every request
+    counts how many distinct parameter sets each SELECT statement runs with.
+    A statement going over the limit raises NPlusOneError when the request
+    finishes, which the test client propagates as a failure. Repeating the
+    exact same query does not count, and neither do different statements on
+    one table (several GROUP BYs) or a single query returning many rows, so
+    only per-row lookups in loops are caught.
+
+    Works on any database SQLAlchemy talks to (SQLite or PostgreSQL).
+    """
+
+    def __init__(self):
+        self.max_selects = 0
+        self.exempt_endpoints = frozenset()
+        self._listening = False
+
+    def init_app(self, app):
+        self.max_selects = app.config.get('QUERY_GUARD_MAX_SELECTS', 0)
+        self.exempt_endpoints = frozenset(app.config.get('QUERY_GUARD_EXEMPT_ENDPOINTS', ()))
+        if self.max_selects <= 0:
+            return
+
+        app.before_request(self._start_request)
+        app.after_request(self._check_request)
+        if not self._listening:
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            self._listening = True
+
+    def _start_request(self):
+        if request.endpoint not in self.exempt_endpoints:
+            g.query_guard = defaultdict(set)
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not has_app_context():
+            return
+        selects = g.get('query_guard')
+        if selects is None:
+            return
+
+        match = SELECT_FROM.match(statement)
+        if match:
+            selects[(match.group(1).lower(), statement)].add(repr(parameters))
+
+    def _check_request(self, response):
+        selects = g.pop('query_guard', None)
+        if not selects:
+            return response
+
+        offenders = {}
+        for (table, _), parameter_sets in selects.items():
+            if len(parameter_sets) > self.max_selects:
+                offenders[table] = max(offenders.get(table, 0), len(parameter_sets))
+        if offenders:
+            details = ', '.join(f'{table} ({count} SELECTs)' for table, count in sorted(offenders.items()))
+            raise NPlusOneError(
+                f"{request.endpoint} ran the same SELECT with more than {self.max_selects} different "
+                f"parameters on: {details}. Load them in one query (joinedload/selectinload or IN)."
+            )
+        return response
+
+
+query_guard = QueryGuard()
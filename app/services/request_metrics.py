@@ -0,0 +1,166 @@
+"""
+Request Metrics
+Opt-in per-endpoint timings, SQL statement counts and chart rendering time
+"""
+
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+from flask import g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class RequestMetrics:
+    """
+    Measures every request while REQUEST_METRICS is on.
+
+    For each request it records wall time, the number of SQL statements, the
+    time spent in them, the rows the driver reported and any named timings
+    (e.g. 'render' for matplotlib charts). The numbers are sent back in a
+    Server-Timing header and summed per endpoint in memory for the admin
+    metrics page. Statements repeated many times within one request (the
+    N+1 pattern) show up as a high "max repeats" value.
+
+    Totals are per process, like the analytics cache.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._endpoints: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def init_app(self, app):
+        self.enabled = app.config.get('REQUEST_METRICS', False)
+        if not self.enabled:
+            return
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        if not self._listening:
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            self._listening = True
+
+    # Recording
+
+    @staticmethod
+    def current():
+        """Metrics of the request being served, or None outside a measured request"""
+        if not has_app_context():
+            return None
+        return g.get('request_metrics')
+
+    @contextmanager
+    def timed(self, name: str):
+        """Add the time spent in the block to the current request's named timing"""
+        metrics = self.current()
+        if metrics is None:
+            yield
+            return
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings = metrics['timings']
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - started
+
+    def _start_request(self):
+        if request.endpoint == 'static':
+            return
+        g.request_metrics = {
+            'started': time.perf_counter(),
+            'sql_count': 0,
+            'sql_time': 0.0,
+            'sql_rows': 0,
+            'statements': Counter(),
+            'timings': {}
+        }
+
+    def _finish_request(self, response):
+        metrics = g.pop('request_metrics', None)
+        if metrics is None:
+            return response
+
+        duration = time.perf_counter() - metrics['started']
+        self._record(request.endpoint or request.path, duration, metrics)
+
+        parts = [f'app;dur={duration * 1000:.1f}',
+                 f'sql;desc="{metrics["sql_count"]} queries";dur={metrics["sql_time"] * 1000:.1f}']
+        parts += [f'{name};dur={seconds * 1000:.1f}' for name, seconds in metrics['timings'].items()]
+        response.headers.add('Server-Timing', ', '.join(parts))
+        return response
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.current() is not None:
+            conn.info.setdefault('request_metrics_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        metrics = self.current()
+        started = conn.info.get('request_metrics_started')
+        if metrics is None or not started:
+            return
+
+        metrics['sql_time'] += time.perf_counter() - started.pop()
+        metrics['sql_count'] += 1
+        metrics['statements'][statement] += 1
+        # Drivers that cannot tell (e.g. SQLite for SELECT) report -1
+        if cursor.rowcount and cursor.rowcount > 0:
+            metrics['sql_rows'] += cursor.rowcount
+
+    def _record(self, endpoint: str, duration: float, metrics: Dict[str, Any]):
+        repeats = max(metrics['statements'].values(), default=0)
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {
+                'endpoint': endpoint, 'requests': 0, 'total_time': 0.0, 'max_time': 0.0,
+                'sql_count': 0, 'sql_time': 0.0, 'sql_rows': 0, 'max_repeats': 0, 'timings': {}
+            })
+            stats['requests'] += 1
+            stats['total_time'] += duration
+            stats['max_time'] = max(stats['max_time'], duration)
+            stats['sql_count'] += metrics['sql_count']
+            stats['sql_time'] += metrics['sql_time']
+            stats['sql_rows'] += metrics['sql_rows']
+            stats['max_repeats'] = max(stats['max_repeats'], repeats)
+            for name, seconds in metrics['timings'].items():
+                stats['timings'][name] = stats['timings'].get(name, 0.0) + seconds
+
+    # Reporting
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """
+        Per-endpoint totals and per-request averages, slowest endpoints first
+
+        Times are in milliseconds.
+        """
+        with self._lock:
+            endpoints = [dict(stats, timings=dict(stats['timings'])) for stats in self._endpoints.values()]
+
+        rows = []
+        for stats in endpoints:
+            requests = stats['requests']
+            rows.append({
+                'endpoint': stats['endpoint'],
+                'requests': requests,
+                'total_ms': stats['total_time'] * 1000,
+                'avg_ms': stats['total_time'] * 1000 / requests,
+                'max_ms': stats['max_time'] * 1000,
+                'avg_queries': stats['sql_count'] / requests,
+                'avg_sql_ms': stats['sql_time'] * 1000 / requests,
+                'avg_rows': stats['sql_rows'] / requests,
+                'max_repeats': stats['max_repeats'],
+                'avg_timings_ms': {name: seconds * 1000 / requests for name, seconds in stats['timings'].items()}
+            })
+        return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+request_metrics = RequestMetrics()
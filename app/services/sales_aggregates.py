@@ -0,0 +1,218 @@
+"""
+Sales Aggregates
+Grouped sales totals that back the analytics pages
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Integer, and_, case, cast, extract, func, select
+
+from app import db
+from app.models.sales import Sale
+from app.models.sales_rollup import SalesDailyRollup
+from app.utils.lazy_import import LazyModule
+
+pd = LazyModule('pandas')
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June',
+               'July', 'August', 'September', 'October', 'November', 'December']
+
+
+def year_month(date_column):
+    """SQL expression for the integer year-month key (YYYYMM) of a date column"""
+    return cast(extract('year', date_column) * 100 + extract('month', date_column), Integer)
+
+
+def year_month_label(key: int) -> str:
+    """Display label for a YYYYMM key, e.g. 202501 -> 'January 2025'"""
+    return f"{MONTH_NAMES[key % 100 - 1]} {key // 100}"
+
+
+# SQL counterpart of the Sale.payment_method property
+PAYMENT_METHOD = case(
+    (and_(Sale.card_amount > 0, Sale.cash_amount > 0), 'Both (Card + Cash)'),
+    (Sale.card_amount > 0, 'Card'),
+    (Sale.cash_amount > 0, 'Cash'),
+    else_='Unknown'
+)
+
+
+class SalesAggregates:
+    """
+    Grouped totals (revenue, transactions, quantity) for one slice of sales.
+
+    Subclasses decide where the numbers come from; callers only ask for
+    ``group(*dimensions)`` and get back one small DataFrame per grouping.
+    """
+
+    DIMENSIONS = ('store_name', 'product_category', 'product_name', 'payment_method',
+                  'day_of_week', 'month', 'year_month', 'sale_date')
+    MEASURES = ['total_revenue', 'total_transactions', 'total_quantity']
+
+    def __init__(self):
+        self._groups: Dict[Tuple[str, ...], pd.DataFrame] = {}
+
+    def group(self, *dimensions: str) -> pd.DataFrame:
+        """
+        Totals grouped by the given dimensions
+
+        Returns:
+            DataFrame with one column per dimension followed by MEASURES,
+            sorted by the dimension values
+        """
+        unknown = set(dimensions) - set(self.DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown dimensions: {', '.join(sorted(unknown))}")
+
+        key = tuple(dimensions)
+        if key not in self._groups:
+            self._groups[key] = self._group(list(dimensions))
+        return self._groups[key].copy()
+
+    def totals(self) -> Dict[str, float]:
+        """Overall totals for the slice"""
+        grouped = self.group()
+        if grouped.empty:
+            return {measure: 0 for measure in self.MEASURES}
+        return grouped.iloc[0][self.MEASURES].to_dict()
+
+    @property
+    def empty(self) -> bool:
+        return self.totals()['total_transactions'] == 0
+
+    def _group(self, dimensions: List[str]) -> pd.DataFrame:
+        raise NotImplementedError
+
+
+class QueryAggregates(SalesAggregates):
+    """Aggregates computed with GROUP BY queries on the sales table"""
+
+    def __init__(self, company_id: int, start_date: Optional[date] = None,
+                 end_date: Optional[date] = None):
+        super().__init__()
+        self.company_id = company_id
+        self.start_date = start_date
+        self.end_date = end_date
+
+    def _filters(self):
+        filters = [Sale.company_id == self.company_id]
+        if self.start_date:
+            filters.append(Sale.sale_date >= self.start_date)
+        if self.end_date:
+            filters.append(Sale.sale_date <= self.end_date)
+        return filters
+
+    @staticmethod
+    def _dimension_column(dimension: str):
+        if dimension == 'payment_method':
+            return PAYMENT_METHOD
+        if dimension == 'day_of_week':
+            # 0 = Sunday on both PostgreSQL and SQLite
+            return extract('dow', Sale.sale_date)
+        if dimension == 'month':
+            return extract('month', Sale.sale_date)
+        if dimension == 'year_month':
+            return year_month(Sale.sale_date)
+        return getattr(Sale, dimension)
+
+    def _measures(self):
+        return (
+            func.coalesce(func.sum(Sale.total), 0),
+            func.count(Sale.id),
+            func.coalesce(func.sum(Sale.quantity), 0)
+        )
+
+    def _group(self, dimensions: List[str]) -> pd.DataFrame:
+        columns = [self._dimension_column(d).label(d) for d in dimensions]
+        revenue, transactions, quantity = self._measures()
+        stmt = select(
+            *columns,
+            revenue.label('total_revenue'),
+            transactions.label('total_transactions'),
+            quantity.label('total_quantity')
+        ).where(*self._filters())
+        if columns:
+            stmt = stmt.group_by(*columns)
+
+        rows = db.session.execute(stmt).all()
+        grouped = pd.DataFrame(rows, columns=dimensions + self.MEASURES)
+        grouped['total_revenue'] = grouped['total_revenue'].astype(float)
+        grouped['total_transactions'] = grouped['total_transactions'].astype(int)
+        grouped['total_quantity'] = grouped['total_quantity'].astype(int)
+
+        if 'day_of_week' in dimensions:
+            grouped['day_of_week'] = [DAY_NAMES[(int(d) - 1) % 7] for d in grouped['day_of_week']]
+        if 'month' in dimensions:
+            grouped['month'] = [MONTH_NAMES[int(m) - 1] for m in grouped['month']]
+        if 'year_month' in dimensions:
+            grouped['year_month'] = grouped['year_month'].astype(int)
+
+        if dimensions:
+            grouped = grouped.sort_values(dimensions).reset_index(drop=True)
+        return grouped
+
+
+class RollupAggregates(QueryAggregates):
+    """Aggregates read from the sales_daily_rollup table instead of raw sales"""
+
+    def _filters(self):
+        filters = [SalesDailyRollup.company_id == self.company_id]
+        if self.start_date:
+            filters.append(SalesDailyRollup.sale_date >= self.start_date)
+        if self.end_date:
+            filters.append(SalesDailyRollup.sale_date <= self.end_date)
+        return filters
+
+    def _measures(self):
+        return (
+            func.coalesce(func.sum(SalesDailyRollup.total), 0),
+            func.coalesce(func.sum(SalesDailyRollup.sale_count), 0),
+            func.coalesce(func.sum(SalesDailyRollup.quantity), 0)
+        )
+
+    @staticmethod
+    def _dimension_column(dimension: str):
+        if dimension == 'day_of_week':
+            return extract('dow', SalesDailyRollup.sale_date)
+        if dimension == 'month':
+            return extract('month', SalesDailyRollup.sale_date)
+        if dimension == 'year_month':
+            return year_month(SalesDailyRollup.sale_date)
+        return getattr(SalesDailyRollup, dimension)
+
+
+class FrameAggregates(SalesAggregates):
+    """Aggregates computed from a DataFrame built by get_company_sales_data (SalesFrameLoader)"""
+
+    def __init__(self, df: pd.DataFrame):
+        super().__init__()
+        self.df = df
+
+    def _group(self, dimensions: List[str]) -> pd.DataFrame:
+        if not dimensions:
+            return pd.DataFrame([{
+                'total_revenue': int(self.df['total_cents'].sum()) / 100,
+                'total_transactions': len(self.df),
+                'total_quantity': int(self.df['quantity'].sum())
+            }])
+        if self.df.empty:
+            return pd.DataFrame(columns=dimensions + self.MEASURES)
+
+        grouped = self.df.groupby(dimensions, observed=True, sort=False).agg(
+            total_revenue=('total_cents', 'sum'),
+            total_transactions=('total_cents', 'count'),
+            total_quantity=('quantity', 'sum')
+        ).reset_index()
+        grouped['total_revenue'] = grouped['total_revenue'] / 100
+
+        # Match QueryAggregates: plain values sorted by value, dates as date objects
+        for dimension in dimensions:
+            if dimension == 'sale_date':
+                grouped[dimension] = grouped[dimension].dt.date
+            elif isinstance(grouped[dimension].dtype, pd.CategoricalDtype):
+                grouped[dimension] = grouped[dimension].astype(object)
+        return grouped.sort_values(dimensions).reset_index(drop=True)
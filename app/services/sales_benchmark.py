@@ -0,0 +1,233 @@
+"""
+Sales Benchmark
+Times sales import/export, every analysis and the main routes, and reports the results as JSON
+"""
+
+import platform
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from flask import url_for
+
+from app import db
+from app.models.company import Company
+from app.models.sales import Sale
+from app.services.analytics_cache import analytics_cache
+from app.services.analytics_service import ANALYSIS_METHODS, PAGE_DEFAULT_DAYS, AnalyticsService
+from app.services.sales_import_export import SalesImportExportService
+from app.services.sales_seeder import SalesSeeder
+
+BENCHMARK_FORMAT = 1
+DEFAULT_REPEAT = 3
+DEFAULT_IMPORT_ROWS = 5000
+
+# (endpoint, query parameters) fetched through the test client
+ROUTES = [
+    ('dashboard.dashboard', {}),
+    ('sales.index', {}),
+    ('sales.export_sales', {}),
+    ('analytics.index', {}),
+    ('analytics.reports', {}),
+    ('analytics.api_data', {'type': 'dashboard', 'format': 'series'}),
+    ('analytics.api_timeseries', {'granularity': 'day'}),
+    ('analytics.api_timeseries', {'granularity': 'month'}),
+    ('analytics.api_batch', {'types': 'stores,categories,products,payments,days,months', 'format': 'series'})
+]
+
+
+class SalesBenchmark:
+    """
+    Runs the sales workloads against one company and collects timings.
+
+    Each measurement runs ``repeat`` times with the analytics cache cleared
+    before every run, so the numbers are for cold requests. Imports go into
+    a throwaway company (created from the same profile and dropped at the
+    end) so the benchmarked company's data is the same on every run. Results
+    are plain dicts, ready for json.dump, with enough metadata (row counts,
+    database dialect, Python version) to compare runs over time.
+
+    Must run inside an app context.
+    """
+
+    def __init__(self, app, company_id: int, repeat: int = DEFAULT_REPEAT,
+                 import_rows: int = DEFAULT_IMPORT_ROWS, seeder: Optional[SalesSeeder] = None):
+        self.app = app
+        self.company_id = company_id
+        self.repeat = max(repeat, 1)
+        self.import_rows = import_rows
+        self.seeder = seeder or SalesSeeder(seed=0)
+        self.company = Company.query.get(company_id)
+        if not self.company:
+            raise ValueError(f"Company with ID {company_id} not found")
+
+    def run(self, groups: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Run the benchmark groups ('export', 'import', 'analytics', 'routes'; all by default)
+
+        Returns:
+            {'format', 'started_at', 'environment', 'dataset', 'results'}; each
+            result has name, group, runs (seconds), min, median, mean and any
+            extra details such as row counts or status codes
+        """
+        runners = {
+            'export': self.bench_export,
+            'import': self.bench_import,
+            'analytics': self.bench_analytics,
+            'routes': self.bench_routes
+        }
+        started_at = datetime.utcnow().isoformat(timespec='seconds') + 'Z'
+        results = []
+        for group in groups or runners:
+            results.extend(runners[group]())
+
+        return {
+            'format': BENCHMARK_FORMAT,
+            'started_at': started_at,
+            'environment': {
+                'python': sys.version.split()[0],
+                'platform': platform.platform(),
+                'database': db.engine.dialect.name
+            },
+            'dataset': {
+                'company_id': self.company_id,
+                'sales': Sale.query.filter_by(company_id=self.company_id).count(),
+                'repeat': self.repeat,
+                'import_rows': self.import_rows
+            },
+            'results': results
+        }
+
+    # Groups
+
+    def bench_export(self) -> List[Dict[str, Any]]:
+        service = SalesImportExportService(self.company_id)
+        details = {}
+
+        def export():
+            details['bytes'] = len(service.export_sales_to_csv())
+
+        return [self._measure('export_sales_to_csv', 'export', export, details)]
+
+    def bench_import(self) -> List[Dict[str, Any]]:
+        if self.import_rows <= 0:
+            return []
+
+        # Import the benchmarked company's own rows, so the CSV has its shape
+        rows = self.seeder.generate_rows(self.company_id, self.company.admin_id, self.import_rows)
+        lines = [','.join(SalesImportExportService.CSV_HEADERS)]
+        for row in rows:
+            lines.append(','.join([
+                row['sale_date'].strftime('%Y-%m-%d'), self._csv(row['store_name']),
+                self._csv(row['product_category']), self._csv(row['product_name']),
+                str(row['quantity']), f"{row['total']:.2f}", f"{row['card_amount']:.2f}",
+                f"{row['cash_amount']:.2f}", self._csv(row['notes'])
+            ]))
+        csv_content = '\n'.join(lines) + '\n'
+
+        details = {'rows': self.import_rows}
+        runs = []
+        for index in range(self.repeat):
+            target = self.seeder.create_company(
+                f'Benchmark import {datetime.utcnow():%Y%m%d%H%M%S} {index + 1}', 0, 0)
+            target_id, user_id = target.id, target.admin_id
+            try:
+                service = SalesImportExportService(target_id)
+                started = time.perf_counter()
+                imported, failed, _ = service.import_sales_from_csv(csv_content, user_id)
+                runs.append(time.perf_counter() - started)
+                details.update(imported=imported, failed=failed)
+            finally:
+                db.session.rollback()
+                SalesSeeder.drop_company(target_id)
+
+        return [self._result('import_sales_from_csv', 'import', runs, details)]
+
+    def bench_analytics(self) -> List[Dict[str, Any]]:
+        service = AnalyticsService(chart_format='series')
+        end_date = date.today()
+        start_date = end_date - timedelta(days=365)
+        results = []
+
+        frame = {}
+        frame_details = {'days': 365}
+
+        def load_frame():
+            frame['df'] = service.get_company_sales_data(self.company_id, start_date, end_date)
+            frame_details['rows'] = len(frame['df'])
+
+        results.append(self._measure('get_company_sales_data', 'analytics', load_frame, frame_details))
+
+        # Grouped analyses query the rollup lazily, so each run gets fresh aggregates
+        for analysis_type, method in ANALYSIS_METHODS.items():
+            results.append(self._measure(
+                method, 'analytics',
+                lambda analysis_type=analysis_type: service.run_analysis(
+                    analysis_type, df=frame['df'],
+                    aggregates=service.get_sales_aggregates(self.company_id, start_date, end_date)),
+                {'analysis_type': analysis_type, 'days': 365}))
+
+        for page, days in PAGE_DEFAULT_DAYS.items():
+            page_end = date.today()
+            results.append(self._measure(
+                f'compute_page:{page}', 'analytics',
+                lambda page=page, days=days: service.compute_page(
+                    page, self.company_id, page_end - timedelta(days=days), page_end),
+                {'days': days}))
+        return results
+
+    def bench_routes(self) -> List[Dict[str, Any]]:
+        client = self.app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(self.company.admin_id)
+            session['_fresh'] = True
+
+        results = []
+        for endpoint, params in ROUTES:
+            with self.app.test_request_context():
+                url = url_for(endpoint, **params)
+            details = {'url': url}
+
+            def fetch(url=url):
+                response = client.get(url)
+                details['status'] = response.status_code
+                details['bytes'] = len(response.get_data())
+
+            results.append(self._measure(endpoint, 'routes', fetch, details))
+        return results
+
+    # Measuring
+
+    def _measure(self, name: str, group: str, func: Callable[[], Any],
+                 details: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        runs = []
+        for _ in range(self.repeat):
+            analytics_cache.clear()
+            started = time.perf_counter()
+            func()
+            runs.append(time.perf_counter() - started)
+            # Drop loaded objects so the next run starts from the database again
+            db.session.rollback()
+        return self._result(name, group, runs, details)
+
+    @staticmethod
+    def _result(name: str, group: str, runs: List[float], details: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        result = {
+            'name': name,
+            'group': group,
+            'runs': [round(seconds, 6) for seconds in runs],
+            'min': round(min(runs), 6) if runs else None,
+            'median': round(statistics.median(runs), 6) if runs else None,
+            'mean': round(statistics.mean(runs), 6) if runs else None
+        }
+        result.update(details or {})
+        return result
+
+    @staticmethod
+    def _csv(value: str) -> str:
+        value = value or ''
+        if any(char in value for char in ',"\n'):
+            return '"' + value.replace('"', '""') + '"'
+        return value
@@ -0,0 +1,194 @@
+"""
+Sales Frame Loader
+Builds the row-level sales DataFrame used by analytics in a fixed number of queries
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import Integer, cast, func, select
+
+from app import db
+from app.models.product import Embellishment, sale_embellishments
+from app.models.sales import Sale
+from app.services.sales_aggregates import DAY_NAMES, MONTH_NAMES
+from app.utils.lazy_import import LazyModule
+
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+
+FRAME_COLUMNS = [
+    'sale_id', 'sale_date', 'store_name', 'product_category', 'product_name', 'quantity',
+    'total_cents', 'card_cents', 'cash_cents', 'payment_method', 'embellishments',
+    'day_of_week', 'month', 'year', 'year_month'
+]
+
+PAYMENT_METHODS = ['Both (Card + Cash)', 'Card', 'Cash', 'Unknown']
+
+
+@lru_cache(maxsize=None)
+def frame_dtypes():
+    """Column dtypes of the sales frame (built on first use, pandas is imported lazily)"""
+    return {
+        'sale_id': 'int64',
+        'sale_date': 'datetime64[ns]',
+        'store_name': 'category',
+        'product_category': 'category',
+        'product_name': 'category',
+        'quantity': 'int32',
+        'total_cents': 'int64',
+        'card_cents': 'int64',
+        'cash_cents': 'int64',
+        'payment_method': pd.CategoricalDtype(PAYMENT_METHODS),
+        'embellishments': 'object',
+        'day_of_week': pd.CategoricalDtype(DAY_NAMES, ordered=True),
+        'month': pd.CategoricalDtype(MONTH_NAMES, ordered=True),
+        'year': 'int16',
+        'year_month': 'int32'
+    }
+
+
+def cents(column):
+    """SQL expression for a money column as integer cents"""
+    return cast(func.round(column * 100), Integer)
+
+
+def empty_frame() -> pd.DataFrame:
+    """Frame with FRAME_COLUMNS and frame_dtypes() and no rows"""
+    return pd.DataFrame(columns=FRAME_COLUMNS).astype(frame_dtypes())
+
+
+def build_frame(sale_id, sale_date, store_name, product_category, product_name, quantity,
+                total_cents, card_cents, cash_cents, embellishments) -> pd.DataFrame:
+    """
+    Assemble the typed analytics frame from raw column values
+
+    Dimension columns may be given as plain values or as pandas Categoricals;
+    payment method and the calendar columns are derived here.
+    """
+    card_cents = np.asarray(card_cents, dtype='int64')
+    cash_cents = np.asarray(cash_cents, dtype='int64')
+    dates = pd.DatetimeIndex(pd.to_datetime(sale_date))
+
+    df = pd.DataFrame({
+        'sale_id': np.asarray(sale_id, dtype='int64'),
+        'sale_date': dates,
+        'store_name': pd.Categorical(store_name),
+        'product_category': pd.Categorical(product_category),
+        'product_name': pd.Categorical(product_name),
+        'quantity': np.asarray(quantity, dtype='int32'),
+        'total_cents': np.asarray(total_cents, dtype='int64'),
+        'card_cents': card_cents,
+        'cash_cents': cash_cents,
+        'payment_method': pd.Categorical.from_codes(
+            np.select(
+                [(card_cents > 0) & (cash_cents > 0), card_cents > 0, cash_cents > 0],
+                [0, 1, 2],
+                default=3
+            ),
+            dtype=frame_dtypes()['payment_method']
+        ),
+        'embellishments': embellishments,
+        'day_of_week': pd.Categorical.from_codes(dates.dayofweek, dtype=frame_dtypes()['day_of_week']),
+        'month': pd.Categorical.from_codes(dates.month - 1, dtype=frame_dtypes()['month']),
+        'year': dates.year.astype('int16'),
+        'year_month': (dates.year * 100 + dates.month).astype('int32')
+    })
+
+    return df[FRAME_COLUMNS]
+
+
+class SalesFrameLoader:
+    """
+    Loads one company's sales as column arrays.
+
+    Scalar columns come from a single Core select and embellishment names from
+    one join against sale_embellishments, so the cost no longer grows with one
+    extra query per sale.
+
+    The frame is typed for fast grouping and a small footprint: dimension
+    columns are categoricals, money is integer cents (converted in SQL, so no
+    per-row Decimal handling and exact sums) and sale_date is datetime64.
+    """
+
+    def __init__(self, company_id: int):
+        self.company_id = company_id
+
+    def _filters(self, start_date: Optional[date], end_date: Optional[date]):
+        filters = [Sale.company_id == self.company_id]
+        if start_date:
+            filters.append(Sale.sale_date >= start_date)
+        if end_date:
+            filters.append(Sale.sale_date <= end_date)
+        return filters
+
+    def load(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> pd.DataFrame:
+        """
+        Load sales in the date range
+
+        Returns:
+            DataFrame with FRAME_COLUMNS and frame_dtypes(), one row per sale;
+            'embellishments' holds a list of embellishment names (empty when
+            there are none)
+        """
+        return self._load(self._filters(start_date, end_date))
+
+    def load_updated_since(self, since: datetime) -> pd.DataFrame:
+        """Load sales (any sale date) created or modified at or after `since`"""
+        return self._load([Sale.company_id == self.company_id, Sale.updated_at >= since])
+
+    def _load(self, filters) -> pd.DataFrame:
+        card = func.coalesce(Sale.card_amount, 0)
+        cash = func.coalesce(Sale.cash_amount, 0)
+
+        stmt = select(
+            Sale.id,
+            Sale.sale_date,
+            Sale.store_name,
+            Sale.product_category,
+            Sale.product_name,
+            Sale.quantity,
+            cents(func.coalesce(Sale.total, card + cash)),
+            cents(card),
+            cents(cash)
+        ).where(*filters)
+        rows = db.session.execute(stmt).all()
+
+        if not rows:
+            return empty_frame()
+
+        (sale_id, sale_date, store_name, product_category, product_name,
+         quantity, total_cents, card_cents, cash_cents) = zip(*rows)
+
+        names = self._embellishment_names(filters).to_dict()
+
+        return build_frame(
+            sale_id=sale_id,
+            sale_date=sale_date,
+            store_name=store_name,
+            product_category=product_category,
+            product_name=product_name,
+            quantity=quantity,
+            total_cents=total_cents,
+            card_cents=card_cents,
+            cash_cents=cash_cents,
+            embellishments=[names.get(sid, []) for sid in sale_id]
+        )
+
+    def _embellishment_names(self, filters) -> pd.Series:
+        """Lists of embellishment names keyed by sale id"""
+        stmt = select(sale_embellishments.c.sale_id, Embellishment.name).join(
+            Embellishment, Embellishment.id == sale_embellishments.c.embellishment_id
+        ).join(
+            Sale, Sale.id == sale_embellishments.c.sale_id
+        ).where(*filters)
+        pairs = db.session.execute(stmt).all()
+
+        if not pairs:
+            return pd.Series(dtype=object)
+
+        pairs = pd.DataFrame(pairs, columns=['sale_id', 'name'])
+        return pairs.groupby('sale_id')['name'].agg(list)
@@ -5,10 +5,14 @@ Handles importing and exporting sales data in CSV format
 
 import csv
 import io
+import queue
+import threading
 from datetime import datetime, date
 from decimal import Decimal
-from typing import List, Dict, Tuple, Optional
+from itertools import islice
+from typing import Iterable, Iterator, List, Dict, TextIO, Tuple, Optional
 from flask import current_app
+from sqlalchemy import Numeric, cast, func, insert, select, text
 from sqlalchemy.exc import IntegrityError
 
 from app import db
@@ -18,6 +22,53 @@ from app.models.product_category import ProductCategory
 from app.models.store import Store
 from app.models.user import User
 from app.models.company import Company
+from app.models.data_version import CompanyDataVersion
+from app.services.sales_rollup import SalesRollupService
+
+# Rows parsed, resolved and inserted together
+IMPORT_BATCH_SIZE = 5000
+
+# Rows fetched at a time when exporting without COPY
+EXPORT_CHUNK_ROWS = 5000
+
+# COPY TO output is handed to the response in chunks of about this size,
+# with at most COPY_QUEUE_CHUNKS waiting
+COPY_CHUNK_BYTES = 64 * 1024
+COPY_QUEUE_CHUNKS = 16
+
+# PostgreSQL import staging table, one per connection; store and product ids
+# are resolved in Python before the rows are staged
+STAGING_COLUMNS = [
+    'sale_date', 'store_id', 'store_name', 'product_id', 'product_category', 'product_name',
+    'quantity', 'total', 'card_amount', 'cash_amount', 'notes'
+]
+
+STAGING_TABLE_DDL = """
+    CREATE TEMPORARY TABLE IF NOT EXISTS sales_import_staging (
+        sale_date DATE NOT NULL,
+        store_id INTEGER NOT NULL,
+        store_name VARCHAR(200) NOT NULL,
+        product_id INTEGER NOT NULL,
+        product_category VARCHAR(200) NOT NULL,
+        product_name VARCHAR(200) NOT NULL,
+        quantity INTEGER NOT NULL,
+        total NUMERIC(10, 2) NOT NULL,
+        card_amount NUMERIC(10, 2),
+        cash_amount NUMERIC(10, 2),
+        notes TEXT
+    ) ON COMMIT DELETE ROWS
+"""
+
+STAGING_INSERT_SQL = """
+    INSERT INTO sales (
+        company_id, user_id, sale_date, store_id, store_name, product_id, product_category,
+        product_name, quantity, total, card_amount, cash_amount, notes, created_at, updated_at
+    )
+    SELECT
+        :company_id, :user_id, sale_date, store_id, store_name, product_id, product_category,
+        product_name, quantity, total, card_amount, cash_amount, notes, :now, :now
+    FROM sales_import_staging
+"""
 
 
 class SalesImportExportService:
@@ -54,44 +105,223 @@ class SalesImportExportService:
         Returns:
             CSV string with sales data
         """
-        # Build query
-        query = Sale.query.filter_by(company_id=self.company_id)
+        return ''.join(self.iter_sales_csv(start_date, end_date))
+    
+    def iter_sales_csv(self, start_date: Optional[date] = None,
+                       end_date: Optional[date] = None) -> Iterator[str]:
+        """
+        Export sales data to CSV as a stream of text chunks
         
+        On PostgreSQL (psycopg2) the database writes the CSV itself through
+        COPY (SELECT ...) TO STDOUT, read on a separate connection and handed
+        over in chunks as it arrives. Elsewhere rows are fetched and written
+        EXPORT_CHUNK_ROWS at a time. Either way memory stays bounded however
+        many sales the company has.
+        
+        Args:
+            start_date: Optional start date filter
+            end_date: Optional end date filter
+        """
+        stmt = self._export_query(start_date, end_date)
+        if self._use_copy():
+            return self._copy_out(stmt)
+        return self._iter_csv_rows(stmt)
+    
+    def iter_sales_csv_with_progress(self, start_date: Optional[date] = None,
+                                     end_date: Optional[date] = None,
+                                     progress_callback=None) -> Iterator[str]:
+        """
+        Export sales data to CSV as a stream of text chunks, with progress tracking
+        
+        Rows are counted from the line breaks in each chunk once it has been
+        handed on, so a note spanning several lines can make the count run
+        ahead; it is capped at the total.
+        
+        Args:
+            start_date: Optional start date filter
+            end_date: Optional end date filter
+            progress_callback: Optional callback function for progress updates,
+                called as (percent, status, detail) after every chunk, with
+                the processed and total row counts and the state ('running',
+                'completed' or 'failed') as keyword arguments
+        """
+        progress_callback = progress_callback or (lambda *args, **kwargs: None)
+        total_rows = self.count_sales(start_date, end_date)
+        processed = 0
+        progress_callback(0, 'Starting export...', f'Exporting {total_rows} sales',
+                          processed=0, total=total_rows, state='running')
+        
+        try:
+            header = True
+            for chunk in self.iter_sales_csv(start_date, end_date):
+                lines = chunk.count('\n')
+                if header:
+                    lines, header = lines - 1, False
+                yield chunk
+                
+                processed = min(processed + lines, total_rows)
+                progress = int(processed / total_rows * 100) if total_rows else 0
+                progress_callback(min(progress, 99), 'Exporting sales...',
+                                  f'Exported {processed} of {total_rows} sales',
+                                  processed=processed, total=total_rows, state='running')
+        except GeneratorExit:
+            progress_callback(0, 'Export Cancelled', 'The download was stopped before it finished',
+                              processed=processed, total=total_rows, state='failed')
+            raise
+        except Exception as e:
+            progress_callback(0, 'Export Failed', str(e), processed=processed, total=total_rows, state='failed')
+            raise
+        
+        progress_callback(100, 'Export Complete!', f'Exported {total_rows} sales',
+                          processed=total_rows, total=total_rows, state='completed')
+    
+    def count_sales(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> int:
+        """Number of sales an export with these filters writes"""
+        stmt = select(func.count(Sale.id)).where(Sale.company_id == self.company_id)
         if start_date:
-            query = query.filter(Sale.sale_date >= start_date)
+            stmt = stmt.where(Sale.sale_date >= start_date)
         if end_date:
-            query = query.filter(Sale.sale_date <= end_date)
-            
-        sales = query.order_by(Sale.sale_date.desc()).all()
+            stmt = stmt.where(Sale.sale_date <= end_date)
+        return db.session.execute(stmt).scalar()
+    
+    def _export_query(self, start_date: Optional[date], end_date: Optional[date]):
+        """SELECT returning the export columns, with the same fallbacks for missing names as ever"""
+        money = Numeric(10, 2)
+        stmt = select(
+            Sale.sale_date.label('sale_date'),
+            func.coalesce(func.nullif(Sale.store_name, ''), Store.name, 'Unknown Store').label('store_name'),
+            func.coalesce(func.nullif(Sale.product_category, ''), ProductCategory.name,
+                          'Unknown Category').label('product_category'),
+            func.coalesce(func.nullif(Sale.product_name, ''), Product.name, 'Unknown Product').label('product_name'),
+            Sale.quantity.label('quantity'),
+            cast(func.coalesce(Sale.total, func.coalesce(Sale.card_amount, 0) + func.coalesce(Sale.cash_amount, 0)),
+                 money).label('total'),
+            cast(func.coalesce(Sale.card_amount, 0), money).label('card_amount'),
+            cast(func.coalesce(Sale.cash_amount, 0), money).label('cash_amount'),
+            # NULL rather than '' so COPY writes an empty field, not ""
+            func.nullif(Sale.notes, '').label('notes')
+        ).outerjoin(
+            Store, Store.id == Sale.store_id
+        ).outerjoin(
+            Product, Product.id == Sale.product_id
+        ).outerjoin(
+            ProductCategory, ProductCategory.id == Product.category_id
+        ).where(Sale.company_id == self.company_id)
         
-        # Create CSV content
+        if start_date:
+            stmt = stmt.where(Sale.sale_date >= start_date)
+        if end_date:
+            stmt = stmt.where(Sale.sale_date <= end_date)
+        return stmt.order_by(Sale.sale_date.desc())
+    
+    def _iter_csv_rows(self, stmt) -> Iterator[str]:
         output = io.StringIO()
         writer = csv.writer(output)
         
         # Write header
         writer.writerow(self.CSV_HEADERS)
         
-        # Write data rows
-        for sale in sales:
-            row = [
-                sale.sale_date.strftime('%Y-%m-%d'),
-                sale.store_name if hasattr(sale, 'store_name') and sale.store_name else (sale.store.name if sale.store else 'Unknown Store'),
-                sale.product_category if hasattr(sale, 'product_category') and sale.product_category else (sale.product.category.name if sale.product and sale.product.category else 'Unknown Category'),
-                sale.product_name if hasattr(sale, 'product_name') and sale.product_name else (sale.product.name if sale.product else 'Unknown Product'),
-                str(sale.quantity),
-                f"{sale.total:.2f}" if hasattr(sale, 'total') and sale.total else f"{sale.total_amount:.2f}",
-                f"{sale.card_amount:.2f}",
-                f"{sale.cash_amount:.2f}",
-                sale.notes or ''
-            ]
-            writer.writerow(row)
-        
-        return output.getvalue()
+        result = db.session.execute(stmt.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+        for rows in result.partitions():
+            for row in rows:
+                writer.writerow([
+                    row.sale_date.strftime('%Y-%m-%d'),
+                    row.store_name,
+                    row.product_category,
+                    row.product_name,
+                    str(row.quantity),
+                    f"{Decimal(row.total):.2f}",
+                    f"{Decimal(row.card_amount):.2f}",
+                    f"{Decimal(row.cash_amount):.2f}",
+                    row.notes or ''
+                ])
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+        
+        # Header only when there were no sales
+        if output.tell():
+            yield output.getvalue()
+    
+    def _copy_out(self, stmt) -> Iterator[str]:
+        """Stream ``COPY (stmt) TO STDOUT`` as CSV text chunks"""
+        engine = db.engine
+        compiled = stmt.compile(dialect=engine.dialect)
+        chunks = queue.Queue(maxsize=COPY_QUEUE_CHUNKS)
+        cancelled = threading.Event()
+        finished = object()
+        
+        class Pipe:
+            """File-like target for copy_expert that forwards ~64KB chunks to the queue"""
+            def __init__(self):
+                self.buffer = []
+                self.size = 0
+            
+            def write(self, data):
+                if cancelled.is_set():
+                    raise IOError("Export cancelled")
+                self.buffer.append(data)
+                self.size += len(data)
+                if self.size >= COPY_CHUNK_BYTES:
+                    self.flush()
+            
+            def flush(self):
+                if self.buffer:
+                    chunks.put(b''.join(self.buffer).decode('utf-8'))
+                    self.buffer, self.size = [], 0
+        
+        def run():
+            # A connection of its own: COPY TO has to be read while the response is being sent
+            connection = engine.raw_connection()
+            try:
+                cursor = connection.cursor()
+                cursor.execute("SET LOCAL DateStyle TO ISO")
+                cursor.execute("SET LOCAL client_encoding TO 'UTF8'")
+                query = cursor.mogrify(str(compiled), compiled.params).decode('utf-8')
+                pipe = Pipe()
+                cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", pipe)
+                pipe.flush()
+                chunks.put(finished)
+            except Exception as e:
+                chunks.put(e)
+            finally:
+                connection.close()
+        
+        def stream():
+            worker = threading.Thread(target=run, name='sales-export-copy', daemon=True)
+            worker.start()
+            try:
+                while True:
+                    item = chunks.get()
+                    if item is finished:
+                        return
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+            finally:
+                # Client went away or we are done: let the COPY stop and unblock it
+                cancelled.set()
+                while worker.is_alive():
+                    try:
+                        chunks.get(timeout=0.1)
+                    except queue.Empty:
+                        pass
+        
+        return stream()
+    
+    @staticmethod
+    def _use_copy() -> bool:
+        """Whether the COPY fast paths apply (PostgreSQL through psycopg2)"""
+        dialect = db.session.get_bind().dialect
+        return dialect.name == 'postgresql' and dialect.driver == 'psycopg2'
     
     def import_sales_from_csv(self, csv_content: str, user_id: int) -> Tuple[int, int, List[str]]:
         """
         Import sales data from CSV content
         
+        All rows are committed together: a database error rolls back the
+        whole import.
+        
         Args:
             csv_content: CSV content as string
             user_id: ID of the user performing the import
@@ -99,41 +329,21 @@ class SalesImportExportService:
         Returns:
             Tuple of (successful_imports, failed_imports, error_messages)
         """
-        successful_imports = 0
-        failed_imports = 0
-        error_messages = []
-        
-        # Parse CSV
         csv_reader = csv.DictReader(io.StringIO(csv_content))
         
-        # Validate headers - only require essential ones
-        required_headers = {'sale_date'}  # Only sale_date is truly required
-        actual_headers = set(csv_reader.fieldnames or [])
-        
-        if not required_headers.issubset(actual_headers):
-            missing_headers = required_headers - actual_headers
-            error_messages.append(f"Missing required headers: {', '.join(missing_headers)}")
+        error_messages = self._check_headers(csv_reader)
+        if error_messages:
             return 0, 0, error_messages
         
-        # Process each row
-        for row_num, row in enumerate(csv_reader, start=2):  # Start at 2 since row 1 is header
-            try:
-                sale = self._create_sale_from_row(row, user_id, row_num)
-                if sale:
-                    db.session.add(sale)
-                    successful_imports += 1
-            except Exception as e:
-                failed_imports += 1
-                error_messages.append(f"Row {row_num}: {str(e)}")
-                current_app.logger.error(f"Import error on row {row_num}: {str(e)}")
-        
-        # Commit successful imports
         try:
+            successful_imports, failed_imports, error_messages = self._import_rows(
+                csv_reader, user_id, commit_batches=False
+            )
             db.session.commit()
         except IntegrityError as e:
             db.session.rollback()
-            error_messages.append(f"Database error during commit: {str(e)}")
-            return 0, successful_imports + failed_imports, error_messages
+            total_rows = sum(1 for _ in csv.reader(io.StringIO(csv_content))) - 1
+            return 0, total_rows, [f"Database error during commit: {str(e)}"]
         
         return successful_imports, failed_imports, error_messages
     
@@ -141,86 +351,227 @@ class SalesImportExportService:
         """
         Import sales data from CSV content with progress tracking
         
+        Rows are committed in batches of IMPORT_BATCH_SIZE; a database error
+        only loses the batch it happened in.
+        
         Args:
             csv_content: CSV content as string
             user_id: ID of the user performing the import
-            progress_callback: Optional callback function for progress updates
+            progress_callback: Optional callback function for progress updates,
+                called as (percent, status, detail) after every batch, with
+                the processed, successful, failed and total row counts as
+                keyword arguments
             
         Returns:
             Tuple of (successful_imports, failed_imports, error_messages)
         """
-        successful_imports = 0
-        failed_imports = 0
-        error_messages = []
+        return self.import_sales_from_file(io.StringIO(csv_content), user_id, progress_callback)
+    
+    def import_sales_from_file(self, csv_file: TextIO, user_id: int, progress_callback=None) -> Tuple[int, int, List[str]]:
+        """
+        Import sales data from a CSV file with progress tracking
         
-        # Parse CSV
-        csv_reader = csv.DictReader(io.StringIO(csv_content))
+        Same as import_sales_with_progress, but the file is read twice (once
+        to count rows, once to import) rather than loaded, so memory use is
+        bounded by IMPORT_BATCH_SIZE whatever the file size.
+        
+        Args:
+            csv_file: Seekable text file at its start, opened with newline=''
+            user_id: ID of the user performing the import
+            progress_callback: As for import_sales_with_progress
+            
+        Returns:
+            Tuple of (successful_imports, failed_imports, error_messages)
+        """
+        error_messages = self._check_headers(csv.DictReader(csv_file))
+        if error_messages:
+            return 0, 0, error_messages
+        
+        # Count rows up front for the percentage, without keeping them
+        csv_file.seek(0)
+        total_rows = sum(1 for _ in csv.reader(csv_file)) - 1
+        if total_rows <= 0:
+            return 0, 0, ["No data rows found in CSV"]
         
-        # Validate headers - only require essential ones
+        csv_file.seek(0)
+        return self._import_rows(csv.DictReader(csv_file), user_id, commit_batches=True,
+                                 progress_callback=progress_callback, total_rows=total_rows)
+    
+    @staticmethod
+    def _check_headers(csv_reader: csv.DictReader) -> List[str]:
+        """Error messages for missing required headers (empty when the headers are fine)"""
         required_headers = {'sale_date'}  # Only sale_date is truly required
         actual_headers = set(csv_reader.fieldnames or [])
         
         if not required_headers.issubset(actual_headers):
             missing_headers = required_headers - actual_headers
-            error_messages.append(f"Missing required headers: {', '.join(missing_headers)}")
-            return 0, 0, error_messages
-        
-        # Count total rows first for progress calculation
-        rows = list(csv_reader)
-        total_rows = len(rows)
-        
-        if total_rows == 0:
-            error_messages.append("No data rows found in CSV")
-            return 0, 0, error_messages
+            return [f"Missing required headers: {', '.join(missing_headers)}"]
+        return []
+    
+    def _import_rows(self, rows: Iterable[Dict[str, str]], user_id: int, commit_batches: bool,
+                     progress_callback=None, total_rows: Optional[int] = None) -> Tuple[int, int, List[str]]:
+        """
+        Import CSV rows in batches of IMPORT_BATCH_SIZE
         
-        # Process each row with progress tracking
-        batch_size = 50  # Process in batches for better performance
+        Each batch is parsed first, then its stores, categories and products
+        are resolved against in-memory name maps (missing ones created with
+        one insert per type) and its sales written with one multi-row
+        insert, so the number of statements no longer grows with every row.
+        """
+        successful_imports = 0
+        failed_imports = 0
+        error_messages = []
         processed_count = 0
         
-        for i, row in enumerate(rows):
-            row_num = i + 2  # Start at 2 since row 1 is header
+        self._load_dimensions()
+        row_iter = enumerate(rows, start=2)  # Start at 2 since row 1 is header
+        
+        while True:
+            batch = list(islice(row_iter, IMPORT_BATCH_SIZE))
+            if not batch:
+                break
             
-            try:
-                sale = self._create_sale_from_row(row, user_id, row_num)
-                if sale:
-                    db.session.add(sale)
-                    successful_imports += 1
-                    
-                    # Commit in batches
-                    if (i + 1) % batch_size == 0:
-                        try:
-                            db.session.commit()
-                        except IntegrityError as e:
-                            db.session.rollback()
-                            error_messages.append(f"Database error in batch ending at row {row_num}: {str(e)}")
-                            # Continue with next batch
-                            
-            except Exception as e:
-                failed_imports += 1
-                error_messages.append(f"Row {row_num}: {str(e)}")
-                current_app.logger.error(f"Import error on row {row_num}: {str(e)}")
+            sales = []
+            for row_num, row in batch:
+                try:
+                    sales.append(self._parse_row(row, user_id, row_num))
+                except Exception as e:
+                    failed_imports += 1
+                    error_messages.append(f"Row {row_num}: {str(e)}")
+                    current_app.logger.error(f"Import error on row {row_num}: {str(e)}")
             
-            processed_count += 1
+            if commit_batches:
+                try:
+                    self._insert_sales(sales)
+                    db.session.commit()
+                    successful_imports += len(sales)
+                except IntegrityError as e:
+                    db.session.rollback()
+                    failed_imports += len(sales)
+                    error_messages.append(f"Database error in batch ending at row {batch[-1][0]}: {str(e)}")
+                    # Rows created in the failed batch are gone, so are their ids
+                    self._load_dimensions()
+            else:
+                self._insert_sales(sales)
+                successful_imports += len(sales)
+            
+            processed_count += len(batch)
             
             # Update progress if callback provided
             if progress_callback:
-                progress = int((processed_count / total_rows) * 100)
-                status = f"Processing sales data... ({processed_count}/{total_rows})"
+                progress = int((processed_count / total_rows) * 100) if total_rows else 100
+                status = f"Processing sales data... ({processed_count}/{total_rows or processed_count})"
                 detail = f"Imported {successful_imports} records, {failed_imports} failed"
-                progress_callback(progress, status, detail)
-        
-        # Final commit for remaining records
-        try:
-            db.session.commit()
-        except IntegrityError as e:
-            db.session.rollback()
-            error_messages.append(f"Database error during final commit: {str(e)}")
+                progress_callback(min(progress, 100), status, detail, processed=processed_count,
+                                  successful=successful_imports, failed=failed_imports, total=total_rows)
         
         return successful_imports, failed_imports, error_messages
     
-    def _create_sale_from_row(self, row: Dict[str, str], user_id: int, row_num: int) -> Sale:
+    def _load_dimensions(self):
+        """Preload the company's store, category and product ids by name"""
+        self._store_ids = {}
+        for store_id, name in db.session.query(Store.id, Store.name).filter_by(
+                company_id=self.company_id).order_by(Store.id):
+            self._store_ids.setdefault(name, store_id)
+        
+        self._category_ids = {}
+        for category_id, name in db.session.query(ProductCategory.id, ProductCategory.name).filter_by(
+                company_id=self.company_id).order_by(ProductCategory.id):
+            self._category_ids.setdefault(name, category_id)
+        
+        self._product_ids = {}
+        for product_id, name, category_id in db.session.query(Product.id, Product.name, Product.category_id).filter_by(
+                company_id=self.company_id).order_by(Product.id):
+            self._product_ids.setdefault((name, category_id), product_id)
+    
+    def _insert_sales(self, sales: List[Dict]):
+        """Create the batch's missing stores, categories and products, then insert its sales"""
+        if not sales:
+            return
+        
+        new_stores = self._missing(sale['store_name'] for sale in sales if sale['store_name'] not in self._store_ids)
+        if new_stores:
+            self._store_ids.update(self._insert_returning(Store, Store.name, [
+                {'company_id': self.company_id, 'name': name, 'location': 'Auto-created during import'}
+                for name in new_stores
+            ]))
+        
+        new_categories = self._missing(
+            sale['product_category'] for sale in sales if sale['product_category'] not in self._category_ids)
+        if new_categories:
+            self._category_ids.update(self._insert_returning(ProductCategory, ProductCategory.name, [
+                {'company_id': self.company_id, 'name': name} for name in new_categories
+            ]))
+        
+        new_products = {}
+        for sale in sales:
+            key = (sale['product_name'], self._category_ids[sale['product_category']])
+            if key not in self._product_ids and key not in new_products:
+                # Use the per-unit price of the product's first sale as base price
+                new_products[key] = sale['total'] / sale['quantity'] if sale['quantity'] > 0 else sale['total']
+        if new_products:
+            created = self._insert_returning(Product, Product.name, [
+                {'company_id': self.company_id, 'name': name, 'category_id': category_id, 'base_price': base_price}
+                for (name, category_id), base_price in new_products.items()
+            ])
+            self._product_ids.update(zip(new_products, (product_id for _, product_id in created)))
+        
+        if new_categories or new_products:
+            # Core inserts skip the ORM flush hook that versions the catalog
+            CompanyDataVersion.bump_catalog(self.company_id)
+        
+        for sale in sales:
+            sale['store_id'] = self._store_ids[sale['store_name']]
+            sale['product_id'] = self._product_ids[(sale['product_name'], self._category_ids[sale['product_category']])]
+        
+        if self._use_copy():
+            self._copy_in(sales)
+        else:
+            db.session.execute(insert(Sale), sales)
+        SalesRollupService.add_rows(sales)
+    
+    def _copy_in(self, sales: List[Dict]):
+        """
+        Insert a batch of sales through COPY into a staging table
+        
+        The rows, with the store and product ids _insert_sales resolved, are
+        streamed with ``COPY ... FROM STDIN`` into a temporary table on the
+        session's connection, then moved into sales by one INSERT ... SELECT.
+        Runs inside the import's transaction.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for sale in sales:
+            writer.writerow([sale[column] for column in STAGING_COLUMNS])
+        buffer.seek(0)
+        
+        with db.session.connection().connection.cursor() as cursor:
+            cursor.execute(STAGING_TABLE_DDL)
+            cursor.copy_expert(
+                f"COPY sales_import_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buffer
+            )
+            db.session.execute(text(STAGING_INSERT_SQL), {
+                'company_id': self.company_id, 'user_id': sales[0]['user_id'], 'now': datetime.utcnow()
+            })
+            cursor.execute("TRUNCATE sales_import_staging")
+    
+    @staticmethod
+    def _missing(names: Iterable[str]) -> List[str]:
+        """Unique names in first-seen order"""
+        return list(dict.fromkeys(names))
+    
+    @staticmethod
+    def _insert_returning(model, name_column, values: List[Dict]) -> List[Tuple[str, int]]:
+        """Insert rows in one statement and return their (name, id) pairs in input order"""
+        result = db.session.execute(
+            insert(model).returning(name_column, model.id, sort_by_parameter_order=True), values
+        )
+        return [(name, row_id) for name, row_id in result]
+    
+    def _parse_row(self, row: Dict[str, str], user_id: int, row_num: int) -> Dict:
         """
-        Create a Sale object from a CSV row - automatically creates missing stores, categories, and products
+        Parse and validate a CSV row into a sale dict (store_id and product_id are filled in later)
         
         Args:
             row: Dictionary representing a CSV row
@@ -228,7 +579,7 @@ class SalesImportExportService:
             row_num: Row number for error reporting
             
         Returns:
-            Sale object ready to be saved
+            Dict of Sale column values
         """
         # Parse and validate sale_date
         try:
@@ -285,63 +636,19 @@ class SalesImportExportService:
         
         notes = row.get('notes', '').strip()
         
-        # Auto-create store if it doesn't exist
-        store = Store.query.filter_by(company_id=self.company_id, name=store_name).first()
-        if not store:
-            store = Store(
-                company_id=self.company_id,
-                name=store_name,
-                location='Auto-created during import'
-            )
-            db.session.add(store)
-            db.session.flush()  # Get the ID
-        
-        # Auto-create category if it doesn't exist
-        category = ProductCategory.query.filter_by(company_id=self.company_id, name=product_category).first()
-        if not category:
-            category = ProductCategory(
-                company_id=self.company_id,
-                name=product_category
-            )
-            db.session.add(category)
-            db.session.flush()  # Get the ID
-        
-        # Auto-create product if it doesn't exist
-        product = Product.query.filter_by(
-            company_id=self.company_id, 
-            name=product_name, 
-            category_id=category.id
-        ).first()
-        if not product:
-            # Calculate base price per unit
-            base_price = total / quantity if quantity > 0 else total
-            product = Product(
-                company_id=self.company_id,
-                name=product_name,
-                category_id=category.id,
-                base_price=base_price  # Use the per-unit price as base price
-            )
-            db.session.add(product)
-            db.session.flush()  # Get the ID
-        
-        # Create the sale object with both direct CSV data and linked entities
-        sale = Sale(
-            company_id=self.company_id,
-            user_id=user_id,
-            sale_date=sale_date,
-            store_id=store.id,
-            store_name=store_name,
-            product_id=product.id,
-            product_category=product_category,
-            product_name=product_name,
-            quantity=quantity,
-            total=total,
-            card_amount=card_amount,
-            cash_amount=cash_amount,
-            notes=notes
-        )
-        
-        return sale
+        return {
+            'company_id': self.company_id,
+            'user_id': user_id,
+            'sale_date': sale_date,
+            'store_name': store_name,
+            'product_category': product_category,
+            'product_name': product_name,
+            'quantity': quantity,
+            'total': total,
+            'card_amount': card_amount,
+            'cash_amount': cash_amount,
+            'notes': notes
+        }
     
     def validate_csv_format(self, csv_content: str) -> Tuple[bool, List[str]]:
         """
@@ -353,33 +660,42 @@ class SalesImportExportService:
         Returns:
             Tuple of (is_valid, error_messages)
         """
+        is_valid, error_messages, _ = self.preview_csv(io.StringIO(csv_content))
+        return is_valid, error_messages
+    
+    def preview_csv(self, csv_file: TextIO, preview_rows: int = 5) -> Tuple[bool, List[str], List[Dict[str, str]]]:
+        """
+        Validate CSV format and read the first rows, without importing
+        
+        Only the head of the file is read: the header and the first
+        preview_rows rows.
+        
+        Args:
+            csv_file: Text file at its start, opened with newline=''
+            preview_rows: Number of rows to validate and return
+            
+        Returns:
+            Tuple of (is_valid, error_messages, first_rows)
+        """
         error_messages = []
+        rows = []
         
         try:
-            csv_reader = csv.DictReader(io.StringIO(csv_content))
+            csv_reader = csv.DictReader(csv_file)
             
             # Validate headers - only require essential ones
-            required_headers = {'sale_date'}  # Only sale_date is truly required
-            actual_headers = set(csv_reader.fieldnames or [])
-            
-            if not required_headers.issubset(actual_headers):
-                missing_headers = required_headers - actual_headers
-                error_messages.append(f"Missing required headers: {', '.join(missing_headers)}")
+            error_messages.extend(self._check_headers(csv_reader))
             
-            # Check if there are any data rows
-            row_count = 0
-            for row_num, row in enumerate(csv_reader, start=2):
-                row_count += 1
-                
-                # Basic validation on first few rows - only check essential fields
-                if row_count <= 5:  # Only validate first 5 rows for performance
-                    if not row.get('sale_date', '').strip():
-                        error_messages.append(f"Row {row_num}: sale_date cannot be empty")
+            # Basic validation on first few rows - only check essential fields
+            for row_num, row in enumerate(islice(csv_reader, preview_rows), start=2):
+                rows.append(row)
+                if not (row.get('sale_date') or '').strip():
+                    error_messages.append(f"Row {row_num}: sale_date cannot be empty")
             
-            if row_count == 0:
+            if not rows:
                 error_messages.append("CSV file contains no data rows")
                 
         except Exception as e:
             error_messages.append(f"CSV parsing error: {str(e)}")
         
-        return len(error_messages) == 0, error_messages 
\ No newline at end of file
+        return len(error_messages) == 0, error_messages, rows
@@ -0,0 +1,237 @@
+"""
+Sales Rollup Service
+Keeps the sales_daily_rollup table in step with writes to the sales table
+"""
+
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, case, delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from app.models.data_version import CompanyDataVersion
+from app.models.sales import Sale
+from app.models.sales_rollup import SalesDailyRollup
+
+KEY_COLUMNS = ['company_id', 'sale_date', 'store_id', 'product_category', 'product_name', 'payment_method']
+SUM_COLUMNS = ['total', 'quantity', 'sale_count', 'card_amount', 'cash_amount']
+
+
+def payment_method_for(card_amount, cash_amount) -> str:
+    """Same rules as Sale.payment_method, tolerant of missing amounts"""
+    card = card_amount or 0
+    cash = cash_amount or 0
+    if card > 0 and cash > 0:
+        return "Both (Card + Cash)"
+    elif card > 0:
+        return "Card"
+    elif cash > 0:
+        return "Cash"
+    return "Unknown"
+
+
+class SalesRollupService:
+    """
+    Applies sale inserts, edits and deletes to the daily rollup.
+
+    All statements run on db.session, so the rollup commits or rolls back
+    together with the sales write that triggered it. Callers remove a sale's
+    contribution before changing or deleting it and add it back afterwards.
+    Every change also bumps the company's sales data version, which is what
+    invalidates cached analytics.
+    """
+
+    @classmethod
+    def add_sale(cls, sale: Sale):
+        cls.add_rows([cls._row_for(sale)])
+
+    @classmethod
+    def remove_sale(cls, sale: Sale):
+        cls.remove_rows([cls._row_for(sale)])
+
+    @classmethod
+    def add_sales(cls, sales: Iterable[Sale]):
+        cls.add_rows([cls._row_for(sale) for sale in sales])
+
+    @classmethod
+    def add_rows(cls, rows: Iterable[Dict]):
+        """
+        Add plain sale dicts to the rollup
+
+        Args:
+            rows: Dicts with company_id, sale_date, store_id, store_name,
+                  product_category, product_name, quantity, total,
+                  card_amount and cash_amount
+        """
+        groups = cls._group(rows)
+        if groups:
+            cls._upsert(groups)
+            cls._bump_versions(groups)
+
+    @classmethod
+    def remove_rows(cls, rows: Iterable[Dict]):
+        """Subtract plain sale dicts from the rollup"""
+        groups = cls._group(rows)
+        if not groups:
+            return
+
+        table = SalesDailyRollup.__table__
+        key_match = and_(*[table.c[k] == bindparam(f'k_{k}') for k in KEY_COLUMNS])
+
+        db.session.execute(
+            update(table).where(key_match).values(
+                **{c: table.c[c] - bindparam(f'v_{c}') for c in SUM_COLUMNS}
+            ),
+            [cls._bind_params(group) for group in groups]
+        )
+        db.session.execute(
+            delete(table).where(key_match, table.c.sale_count <= 0),
+            [{f'k_{k}': group[k] for k in KEY_COLUMNS} for group in groups]
+        )
+        cls._bump_versions(groups)
+
+    @classmethod
+    def rebuild(cls, company_id: Optional[int] = None) -> int:
+        """
+        Recompute the rollup from the sales table
+
+        Args:
+            company_id: Limit the rebuild to one company (all companies if None)
+
+        Returns:
+            Number of rollup rows written
+        """
+        table = SalesDailyRollup.__table__
+
+        clear = delete(table)
+        if company_id is not None:
+            clear = clear.where(table.c.company_id == company_id)
+        db.session.execute(clear)
+
+        card = func.coalesce(Sale.card_amount, 0)
+        cash = func.coalesce(Sale.cash_amount, 0)
+        payment_method = case(
+            (and_(card > 0, cash > 0), 'Both (Card + Cash)'),
+            (card > 0, 'Card'),
+            (cash > 0, 'Cash'),
+            else_='Unknown'
+        )
+        store_id = func.coalesce(Sale.store_id, 0)
+
+        grouped = select(
+            Sale.company_id,
+            Sale.sale_date,
+            store_id,
+            Sale.product_category,
+            Sale.product_name,
+            payment_method,
+            func.max(Sale.store_name),
+            func.sum(Sale.total),
+            func.sum(Sale.quantity),
+            func.count(Sale.id),
+            func.sum(card),
+            func.sum(cash),
+            func.now()
+        ).group_by(
+            Sale.company_id, Sale.sale_date, store_id, Sale.product_category,
+            Sale.product_name, payment_method
+        )
+        if company_id is not None:
+            grouped = grouped.where(Sale.company_id == company_id)
+
+        db.session.execute(insert(table).from_select(
+            KEY_COLUMNS + ['store_name'] + SUM_COLUMNS + ['updated_at'], grouped
+        ))
+
+        if company_id is not None:
+            CompanyDataVersion.bump_sales(company_id)
+        else:
+            db.session.execute(db.update(CompanyDataVersion).values(
+                sales_version=CompanyDataVersion.sales_version + 1))
+
+        count_query = select(func.count()).select_from(table)
+        if company_id is not None:
+            count_query = count_query.where(table.c.company_id == company_id)
+        return db.session.execute(count_query).scalar()
+
+    @staticmethod
+    def _row_for(sale: Sale) -> Dict:
+        return {
+            'company_id': sale.company_id,
+            'sale_date': sale.sale_date,
+            'store_id': sale.store_id,
+            'store_name': sale.store_name,
+            'product_category': sale.product_category,
+            'product_name': sale.product_name,
+            'quantity': sale.quantity,
+            'total': sale.total_amount,
+            'card_amount': sale.card_amount,
+            'cash_amount': sale.cash_amount
+        }
+
+    @staticmethod
+    def _group(rows: Iterable[Dict]) -> List[Dict]:
+        """Collapse sale dicts into one delta per rollup key"""
+        groups: Dict[Tuple, Dict] = {}
+        for row in rows:
+            key = (
+                row['company_id'],
+                row['sale_date'],
+                row.get('store_id') or 0,
+                row['product_category'],
+                row['product_name'],
+                payment_method_for(row.get('card_amount'), row.get('cash_amount'))
+            )
+            group = groups.get(key)
+            if group is None:
+                group = dict(zip(KEY_COLUMNS, key))
+                group.update(store_name=row['store_name'], total=Decimal('0'), quantity=0,
+                             sale_count=0, card_amount=Decimal('0'), cash_amount=Decimal('0'))
+                groups[key] = group
+            group['store_name'] = row['store_name']
+            group['total'] += Decimal(str(row.get('total') or 0))
+            group['quantity'] += int(row.get('quantity') or 0)
+            group['sale_count'] += 1
+            group['card_amount'] += Decimal(str(row.get('card_amount') or 0))
+            group['cash_amount'] += Decimal(str(row.get('cash_amount') or 0))
+        return list(groups.values())
+
+    @staticmethod
+    def _bump_versions(groups: List[Dict]):
+        for company_id in sorted({group['company_id'] for group in groups}):
+            CompanyDataVersion.bump_sales(company_id)
+
+    @staticmethod
+    def _bind_params(group: Dict) -> Dict:
+        params = {f'k_{k}': group[k] for k in KEY_COLUMNS}
+        params.update({f'v_{c}': group[c] for c in SUM_COLUMNS})
+        return params
+
+    @classmethod
+    def _upsert(cls, groups: List[Dict]):
+        table = SalesDailyRollup.__table__
+        dialect = db.session.get_bind().dialect.name
+
+        if dialect in ('postgresql', 'sqlite'):
+            dialect_insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+            stmt = dialect_insert(table)
+            set_ = {c: table.c[c] + stmt.excluded[c] for c in SUM_COLUMNS}
+            set_['store_name'] = stmt.excluded.store_name
+            set_['updated_at'] = func.now()
+            stmt = stmt.on_conflict_do_update(index_elements=KEY_COLUMNS, set_=set_)
+            db.session.execute(stmt, groups)
+            return
+
+        # Generic fallback: lock the existing row, then update or insert
+        for group in groups:
+            existing = db.session.execute(
+                select(table.c.id).where(and_(*[table.c[k] == group[k] for k in KEY_COLUMNS])).with_for_update()
+            ).scalar()
+            if existing is None:
+                db.session.execute(insert(table).values(**group))
+            else:
+                db.session.execute(update(table).where(table.c.id == existing).values(
+                    store_name=group['store_name'],
+                    **{c: table.c[c] + group[c] for c in SUM_COLUMNS}
+                ))
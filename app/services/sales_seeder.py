@@ -0,0 +1,334 @@
+"""
+Sales Seeder
+Generates synthetic companies, catalogs and sales shaped like a real sales export
+"""
+
+import csv
+import os
+import random
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import delete, insert, select
+
+from app import db
+from app.models.company import Company
+from app.models.data_version import CompanyDataVersion
+from app.models.product import Embellishment, Product, product_embellishments, sale_embellishments
+from app.models.product_category import ProductCategory
+from app.models.sale_tombstone import SaleTombstone
+from app.models.sales import Sale
+from app.models.sales_rollup import SalesDailyRollup
+from app.models.store import Store
+from app.models.user import User
+from app.services.sales_rollup import SalesRollupService
+
+DEFAULT_PROFILE_CSV = 'newfile.csv'
+DEFAULT_BATCH_SIZE = 10000
+DEFAULT_DAYS = 730
+SEED_PASSWORD = 'seed-password'
+
+# Used when no sample CSV is available
+FALLBACK_PROFILE = {
+    'stores': ['Main Street Store'],
+    'products': {
+        'Sterling Silver collections': {'Sterling Silver Bracelets': [45.00], 'Sterling Silver Necklaces': [30.00]},
+        'Gold Plated collections': {'Gold Plated Rings': [25.00]},
+        'Handmade / Beaded collections': {'beaded bracelets': [10.00]}
+    },
+    'notes': ['Details: Evil eye', 'Details: Zirconia | Zirconia: white (diamond)', ''],
+    'quantities': [1],
+    'payments': {'card': 1, 'cash': 1, 'both': 0},
+    'weekdays': [1] * 7
+}
+
+
+def embellishment_name(notes: str) -> Optional[str]:
+    """Embellishment a sales note describes ('Details: Evil eye' -> 'Evil eye'), if any"""
+    if not notes or not notes.startswith('Details:'):
+        return None
+    name = notes[len('Details:'):].split('|')[0].strip()[:100]
+    return name if name and name.upper() != 'NA' else None
+
+
+def load_profile(path: Optional[str] = None) -> Dict:
+    """
+    Read the shape of real sales from a CSV in the import format
+
+    Collects store names, the products of each category with their unit
+    prices, the notes (and so the embellishment mix), quantities, the share
+    of card, cash and split payments and the weekday distribution. Falls back
+    to a small built-in profile when the file does not exist.
+    """
+    if not path or not os.path.exists(path):
+        return FALLBACK_PROFILE
+
+    stores = []
+    products = defaultdict(lambda: defaultdict(list))
+    notes = []
+    quantities = []
+    payments = Counter()
+    weekdays = [0] * 7
+
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            try:
+                sale_date = datetime.strptime(row['sale_date'].strip(), '%Y-%m-%d').date()
+                quantity = max(int(row.get('quantity') or 1), 1)
+                total = Decimal(row.get('total') or '0')
+                card = Decimal(row.get('card_amount') or '0')
+                cash = Decimal(row.get('cash_amount') or '0')
+            except (KeyError, ValueError, ArithmeticError):
+                continue
+
+            store_name = (row.get('store_name') or '').strip()
+            if store_name and store_name not in stores:
+                stores.append(store_name)
+            category = (row.get('product_category') or '').strip() or 'General'
+            product = (row.get('product_name') or '').strip() or 'Unknown Product'
+            if total > 0:
+                products[category][product].append(float(total / quantity))
+            notes.append((row.get('notes') or '').strip())
+            quantities.append(quantity)
+            payments['both' if card > 0 and cash > 0 else 'card' if card > 0 else 'cash'] += 1
+            weekdays[sale_date.weekday()] += 1
+
+    if not products:
+        return FALLBACK_PROFILE
+
+    return {
+        'stores': stores or FALLBACK_PROFILE['stores'],
+        'products': {category: dict(items) for category, items in products.items()},
+        'notes': notes,
+        'quantities': quantities,
+        'payments': dict(payments),
+        'weekdays': [count or 1 for count in weekdays]
+    }
+
+
+class SalesSeeder:
+    """
+    Writes synthetic data for load testing and benchmarks.
+
+    Every company gets an admin user, stores, categories and products taken
+    from the profile (extra ones are numbered variants), the profile's
+    embellishments and sales over the last ``days`` days. Sales reuse the
+    profile's notes, quantities, unit prices, payment split and weekday mix,
+    and are written with multi-row Core inserts in batches, each batch
+    committed on its own. The daily rollup is rebuilt once per company at
+    the end. Runs are reproducible for a given random seed.
+    """
+
+    def __init__(self, profile: Optional[Dict] = None, seed: Optional[int] = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE, days: int = DEFAULT_DAYS):
+        self.profile = profile or FALLBACK_PROFILE
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.days = days
+
+    # Catalog
+
+    def create_company(self, name: str, stores: int, products: int) -> Company:
+        """Create a company with its admin user, stores, categories, products and embellishments"""
+        slug = name.lower().replace(' ', '-')
+        user = User(email=f'{slug}@example.com', username=slug[:64], role_website='subscriber',
+                    email_verified=True)
+        user.password = SEED_PASSWORD
+        db.session.add(user)
+        db.session.flush()
+
+        company = Company(admin_id=user.id, company_name=name, company_email=f'{slug}@example.com')
+        db.session.add(company)
+        db.session.flush()
+        user.company_id = company.id
+        user.role_company = 'admin'
+
+        store_names = self._numbered(self.profile['stores'], stores)
+        db.session.add_all([Store(company_id=company.id, name=store_name) for store_name in store_names])
+
+        categories = {}
+        for category_name in self.profile['products']:
+            category = ProductCategory(company_id=company.id, name=category_name)
+            db.session.add(category)
+            categories[category_name] = category
+
+        embellishments = {}
+        for notes in sorted(set(self.profile['notes'])):
+            emb_name = embellishment_name(notes)
+            if emb_name and emb_name not in embellishments:
+                embellishments[emb_name] = Embellishment(company_id=company.id, name=emb_name)
+        db.session.add_all(embellishments.values())
+        db.session.flush()
+
+        catalog = [(category_name, product_name, prices)
+                   for category_name, items in self.profile['products'].items()
+                   for product_name, prices in items.items()]
+        for index in range(products):
+            category_name, product_name, prices = catalog[index % len(catalog)]
+            if index >= len(catalog):
+                product_name = f'{product_name} #{index // len(catalog) + 1}'
+            product = Product(company_id=company.id, category_id=categories[category_name].id,
+                              name=product_name[:100],
+                              base_price=Decimal(str(round(sorted(prices)[len(prices) // 2], 2))) if prices else 0)
+            db.session.add(product)
+        db.session.flush()
+
+        links = [
+            {'product_id': product.id, 'embellishment_id': emb.id}
+            for product in Product.query.filter_by(company_id=company.id)
+            for emb in self.random.sample(list(embellishments.values()), min(3, len(embellishments)))
+        ]
+        if links:
+            db.session.execute(insert(product_embellishments), links)
+        db.session.commit()
+        return company
+
+    @staticmethod
+    def _numbered(names: List[str], count: int) -> List[str]:
+        """``count`` names, cycling through ``names`` and numbering repeats"""
+        result = []
+        for index in range(count):
+            name = names[index % len(names)]
+            result.append(name if index < len(names) else f'{name} {index // len(names) + 1}')
+        return result
+
+    # Sales
+
+    def generate_rows(self, company_id: int, user_id: int, count: int) -> List[Dict]:
+        """``count`` sale dicts for a company in the shape of the profile"""
+        stores = [(store.id, store.name) for store in Store.query.filter_by(company_id=company_id)]
+        products = [(product.id, product.name, category_name, float(product.base_price or 0))
+                    for product, category_name in db.session.query(Product, ProductCategory.name).join(
+                        ProductCategory, ProductCategory.id == Product.category_id
+                    ).filter(Product.company_id == company_id)]
+        if not stores or not products:
+            raise ValueError(f"Company {company_id} has no stores or products to sell")
+
+        payment_kinds = list(self.profile['payments'])
+        payment_weights = [self.profile['payments'][kind] for kind in payment_kinds]
+        dates_by_weekday = defaultdict(list)
+        today = date.today()
+        for offset in range(self.days):
+            day = today - timedelta(days=offset)
+            dates_by_weekday[day.weekday()].append(day)
+        weekdays = [weekday for weekday in range(7) if dates_by_weekday[weekday]]
+        weekday_weights = [self.profile['weekdays'][weekday] for weekday in weekdays]
+        now = datetime.utcnow()
+
+        rng = self.random
+        rows = []
+        for _ in range(count):
+            store_id, store_name = rng.choice(stores)
+            product_id, product_name, category_name, base_price = rng.choice(products)
+            quantity = rng.choice(self.profile['quantities'])
+            # Prices vary +-25% around the product's usual price, in 50p steps
+            unit_price = max(round(base_price * rng.uniform(0.75, 1.25) * 2) / 2, 0.5)
+            total = Decimal(str(unit_price * quantity)).quantize(Decimal('0.01'))
+
+            kind = rng.choices(payment_kinds, payment_weights)[0]
+            if kind == 'card':
+                card = total
+            elif kind == 'cash':
+                card = Decimal('0.00')
+            else:
+                card = (total * Decimal(str(rng.uniform(0.2, 0.8)))).quantize(Decimal('0.01'))
+
+            weekday = rng.choices(weekdays, weekday_weights)[0]
+            rows.append({
+                'company_id': company_id,
+                'user_id': user_id,
+                'sale_date': rng.choice(dates_by_weekday[weekday]),
+                'store_id': store_id,
+                'store_name': store_name,
+                'product_id': product_id,
+                'product_category': category_name,
+                'product_name': product_name,
+                'quantity': quantity,
+                'total': total,
+                'card_amount': card,
+                'cash_amount': total - card,
+                'notes': rng.choice(self.profile['notes']),
+                'created_at': now,
+                'updated_at': now
+            })
+        return rows
+
+    def seed_sales(self, company_id: int, count: int,
+                   progress_callback: Optional[Callable[[int, int], None]] = None) -> int:
+        """
+        Insert ``count`` sales (and their embellishment links) for a company
+
+        Returns:
+            Number of sales written
+        """
+        company = Company.query.get(company_id)
+        if not company:
+            raise ValueError(f"Company with ID {company_id} not found")
+        embellishment_ids = {name: emb_id for emb_id, name in db.session.query(
+            Embellishment.id, Embellishment.name).filter_by(company_id=company_id)}
+
+        written = 0
+        while written < count:
+            rows = self.generate_rows(company_id, company.admin_id, min(self.batch_size, count - written))
+            sale_ids = db.session.execute(
+                insert(Sale).returning(Sale.id, sort_by_parameter_order=True), rows
+            ).scalars().all()
+
+            links = []
+            for sale_id, row in zip(sale_ids, rows):
+                emb_id = embellishment_ids.get(embellishment_name(row['notes']))
+                if emb_id:
+                    links.append({'sale_id': sale_id, 'embellishment_id': emb_id})
+            if links:
+                db.session.execute(insert(sale_embellishments), links)
+            db.session.commit()
+
+            written += len(rows)
+            if progress_callback:
+                progress_callback(written, count)
+
+        SalesRollupService.rebuild(company_id)
+        db.session.commit()
+        return written
+
+    def seed(self, companies: int, stores: int, products: int, sales: int, prefix: str = 'Seed',
+             progress_callback: Optional[Callable[[int, int], None]] = None) -> List[int]:
+        """
+        Create ``companies`` companies with ``sales`` sales each
+
+        Returns:
+            Ids of the new companies
+        """
+        run = datetime.utcnow().strftime('%Y%m%d%H%M%S')
+        company_ids = []
+        for index in range(companies):
+            company = self.create_company(f'{prefix} {run} {index + 1}', stores, products)
+            self.seed_sales(company.id, sales, progress_callback)
+            company_ids.append(company.id)
+        return company_ids
+
+    # Cleanup
+
+    @staticmethod
+    def drop_company(company_id: int):
+        """Delete a seeded company with its users, catalog and sales"""
+        sale_ids = select(Sale.id).where(Sale.company_id == company_id).scalar_subquery()
+        product_ids = select(Product.id).where(Product.company_id == company_id).scalar_subquery()
+        db.session.execute(delete(sale_embellishments).where(sale_embellishments.c.sale_id.in_(sale_ids)))
+        db.session.execute(delete(product_embellishments).where(
+            product_embellishments.c.product_id.in_(product_ids)))
+        for model in (SalesDailyRollup, SaleTombstone, Sale, Product, Embellishment, ProductCategory,
+                      Store, CompanyDataVersion):
+            db.session.execute(delete(model).where(model.company_id == company_id))
+
+        company = Company.query.get(company_id)
+        if company:
+            admin_id = company.admin_id
+            db.session.execute(db.update(User).where(User.company_id == company_id).values(
+                company_id=None, role_company=None))
+            db.session.delete(company)
+            db.session.flush()
+            db.session.execute(delete(User).where(User.id == admin_id))
+        db.session.commit()
@@ -0,0 +1,369 @@
+"""
+Sales Snapshot
+Per-company columnar copy of the sales table on disk, refreshed from a watermark
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from app import db
+from app.models.sale_tombstone import TOMBSTONE_RETENTION, SaleTombstone
+from app.models.sales import Sale
+from app.services.sales_frame import SalesFrameLoader, build_frame, empty_frame
+from app.utils.lazy_import import LazyModule
+
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+
+SNAPSHOT_FORMAT = 3
+
+# Dimension columns stored as int32 codes plus a category list in the metadata
+CATEGORICAL_COLUMNS = ('store_name', 'product_category', 'product_name')
+NUMERIC_COLUMNS = {
+    'sale_id': 'int64',
+    'quantity': 'int32',
+    'total_cents': 'int64',
+    'card_cents': 'int64',
+    'cash_cents': 'int64',
+}
+
+# Rows whose updated_at is this close to the watermark are fetched again, so a
+# transaction that committed late with an older timestamp is not missed.
+# Fetched rows the snapshot already holds unchanged are then ignored.
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+# Changes are appended as delta segments; the snapshot is rewritten as a single
+# base once its segments hold this fraction of the base's rows, or once there
+# are MAX_SEGMENTS of them
+SEGMENT_COMPACT_FRACTION = 0.1
+MAX_SEGMENTS = 20
+
+# How often the row count is checked against the sales table, to catch a
+# delete that left no tombstone
+VERIFY_INTERVAL = timedelta(days=1)
+
+
+class SalesSnapshot:
+    """
+    Columnar snapshot of one company's sales under ``root/company_<id>``.
+
+    The snapshot is a base directory plus delta segments. Each holds one
+    .npy file per column (dimension columns as int32 codes) that is
+    memory-mapped on load, so only the rows inside the requested date range
+    are materialized; a segment also lists the sale ids it replaces or
+    deletes in the directories before it. ``current.json`` names the live
+    directories and records the ``updated_at`` watermark; writers create new
+    directories and swap the pointer atomically, so readers never see a
+    partial write.
+
+    On each load, sales changed since the watermark are written to a new
+    segment, together with the ids of sales with a tombstone since the
+    watermark, so a refresh costs time proportional to the changes rather
+    than the history. Once the segments grow past SEGMENT_COMPACT_FRACTION
+    of the base they are compacted into a new base. Re-fetched rows that
+    match what is stored do not count as changes, so loads with nothing new
+    keep the same generation. Once per VERIFY_INTERVAL the row count is
+    checked against the table; if it differs (a delete that left no
+    tombstone) the snapshot is rebuilt from scratch.
+    """
+
+    def __init__(self, company_id: int, root: str):
+        self.company_id = company_id
+        self.directory = os.path.join(root, f'company_{company_id}')
+
+    # Public API
+
+    def load(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> pd.DataFrame:
+        """
+        Refresh the snapshot and return the sales in the date range
+
+        Returns:
+            DataFrame in the same shape as SalesFrameLoader.load
+        """
+        meta = self.refresh()
+        try:
+            return self._read(meta, start_date, end_date)
+        except FileNotFoundError:
+            # Another process swapped generations between our refresh and read
+            return self._read(self.refresh(), start_date, end_date)
+
+    def refresh(self) -> Dict[str, Any]:
+        """Bring the snapshot up to date with the sales table and return its metadata"""
+        meta = self._read_meta()
+        if meta is None:
+            return self.rebuild()
+
+        # Tombstones are pruned after TOMBSTONE_RETENTION, so a snapshot left
+        # alone longer than that could miss deletes
+        now = datetime.utcnow()
+        if datetime.fromisoformat(meta['refreshed_at']) < now - TOMBSTONE_RETENTION:
+            return self.rebuild()
+
+        # Take the new watermark before reading, so later changes are picked up next time
+        watermark = self._watermark()
+        since = datetime.fromisoformat(meta['watermark']) - WATERMARK_OVERLAP if meta['watermark'] else None
+        changed = SalesFrameLoader(self.company_id).load_updated_since(since) if since else empty_frame()
+        deleted = SaleTombstone.deleted_since(self.company_id, since) if since else []
+
+        # The overlap re-fetches rows that are already stored; keep only real changes
+        if not changed.empty or deleted:
+            current = self._read(meta)
+            changed = changed[~self._stored_unchanged(current, changed)]
+            deleted = current['sale_id'][current['sale_id'].isin(deleted)].tolist()
+
+        unchanged = changed.empty and not deleted
+        if unchanged:
+            rows = meta['rows']
+        else:
+            stale = current['sale_id'].isin(changed['sale_id']) | current['sale_id'].isin(deleted)
+            rows = int((~stale).sum()) + len(changed)
+
+        # The only COUNT(*) on the table, at most once per VERIFY_INTERVAL
+        verify = datetime.fromisoformat(meta['verified_at']) < now - VERIFY_INTERVAL
+        if verify and rows != self._count_sales():
+            return self.rebuild()
+
+        if unchanged:
+            stale_watermark = watermark and meta['watermark'] != watermark.isoformat()
+            if verify or stale_watermark or datetime.fromisoformat(meta['refreshed_at']) < now - timedelta(days=1):
+                meta['watermark'] = watermark.isoformat() if watermark else None
+                meta['refreshed_at'] = now.isoformat()
+                if verify:
+                    meta['verified_at'] = now.isoformat()
+                self._write_meta(meta)
+            return meta
+
+        segment_rows = sum(part['rows'] for part in meta['parts'][1:]) + len(changed)
+        if len(meta['parts']) > MAX_SEGMENTS or segment_rows > SEGMENT_COMPACT_FRACTION * meta['parts'][0]['rows']:
+            merged = pd.concat([current[~stale], changed], ignore_index=True)
+            # A sale id that was deleted cannot come back, but guard against reused ids anyway
+            merged = merged.drop_duplicates('sale_id', keep='last').sort_values('sale_id', kind='stable')
+            return self._write(merged, watermark)
+
+        replaced = np.union1d(changed['sale_id'].to_numpy(dtype='int64'), np.asarray(deleted, dtype='int64'))
+        part = self._write_part(changed.sort_values('sale_id', kind='stable'), replaced)
+        meta.update(
+            generation=part['directory'],
+            watermark=watermark.isoformat() if watermark else None,
+            rows=rows,
+            parts=meta['parts'] + [part],
+            refreshed_at=now.isoformat()
+        )
+        if verify:
+            meta['verified_at'] = now.isoformat()
+        self._write_meta(meta)
+        return meta
+
+    def rebuild(self) -> Dict[str, Any]:
+        """Write a fresh snapshot of every sale"""
+        watermark = self._watermark()
+        df = SalesFrameLoader(self.company_id).load().sort_values('sale_id', kind='stable')
+        return self._write(df, watermark)
+
+    def clear(self):
+        """Remove the snapshot from disk"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    @staticmethod
+    def _stored_unchanged(current: pd.DataFrame, changed: pd.DataFrame) -> np.ndarray:
+        """Mask over changed of the rows current already holds with the same values"""
+        fetched = changed.set_index('sale_id')
+        stored = current[current['sale_id'].isin(changed['sale_id'])].set_index('sale_id')
+        same = fetched.index.isin(stored.index)
+        if not same.any():
+            return same
+
+        stored = stored.reindex(fetched.index)
+        for column in ('sale_date', *CATEGORICAL_COLUMNS, *NUMERIC_COLUMNS):
+            if column != 'sale_id':
+                same &= (stored[column].astype(object) == fetched[column].astype(object)).to_numpy()
+        same &= np.array([isinstance(old, list) and sorted(old) == sorted(new)
+                          for old, new in zip(stored['embellishments'], fetched['embellishments'])], dtype=bool)
+        return same
+
+    # Database helpers
+
+    def _watermark(self) -> Optional[datetime]:
+        """Latest sale update or delete for the company"""
+        updated = db.session.execute(
+            select(func.max(Sale.updated_at)).where(Sale.company_id == self.company_id)
+        ).scalar()
+        stamps = [stamp for stamp in (updated, SaleTombstone.latest(self.company_id)) if stamp]
+        return max(stamps) if stamps else None
+
+    def _count_sales(self) -> int:
+        return db.session.execute(
+            select(func.count(Sale.id)).where(Sale.company_id == self.company_id)
+        ).scalar()
+
+    # Disk format
+
+    def _meta_path(self) -> str:
+        return os.path.join(self.directory, 'current.json')
+
+    def _read_meta(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._meta_path()) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('format') != SNAPSHOT_FORMAT:
+            return None
+        if not all(os.path.isdir(os.path.join(self.directory, part['directory'])) for part in meta['parts']):
+            return None
+        return meta
+
+    def _write_meta(self, meta: Dict[str, Any]):
+        tmp_path = f'{self._meta_path()}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path())
+
+    def _write(self, df: pd.DataFrame, watermark: Optional[datetime]) -> Dict[str, Any]:
+        """Write df as the new base with no segments and drop the previous directories"""
+        part = self._write_part(df, np.array([], dtype='int64'))
+        now = datetime.utcnow().isoformat()
+        meta = {
+            'format': SNAPSHOT_FORMAT,
+            'company_id': self.company_id,
+            'generation': part['directory'],
+            'watermark': watermark.isoformat() if watermark else None,
+            'rows': len(df),
+            'parts': [part],
+            'refreshed_at': now,
+            'verified_at': now
+        }
+
+        previous = self._read_meta()
+        self._write_meta(meta)
+        if previous:
+            # Readers that still have the old files mapped keep working on POSIX
+            for old in previous['parts']:
+                shutil.rmtree(os.path.join(self.directory, old['directory']), ignore_errors=True)
+        return meta
+
+    def _write_part(self, df: pd.DataFrame, replaced: np.ndarray) -> Dict[str, Any]:
+        """Write df's columns and the sale ids it replaces to a new directory"""
+        directory = uuid.uuid4().hex
+        path = os.path.join(self.directory, directory)
+        os.makedirs(path)
+        part = {'directory': directory, 'rows': len(df), 'categories': {}}
+
+        for column, dtype in NUMERIC_COLUMNS.items():
+            np.save(os.path.join(path, f'{column}.npy'), df[column].to_numpy(dtype=dtype))
+        np.save(os.path.join(path, 'sale_date.npy'), df['sale_date'].to_numpy(dtype='datetime64[D]'))
+        np.save(os.path.join(path, 'replaced.npy'), replaced.astype('int64'))
+
+        for column in CATEGORICAL_COLUMNS:
+            values = pd.Categorical(df[column]).remove_unused_categories()
+            part['categories'][column] = [str(c) for c in values.categories]
+            np.save(os.path.join(path, f'{column}.npy'), values.codes.astype('int32'))
+
+        # Embellishments in long form: one (sale_id, code) pair per use
+        long = df[['sale_id', 'embellishments']].explode('embellishments').dropna()
+        names = pd.Categorical(long['embellishments'])
+        part['categories']['embellishments'] = [str(c) for c in names.categories]
+        np.save(os.path.join(path, 'emb_sale_id.npy'), long['sale_id'].to_numpy(dtype='int64'))
+        np.save(os.path.join(path, 'emb_code.npy'), names.codes.astype('int32'))
+        return part
+
+    def _read(self, meta: Dict[str, Any], start_date: Optional[date] = None,
+              end_date: Optional[date] = None) -> pd.DataFrame:
+        if meta['rows'] == 0:
+            return empty_frame()
+
+        # Newest first: each directory hides the sale ids replaced by the ones after it
+        columns = []
+        replaced = np.array([], dtype='int64')
+        for part in reversed(meta['parts']):
+            path = os.path.join(self.directory, part['directory'])
+            columns.append(self._read_part(path, part['categories'], replaced, start_date, end_date))
+            replaced = np.union1d(replaced, np.load(os.path.join(path, 'replaced.npy')))
+        columns = [part for part in reversed(columns) if len(part['sale_id'])]
+        if not columns:
+            return empty_frame()
+
+        if len(columns) == 1:
+            data = columns[0]
+        else:
+            sale_id = np.concatenate([part['sale_id'] for part in columns])
+            order = np.argsort(sale_id, kind='stable')
+            data = {name: np.concatenate([part[name] for part in columns])[order]
+                    for name in ('sale_id', 'sale_date', *NUMERIC_COLUMNS)}
+            for name in CATEGORICAL_COLUMNS:
+                data[name] = pd.api.types.union_categoricals([part[name] for part in columns])[order]
+            embellishments = [names for part in columns for names in part['embellishments']]
+            data['embellishments'] = [embellishments[i] for i in order.tolist()]
+
+        for name in CATEGORICAL_COLUMNS:
+            data[name] = data[name].remove_unused_categories()
+        data['sale_date'] = data['sale_date'].astype('datetime64[ns]')
+        return build_frame(**data)
+
+    @staticmethod
+    def _read_part(path: str, categories: Dict[str, Any], replaced: np.ndarray,
+                   start_date: Optional[date], end_date: Optional[date]) -> Dict[str, Any]:
+        """One directory's rows in the date range whose sale ids are not in replaced"""
+
+        def column(name):
+            return np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+
+        sale_date = column('sale_date')
+        mask = np.ones(len(sale_date), dtype=bool)
+        if start_date:
+            mask &= sale_date >= np.datetime64(start_date, 'D')
+        if end_date:
+            mask &= sale_date <= np.datetime64(end_date, 'D')
+        if len(replaced):
+            mask &= ~np.isin(column('sale_id'), replaced)
+
+        sale_id = np.asarray(column('sale_id')[mask])
+        names = {}
+        if len(sale_id):
+            emb_sale_id = np.asarray(column('emb_sale_id'))
+            selected = np.isin(emb_sale_id, sale_id)
+            emb_names = pd.Categorical.from_codes(
+                np.asarray(column('emb_code')[selected]), categories['embellishments'])
+            series = pd.Series(emb_names.astype(object), index=emb_sale_id[selected])
+            names = series.groupby(level=0).agg(list).to_dict() if len(series) else {}
+
+        data = {
+            'sale_id': sale_id,
+            'sale_date': np.asarray(sale_date[mask]),
+            'embellishments': [names.get(sid, []) for sid in sale_id.tolist()]
+        }
+        for name in NUMERIC_COLUMNS:
+            if name != 'sale_id':
+                data[name] = np.asarray(column(name)[mask])
+        for name in CATEGORICAL_COLUMNS:
+            data[name] = pd.Categorical.from_codes(np.asarray(column(name)[mask]), categories[name])
+        return data
+
+
+def sales_snapshot_for(company_id: int) -> Optional[SalesSnapshot]:
+    """
+    Snapshot to use for a company's analytics loads, or None to query directly
+
+    Snapshots are used when ANALYTICS_SNAPSHOTS is on and the company either
+    already has one or has at least ANALYTICS_SNAPSHOT_MIN_ROWS sales.
+    """
+    config = current_app.config
+    if not config.get('ANALYTICS_SNAPSHOTS', True):
+        return None
+
+    root = config.get('ANALYTICS_SNAPSHOT_DIR') or os.path.join(current_app.instance_path, 'analytics_snapshots')
+    snapshot = SalesSnapshot(company_id, root)
+    if snapshot._read_meta() is not None:
+        return snapshot
+    if snapshot._count_sales() >= config.get('ANALYTICS_SNAPSHOT_MIN_ROWS', 50000):
+        return snapshot
+    return None
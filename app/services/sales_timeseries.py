@@ -0,0 +1,161 @@
+"""
+Sales Time Series
+Revenue, quantity and transaction trends bucketed in SQL at any granularity
+"""
+
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import Integer, cast, func, literal_column, select
+
+from app import db
+from app.models.sales import Sale
+from app.models.sales_rollup import SalesDailyRollup
+
+GRANULARITIES = ('hour', 'day', 'week', 'month', 'quarter', 'year')
+METRICS = ('revenue', 'quantity', 'transactions', 'average_ticket')
+
+
+def truncate_date(column, granularity: str, dialect: str):
+    """
+    SQL expression truncating a date/datetime column to the start of its period
+
+    PostgreSQL uses date_trunc (weeks start on Monday, as in ISO 8601).
+    SQLite has no date_trunc, so the same period starts are built with
+    date()/strftime() and returned as ISO strings.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity: {granularity}")
+
+    if dialect != 'sqlite':
+        # Inlined rather than bound so the SELECT and GROUP BY expressions match
+        return func.date_trunc(literal_column(f"'{granularity}'"), column)
+
+    if granularity == 'hour':
+        return func.strftime('%Y-%m-%d %H:00:00', column)
+    if granularity == 'day':
+        return func.date(column)
+    if granularity == 'week':
+        # Move forward to Sunday (no-op on Sundays), then back to that week's Monday
+        return func.date(column, 'weekday 0', '-6 days')
+    if granularity == 'month':
+        return func.strftime('%Y-%m-01', column)
+    if granularity == 'quarter':
+        quarter_month = (cast(func.strftime('%m', column), Integer) - 1) // 3 * 3 + 1
+        return func.printf('%s-%02d-01', func.strftime('%Y', column), quarter_month)
+    return func.strftime('%Y-01-01', column)
+
+
+def period_label(value, granularity: str) -> str:
+    """Readable label for a truncated period start (datetime, date or ISO string)"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    elif isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+
+    if granularity == 'hour':
+        return value.strftime('%Y-%m-%d %H:00')
+    if granularity in ('day', 'week'):
+        return value.strftime('%Y-%m-%d')
+    if granularity == 'month':
+        return value.strftime('%Y-%m')
+    if granularity == 'quarter':
+        return f"{value.year}-Q{(value.month - 1) // 3 + 1}"
+    return str(value.year)
+
+
+class SalesTimeSeries:
+    """
+    One metric for one company, bucketed by a time granularity.
+
+    Day and coarser granularities read the sales_daily_rollup table; hourly
+    series bucket sales.created_at (the rollup has no time of day). Only one
+    row per period ever leaves the database.
+    """
+
+    def __init__(self, company_id: int, start_date: Optional[date] = None,
+                 end_date: Optional[date] = None, store: Optional[str] = None,
+                 category: Optional[str] = None, product: Optional[str] = None):
+        self.company_id = company_id
+        self.start_date = start_date
+        self.end_date = end_date
+        self.store = store
+        self.category = category
+        self.product = product
+
+    def _source(self, granularity: str):
+        """(table, time column, revenue, quantity, transactions) for the granularity"""
+        if granularity == 'hour':
+            return (Sale, Sale.created_at, func.sum(Sale.total),
+                    func.sum(Sale.quantity), func.count(Sale.id))
+        return (SalesDailyRollup, SalesDailyRollup.sale_date, func.sum(SalesDailyRollup.total),
+                func.sum(SalesDailyRollup.quantity), func.sum(SalesDailyRollup.sale_count))
+
+    def _filters(self, table):
+        filters = [table.company_id == self.company_id]
+        if self.start_date:
+            filters.append(table.sale_date >= self.start_date)
+        if self.end_date:
+            filters.append(table.sale_date <= self.end_date)
+        if self.store:
+            filters.append(table.store_name == self.store)
+        if self.category:
+            filters.append(table.product_category == self.category)
+        if self.product:
+            filters.append(table.product_name == self.product)
+        return filters
+
+    def compute(self, granularity: str = 'day', metric: str = 'revenue') -> Dict[str, Any]:
+        """
+        Compute the series
+
+        Args:
+            granularity: One of GRANULARITIES
+            metric: One of METRICS
+
+        Returns:
+            Dict with granularity, metric, labels (period labels in
+            chronological order) and values (one per label)
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity: {granularity}")
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric: {metric}")
+
+        table, time_column, revenue, quantity, transactions = self._source(granularity)
+        dialect = db.session.get_bind().dialect.name
+        period = truncate_date(time_column, granularity, dialect).label('period')
+
+        stmt = select(
+            period,
+            revenue.label('revenue'),
+            quantity.label('quantity'),
+            transactions.label('transactions')
+        ).where(*self._filters(table)).group_by(period).order_by(period)
+        rows = db.session.execute(stmt).all()
+
+        labels, values = [], []
+        for row in rows:
+            if row.period is None:
+                continue
+            labels.append(period_label(row.period, granularity))
+            values.append(self._metric_value(row, metric))
+
+        return {
+            'granularity': granularity,
+            'metric': metric,
+            'labels': labels,
+            'values': values
+        }
+
+    @staticmethod
+    def _metric_value(row, metric: str):
+        revenue = float(row.revenue or 0)
+        transactions = int(row.transactions or 0)
+        if metric == 'revenue':
+            return round(revenue, 2)
+        if metric == 'quantity':
+            return int(row.quantity or 0)
+        if metric == 'transactions':
+            return transactions
+        return round(revenue / transactions, 2) if transactions else 0.0
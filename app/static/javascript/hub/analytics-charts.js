@@ -0,0 +1,181 @@
+// Draws the chart specs returned by AnalyticsService in 'series' mode.
+// Each element with a data-chart attribute holds one spec as JSON.
+
+const CHART_COLORS = [
+    '#f77189', '#dc8932', '#ae9d31', '#77ab31', '#33b07a',
+    '#36ada4', '#38a9c5', '#6e9bf4', '#cc7af4', '#f565cc'
+];
+
+function chartColor(index, alpha = 1) {
+    const hex = CHART_COLORS[index % CHART_COLORS.length];
+    const r = parseInt(hex.slice(1, 3), 16);
+    const g = parseInt(hex.slice(3, 5), 16);
+    const b = parseInt(hex.slice(5, 7), 16);
+    return `rgba(${r}, ${g}, ${b}, ${alpha})`;
+}
+
+function axisTitle(text) {
+    return text ? { display: true, text: text } : { display: false };
+}
+
+function chartConfig(spec) {
+    const options = {
+        responsive: true,
+        plugins: { title: { display: true, text: spec.title } }
+    };
+
+    switch (spec.type) {
+        case 'bar':
+        case 'histogram':
+            return {
+                type: 'bar',
+                data: {
+                    labels: spec.labels,
+                    datasets: [{
+                        data: spec.values,
+                        backgroundColor: spec.type === 'bar'
+                            ? spec.labels.map((_, i) => chartColor(i, 0.8))
+                            : chartColor(7, 0.7),
+                        barPercentage: spec.type === 'histogram' ? 1 : 0.9,
+                        categoryPercentage: spec.type === 'histogram' ? 1 : 0.8
+                    }]
+                },
+                options: {
+                    ...options,
+                    indexAxis: spec.horizontal ? 'y' : 'x',
+                    plugins: { ...options.plugins, legend: { display: false } },
+                    scales: { x: { title: axisTitle(spec.x_label) }, y: { title: axisTitle(spec.y_label) } }
+                }
+            };
+        case 'line': {
+            const groups = spec.groups || [{ name: spec.title, values: spec.values }];
+            return {
+                type: 'line',
+                data: {
+                    labels: spec.labels,
+                    datasets: groups.map((group, i) => ({
+                        label: group.name,
+                        data: group.values,
+                        borderColor: chartColor(i),
+                        backgroundColor: chartColor(i, 0.5),
+                        borderWidth: spec.line_width || 2,
+                        spanGaps: true
+                    }))
+                },
+                options: {
+                    ...options,
+                    plugins: { ...options.plugins, legend: { display: Boolean(spec.groups) } },
+                    scales: { x: { title: axisTitle(spec.x_label) }, y: { title: axisTitle(spec.y_label) } }
+                }
+            };
+        }
+        case 'pie':
+            return {
+                type: 'pie',
+                data: {
+                    labels: spec.labels,
+                    datasets: [{ data: spec.values, backgroundColor: spec.labels.map((_, i) => chartColor(i, 0.8)) }]
+                },
+                options: options
+            };
+        case 'scatter': {
+            const sizes = spec.sizes || spec.values.map(() => 1);
+            const min = Math.min(...sizes);
+            const span = Math.max(...sizes) - min;
+            return {
+                type: 'bubble',
+                data: {
+                    datasets: [{
+                        data: spec.values.map((y, i) => ({
+                            x: spec.x[i],
+                            y: y,
+                            r: span ? 4 + ((sizes[i] - min) / span) * 16 : 8,
+                            label: spec.labels[i]
+                        })),
+                        backgroundColor: chartColor(7, 0.6)
+                    }]
+                },
+                options: {
+                    ...options,
+                    plugins: {
+                        ...options.plugins,
+                        legend: { display: false },
+                        tooltip: { callbacks: { label: (ctx) => `${ctx.raw.label}: ${ctx.raw.x}, ${ctx.raw.y}` } }
+                    },
+                    scales: { x: { title: axisTitle(spec.x_label) }, y: { title: axisTitle(spec.y_label) } }
+                }
+            };
+        }
+        default:
+            return null;
+    }
+}
+
+function renderHeatmap(container, spec) {
+    const values = spec.groups.flatMap(group => group.values).filter(v => v !== null);
+    const max = Math.max(...values, 1);
+
+    const title = document.createElement('h4');
+    title.textContent = spec.title;
+    container.appendChild(title);
+
+    const table = document.createElement('table');
+    table.className = 'chart-heatmap';
+    const header = table.insertRow();
+    header.insertCell();
+    spec.labels.forEach(label => {
+        const th = document.createElement('th');
+        th.textContent = label;
+        header.appendChild(th);
+    });
+    spec.groups.forEach(group => {
+        const row = table.insertRow();
+        const th = document.createElement('th');
+        th.textContent = group.name;
+        row.appendChild(th);
+        group.values.forEach(value => {
+            const cell = row.insertCell();
+            cell.textContent = value === null ? '' : Math.round(value);
+            cell.style.backgroundColor = value === null ? 'transparent' : chartColor(7, 0.1 + 0.9 * value / max);
+        });
+    });
+    container.appendChild(table);
+}
+
+function renderChart(container, spec) {
+    if (spec.type === 'grid') {
+        container.classList.add('chart-grid');
+        spec.panels.forEach(panel => {
+            const cell = document.createElement('div');
+            cell.className = 'chart-grid-cell';
+            container.appendChild(cell);
+            renderChart(cell, panel);
+        });
+        return;
+    }
+
+    if (!spec.labels || spec.labels.length === 0) {
+        const message = document.createElement('p');
+        message.className = 'chart-empty';
+        message.textContent = `${spec.title}: ${spec.empty_message || 'No data available'}`;
+        container.appendChild(message);
+        return;
+    }
+
+    if (spec.type === 'heatmap') {
+        renderHeatmap(container, spec);
+        return;
+    }
+
+    const config = chartConfig(spec);
+    if (!config) {
+        return;
+    }
+    const canvas = document.createElement('canvas');
+    container.appendChild(canvas);
+    new Chart(canvas, config);
+}
+
+document.querySelectorAll('[data-chart]').forEach(container => {
+    renderChart(container, JSON.parse(container.dataset.chart));
+});
@@ -0,0 +1,34 @@
+"""
+HTTP caching helpers
+ETags derived from per-company data versions, so unchanged data costs a 304
+"""
+
+import hashlib
+from typing import Any, Callable
+
+from flask import current_app, make_response, request
+
+
+def version_etag(*parts: Any) -> str:
+    """Opaque ETag for a response determined entirely by the given parts"""
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+def conditional_response(etag: str, build: Callable[[], Any]):
+    """
+    Answer 304 Not Modified when the client already holds etag, otherwise
+    build the response and tag it
+
+    build is only called on a miss, so a matching If-None-Match skips both
+    the work and the payload. Responses are marked private and must be
+    revalidated, since they depend on the logged-in user's company.
+    """
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = make_response(build())
+        if response.status_code != 200:
+            return response
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,43 @@
+"""
+Lazy imports
+Module stand-ins that import the real module on first attribute access
+"""
+
+import importlib
+import threading
+
+
+class LazyModule:
+    """
+    Placeholder for a module that is imported the first time one of its
+    attributes is used.
+
+    ``pd = LazyModule('pandas')`` at the top of a module keeps ``pd.DataFrame``
+    style code unchanged while pandas itself is only imported when a request
+    actually needs it, so workers that never serve analytics never pay for it.
+    Attributes are cached on the placeholder after the first lookup.
+    """
+
+    def __init__(self, name: str):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+        self.__dict__['_lock'] = threading.Lock()
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            with self.__dict__['_lock']:
+                module = self.__dict__['_module']
+                if module is None:
+                    module = importlib.import_module(self.__dict__['_name'])
+                    self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attribute):
+        value = getattr(self._load(), attribute)
+        self.__dict__[attribute] = value
+        return value
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f"<LazyModule '{self.__dict__['_name']}' ({state})>"
@@ -0,0 +1,67 @@
+"""Add sales daily rollup table
+
+Revision ID: 5b2e9c1d7a43
+Revises: 0c97579a891b
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2e9c1d7a43'
+down_revision = '0c97579a891b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sales_daily_rollup',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('sale_date', sa.Date(), nullable=False),
+    sa.Column('store_id', sa.Integer(), nullable=False),
+    sa.Column('product_category', sa.String(length=200), nullable=False),
+    sa.Column('product_name', sa.String(length=200), nullable=False),
+    sa.Column('payment_method', sa.String(length=50), nullable=False),
+    sa.Column('store_name', sa.String(length=200), nullable=False),
+    sa.Column('total', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('sale_count', sa.Integer(), nullable=False),
+    sa.Column('card_amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('cash_amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('company_id', 'sale_date', 'store_id', 'product_category',
+                        'product_name', 'payment_method', name='uq_sales_daily_rollup_key')
+    )
+
+    # Backfill from existing sales (same grouping as `flask rebuild-rollups`)
+    op.execute("""
+        INSERT INTO sales_daily_rollup (company_id, sale_date, store_id, product_category, product_name,
+                                        payment_method, store_name, total, quantity, sale_count,
+                                        card_amount, cash_amount, updated_at)
+        SELECT company_id, sale_date, COALESCE(store_id, 0), product_category, product_name,
+               CASE
+                   WHEN COALESCE(card_amount, 0) > 0 AND COALESCE(cash_amount, 0) > 0 THEN 'Both (Card + Cash)'
+                   WHEN COALESCE(card_amount, 0) > 0 THEN 'Card'
+                   WHEN COALESCE(cash_amount, 0) > 0 THEN 'Cash'
+                   ELSE 'Unknown'
+               END AS payment_method,
+               MAX(store_name), SUM(total), SUM(quantity), COUNT(id),
+               SUM(COALESCE(card_amount, 0)), SUM(COALESCE(cash_amount, 0)), CURRENT_TIMESTAMP
+        FROM sales
+        GROUP BY company_id, sale_date, COALESCE(store_id, 0), product_category, product_name,
+                 CASE
+                     WHEN COALESCE(card_amount, 0) > 0 AND COALESCE(cash_amount, 0) > 0 THEN 'Both (Card + Cash)'
+                     WHEN COALESCE(card_amount, 0) > 0 THEN 'Card'
+                     WHEN COALESCE(cash_amount, 0) > 0 THEN 'Cash'
+                     ELSE 'Unknown'
+                 END
+    """)
+
+
+def downgrade():
+    op.drop_table('sales_daily_rollup')
@@ -0,0 +1,30 @@
+"""Add company data versions table
+
+Revision ID: 8d41f6a2c0b9
+Revises: 5b2e9c1d7a43
+Create Date: 2026-10-18 10:03:27.551920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d41f6a2c0b9'
+down_revision = '5b2e9c1d7a43'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('company_data_versions',
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('sales_version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.PrimaryKeyConstraint('company_id')
+    )
+
+
+def downgrade():
+    op.drop_table('company_data_versions')
@@ -0,0 +1,31 @@
+"""Add export progress table
+
+Revision ID: a9c4e2f7b3d1
+Revises: d2a8f6c4e1b9
+Create Date: 2026-10-18 16:42:51.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9c4e2f7b3d1'
+down_revision = 'd2a8f6c4e1b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('export_progress',
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('progress_id', sa.String(length=64), nullable=False),
+    sa.Column('state', sa.Text(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.PrimaryKeyConstraint('company_id', 'progress_id')
+    )
+
+
+def downgrade():
+    op.drop_table('export_progress')
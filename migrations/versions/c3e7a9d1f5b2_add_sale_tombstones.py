@@ -0,0 +1,36 @@
+"""Add sale tombstones table
+
+Revision ID: c3e7a9d1f5b2
+Revises: 8d41f6a2c0b9
+Create Date: 2026-10-18 14:21:08.304117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e7a9d1f5b2'
+down_revision = '8d41f6a2c0b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sale_tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('sale_id', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('sale_tombstones', schema=None) as batch_op:
+        batch_op.create_index('ix_sale_tombstones_company_deleted_at', ['company_id', 'deleted_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('sale_tombstones', schema=None) as batch_op:
+        batch_op.drop_index('ix_sale_tombstones_company_deleted_at')
+
+    op.drop_table('sale_tombstones')
@@ -0,0 +1,39 @@
+"""One active import job per company
+
+Revision ID: d2a8f6c4e1b9
+Revises: b7d3f1e9c2a6
+Create Date: 2026-10-18 12:14:07.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a8f6c4e1b9'
+down_revision = 'b7d3f1e9c2a6'
+branch_labels = None
+depends_on = None
+
+ACTIVE_JOB_WHERE = sa.text("status IN ('queued', 'running')")
+
+
+def upgrade():
+    # Fail all but the newest active job of any company that has several
+    op.execute("""
+        UPDATE import_jobs
+        SET status = 'failed', status_message = 'Import Failed',
+            detail = 'Another import was running', error = 'Another import was running'
+        WHERE status IN ('queued', 'running') AND created_at < (
+            SELECT MAX(newer.created_at) FROM import_jobs AS newer
+            WHERE newer.company_id = import_jobs.company_id AND newer.status IN ('queued', 'running')
+        )
+    """)
+    with op.batch_alter_table('import_jobs', schema=None) as batch_op:
+        batch_op.create_index('uq_import_jobs_company_active', ['company_id'], unique=True,
+                              postgresql_where=ACTIVE_JOB_WHERE, sqlite_where=ACTIVE_JOB_WHERE)
+
+
+def downgrade():
+    with op.batch_alter_table('import_jobs', schema=None) as batch_op:
+        batch_op.drop_index('uq_import_jobs_company_active')
@@ -0,0 +1,26 @@
+"""Add catalog version to company data versions
+
+Revision ID: e5b1c8f2a7d4
+Revises: c3e7a9d1f5b2
+Create Date: 2026-10-18 15:02:44.918236
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b1c8f2a7d4'
+down_revision = 'c3e7a9d1f5b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('company_data_versions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('catalog_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('company_data_versions', schema=None) as batch_op:
+        batch_op.drop_column('catalog_version')
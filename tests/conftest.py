@@ -0,0 +1,109 @@
+"""
+Shared fixtures: the app under TestingConfig with one seeded company
+
+Tests run against TEST_DATABASE_URL, a throwaway SQLite file unless it is set
+(set it to a PostgreSQL database to also run the COPY tests). TestingConfig
+turns the N+1 query guard on, so every request a test makes fails if it runs
+one SELECT with more than QUERY_GUARD_MAX_SELECTS different parameters.
+"""
+
+import os
+import tempfile
+import uuid
+
+import pytest
+
+TEST_DIR = tempfile.mkdtemp(prefix='mometrix-tests-')
+os.environ.setdefault('TEST_DATABASE_URL', f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}")
+os.environ.setdefault('ANALYTICS_SNAPSHOT_DIR', os.path.join(TEST_DIR, 'analytics_snapshots'))
+os.environ.setdefault('IMPORT_STAGING_DIR', os.path.join(TEST_DIR, 'import_staging'))
+
+# Enough of everything that a per-row query in a page goes over the guard's limit
+EXTRA_ROWS = 12
+SEEDED_SALES = 600
+# Sales of the throwaway companies tests change freely
+SMALL_SALES = 50
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import create_app, db
+    from app.utils.db_init import init_roles
+
+    app = create_app('testing')
+    # create_app only creates the schema when its check fails, which it does on
+    # SQLite but not on an empty PostgreSQL database; both calls are idempotent
+    with app.app_context():
+        db.create_all()
+        init_roles()
+    return app
+
+
+@pytest.fixture(scope='session')
+def company(app):
+    """Ids of a company with a full catalog, team, pending requests and sales"""
+    from app import db
+    from app.models import (DirectModeratorInvite, Embellishment, JoinRequest, Product,
+                            ProductCategory, User, UserPermissions)
+    from app.services.sales_seeder import SalesSeeder
+
+    run = uuid.uuid4().hex[:8]
+    with app.app_context():
+        seeder = SalesSeeder(seed=0)
+        company = seeder.create_company(f'Test Co {run}', stores=EXTRA_ROWS, products=EXTRA_ROWS)
+        company_id, admin_id = company.id, company.admin_id
+
+        categories = [ProductCategory(company_id=company_id, name=f'Category {index}') for index in range(EXTRA_ROWS)]
+        db.session.add_all(categories)
+        db.session.flush()
+        db.session.add_all([Product(company_id=company_id, category_id=category.id, name=f'{category.name} item')
+                            for category in categories])
+        all_categories = ProductCategory.query.filter_by(company_id=company_id).all()
+        for index in range(EXTRA_ROWS):
+            embellishment = Embellishment(company_id=company_id, name=f'Embellishment {index}')
+            embellishment.product_types = all_categories
+            db.session.add(embellishment)
+
+        for index in range(EXTRA_ROWS):
+            member = User(email=f'member{index}-{run}@example.com', username=f'member{index}-{run}',
+                          role_website='subscriber', company_id=company_id,
+                          role_company='moderator' if index % 2 else None)
+            member.password = 'member-password'
+            db.session.add(member)
+            db.session.flush()
+            db.session.add(UserPermissions(user_id=member.id, company_id=company_id))
+            db.session.add(JoinRequest(email=f'request{index}-{run}@example.com', first_name='Req',
+                                       last_name=str(index), company_id=company_id))
+            db.session.add(DirectModeratorInvite(f'invite{index}-{run}@example.com', 'Inv', str(index),
+                                                 company_id, admin_id, 'moderator'))
+        db.session.commit()
+
+        seeder.seed_sales(company_id, SEEDED_SALES)
+        return {'id': company_id, 'admin_id': admin_id}
+
+
+@pytest.fixture
+def small_company(app):
+    """Ids of a fresh company with a few stores and products and SMALL_SALES sales, inside an app context"""
+    from app.services.sales_seeder import SalesSeeder
+
+    with app.app_context():
+        seeder = SalesSeeder(seed=1)
+        company = seeder.create_company(f'Small Co {uuid.uuid4().hex[:8]}', stores=3, products=3)
+        company_id, admin_id = company.id, company.admin_id
+        seeder.seed_sales(company_id, SMALL_SALES)
+        yield {'id': company_id, 'admin_id': admin_id}
+
+
+def login(client, user_id):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+
+@pytest.fixture
+def client(app, company):
+    """Test client logged in as the seeded company's admin"""
+    client = app.test_client()
+    login(client, company['admin_id'])
+    return client
@@ -0,0 +1,137 @@
+"""Analytics blueprint pages and APIs, with the N+1 guard on"""
+
+import pytest
+
+from app import db
+from app.models import Embellishment, ProductCategory, Sale
+from app.models.data_version import CompanyDataVersion
+from app.services.analytics_cache import analytics_cache
+from app.services.analytics_service import AnalyticsService
+from app.services.sales_frame import build_frame
+from conftest import login
+
+PAGES = [
+    '/analytics/',
+    '/analytics/reports',
+    '/analytics/api/timeseries?granularity=day',
+    '/analytics/api/timeseries?granularity=month',
+    '/analytics/api/batch?types=stores,categories,products,payments,days,months&format=series'
+]
+
+ANALYSIS_TYPES = ['dashboard', 'stores', 'categories', 'products', 'payments', 'embellishments',
+                  'days', 'months', 'reports']
+
+
+@pytest.mark.parametrize('page', PAGES)
+def test_page(client, page):
+    response = client.get(page)
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize('analysis_type', ANALYSIS_TYPES)
+def test_api_data(client, analysis_type):
+    response = client.get(f'/analytics/api/data?type={analysis_type}&format=series&start_date=2000-01-01')
+    assert response.status_code == 200
+    assert 'error' not in response.get_json()
+
+
+def test_cached_analysis_is_recomputed_after_sales_or_catalog_change(small_company):
+    company_id = small_company['id']
+    calls = []
+
+    def compute():
+        calls.append(None)
+        return {'computed': len(calls)}
+
+    def cached():
+        return analytics_cache.get_or_compute(company_id, 'test', None, None, compute)
+
+    assert cached() == {'computed': 1}
+    assert cached() == {'computed': 1}
+
+    CompanyDataVersion.bump_sales(company_id)
+    db.session.commit()
+    assert cached() == {'computed': 2}
+    assert cached() == {'computed': 2}
+
+    CompanyDataVersion.bump_catalog(company_id)
+    db.session.commit()
+    assert cached() == {'computed': 3}
+
+
+def test_batch_and_single_endpoints_agree(client):
+    query = 'format=series&start_date=2000-01-01'
+    analysis_types = [t for t in ANALYSIS_TYPES if t != 'reports']
+
+    analytics_cache.clear()
+    batch = client.get(f"/analytics/api/batch?types={','.join(analysis_types)}&{query}").get_json()
+
+    analytics_cache.clear()
+    for analysis_type in analysis_types:
+        single = client.get(f'/analytics/api/data?type={analysis_type}&{query}').get_json()
+        assert batch[analysis_type] == single, analysis_type
+
+
+def test_batch_reads_grouped_analyses_from_the_rollup(client, monkeypatch):
+    frame_loads = []
+    load = AnalyticsService.get_company_sales_data
+    monkeypatch.setattr(AnalyticsService, 'get_company_sales_data',
+                        lambda self, *args: frame_loads.append(args) or load(self, *args))
+
+    analytics_cache.clear()
+    response = client.get('/analytics/api/batch?types=stores,days,months&format=series&start_date=2000-01-01')
+    assert response.status_code == 200
+    assert frame_loads == []
+
+    analytics_cache.clear()
+    client.get('/analytics/api/batch?types=stores,embellishments,reports&format=series&start_date=2000-01-01')
+    assert len(frame_loads) == 1
+
+
+def test_day_heatmap_keeps_each_year_month_apart():
+    # Same weekday in January of two years, then December in between
+    dates = ['2023-01-02', '2023-12-04', '2024-01-01', '2024-01-01']
+    frame = build_frame(range(4), dates, ['Main'] * 4, ['Rings'] * 4, ['Band'] * 4, [1] * 4,
+                        [1000, 2000, 4000, 8000], [0] * 4, [1000, 2000, 4000, 8000], [[]] * 4)
+
+    heatmap = AnalyticsService().get_day_analytics(frame)['charts']['day_heatmap']
+
+    assert heatmap['labels'] == ['January 2023', 'December 2023', 'January 2024']
+    monday = next(group for group in heatmap['groups'] if group['name'] == 'Monday')
+    assert monday['values'] == [10.0, 20.0, 120.0]
+
+
+def test_api_data_answers_304_until_sales_or_the_catalog_change(app, small_company):
+    company_id = small_company['id']
+    client = app.test_client()
+    login(client, small_company['admin_id'])
+    url = '/analytics/api/data?type=embellishments&format=series&start_date=2000-01-01'
+
+    def revalidate(etag):
+        return client.get(url, headers={'If-None-Match': etag})
+
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    response = revalidate(etag)
+    assert response.status_code == 304 and response.data == b''
+
+    # A sale edit
+    sale = Sale.query.filter_by(company_id=company_id).order_by(Sale.id).first()
+    response = client.post(f'/sales/edit/{sale.id}', data={
+        'store_id': sale.store_id, 'product_id': sale.product_id, 'quantity': sale.quantity + 1,
+        'total_price': str(sale.total), 'cash_amount': str(sale.total), 'card_amount': '0.00'})
+    assert response.status_code == 302
+    response = revalidate(etag)
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+    etag = response.headers['ETag']
+    assert revalidate(etag).status_code == 304
+
+    # A catalog change
+    embellishment = Embellishment.query.filter_by(company_id=company_id).order_by(Embellishment.id).first()
+    category_ids = [category.id for category in ProductCategory.query.filter_by(company_id=company_id)]
+    response = client.post(f'/products/embellishments/edit/{embellishment.id}', data={
+        'name': embellishment.name, 'description': 'changed', 'product_types': category_ids})
+    assert response.status_code == 302
+    response = revalidate(etag)
+    assert response.status_code == 200 and response.headers['ETag'] != etag
@@ -0,0 +1,44 @@
+"""PNG chart rendering, inline and through the worker pool"""
+
+import base64
+
+import pytest
+
+from app.services.analytics_cache import analytics_cache
+from app.services.analytics_charts import chart_renderer
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+@pytest.fixture
+def chart_workers(app):
+    """Render charts in a pool of two spawned workers for the duration of a test"""
+    max_workers = chart_renderer.max_workers
+    chart_renderer.max_workers = 2
+    # Charts are cached with the page; make the test render them again
+    analytics_cache.clear()
+    yield chart_renderer
+    chart_renderer.shutdown()
+    chart_renderer.max_workers = max_workers
+
+
+def assert_png_charts(response):
+    assert response.status_code == 200
+    charts = response.get_json()['charts']
+    assert charts
+    for chart in charts.values():
+        assert base64.b64decode(chart).startswith(PNG_SIGNATURE)
+
+
+def test_testing_config_renders_inline(app):
+    assert app.config['ANALYTICS_CHART_WORKERS'] == 0
+    assert chart_renderer.max_workers == 0
+
+
+def test_page_pngs_inline(client):
+    assert_png_charts(client.get('/analytics/api/data?type=stores&format=png&start_date=2000-01-01'))
+
+
+def test_page_pngs_through_pool(client, chart_workers):
+    assert_png_charts(client.get('/analytics/api/data?type=stores&format=png&start_date=2000-01-01'))
+    assert chart_workers._executor is not None
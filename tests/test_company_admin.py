@@ -0,0 +1,18 @@
+"""Company admin blueprint pages, with the N+1 guard on"""
+
+import pytest
+
+PAGES = [
+    '/company-admin/settings',
+    '/company-admin/settings/moderators',
+    '/company-admin/settings/subscription',
+    '/company-admin/join-requests',
+    '/company-admin/moderator-invites',
+    '/company-admin/direct-invites'
+]
+
+
+@pytest.mark.parametrize('page', PAGES)
+def test_page(client, page):
+    response = client.get(page)
+    assert response.status_code == 200
@@ -0,0 +1,56 @@
+"""Confirming imports: one queued or running import per company"""
+
+import io
+import uuid
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import ImportJob
+from app.services.import_jobs import import_job_runner
+from app.services.import_staging import import_staging
+from app.services.sales_seeder import SalesSeeder
+from conftest import login
+
+CSV = b'sale_date,store_name,product_category,product_name,quantity,total\n2024-01-05,Main Street,Rings,Gold Band,1,120.00\n'
+
+
+@pytest.fixture
+def uploads(app):
+    """Two staged uploads of a company of its own, the first already queued as if it was running"""
+    with app.app_context():
+        company = SalesSeeder(seed=2).create_company(f'Import Co {uuid.uuid4().hex[:8]}', stores=1, products=1)
+        company_id, admin_id = company.id, company.admin_id
+        running, waiting = (import_staging.stage(io.BytesIO(CSV), company_id, admin_id) for _ in range(2))
+        # Queued without handing it to the workers, so it stays active
+        assert ImportJob.queue(running.id)
+        yield {'company_id': company_id, 'admin_id': admin_id, 'running': running.id, 'waiting': waiting.id}
+
+        ImportJob.fail(running.id, 'Test finished')
+
+
+def test_database_allows_one_active_import_per_company(uploads):
+    with pytest.raises(IntegrityError):
+        ImportJob.queue(uploads['waiting'])
+    db.session.rollback()
+
+
+def test_enqueue_returns_the_import_already_running(uploads):
+    waiting = db.session.get(ImportJob, uploads['waiting'])
+
+    active = import_job_runner.enqueue(waiting)
+
+    assert active.id == uploads['running']
+    assert db.session.get(ImportJob, uploads['waiting']).status == ImportJob.STAGED
+
+
+def test_confirming_while_another_import_runs_shows_that_import(app, uploads):
+    client = app.test_client()
+    login(client, uploads['admin_id'])
+
+    response = client.post('/sales/import', data={'action': 'import', 'import_id': uploads['waiting']})
+
+    assert response.status_code == 302
+    assert response.location.endswith(f"/sales/import/progress?job_id={uploads['running']}")
+    assert db.session.get(ImportJob, uploads['waiting']).status == ImportJob.STAGED
@@ -0,0 +1,99 @@
+"""Products blueprint pages, with the N+1 guard on"""
+
+import pytest
+
+from app.models import Embellishment, Product, ProductCategory
+from conftest import login
+
+PAGES = [
+    '/products/',
+    '/products/embellishments',
+    '/products/embellishments/new',
+    '/products/categories',
+    '/products/new',
+    '/products/category/new',
+    '/products/select-category',
+    '/products/edit/{product_id}',
+    '/products/embellishments/edit/{embellishment_id}',
+    '/products/category/edit/{category_id}',
+    '/products/category/{category_id}/products',
+    '/products/api/product/{product_id}',
+    '/products/api/product-embellishments/{product_id}',
+    '/products/api/embellishments-for-category?category_id={category_id}'
+]
+
+
+@pytest.fixture(scope='module')
+def ids(app, company):
+    with app.app_context():
+        return {
+            'product_id': Product.query.filter_by(company_id=company['id']).first().id,
+            'embellishment_id': Embellishment.query.filter_by(company_id=company['id']).first().id,
+            'category_id': ProductCategory.query.filter_by(company_id=company['id']).first().id
+        }
+
+
+@pytest.mark.parametrize('page', PAGES)
+def test_page(client, ids, page):
+    response = client.get(page.format(**ids))
+    assert response.status_code == 200
+
+
+def test_embellishments_lists_product_types(client):
+    response = client.get('/products/embellishments')
+    assert b'Embellishment 11' in response.data
+    assert b'Category 11' in response.data
+
+
+def embellishment_usage(client):
+    response = client.get('/analytics/api/data?type=embellishments&format=series&start_date=2000-01-01')
+    assert response.status_code == 200
+    return {row['embellishment']: row['usage_count'] for row in response.get_json()['stats']}
+
+
+def test_renaming_an_embellishment_updates_cached_analytics(app, small_company):
+    client = app.test_client()
+    login(client, small_company['admin_id'])
+    before = embellishment_usage(client)
+    name, uses = max(before.items(), key=lambda item: item[1])
+    embellishment = Embellishment.query.filter_by(company_id=small_company['id'], name=name).one()
+    category_ids = [category.id for category in ProductCategory.query.filter_by(company_id=small_company['id'])]
+
+    response = client.post(f'/products/embellishments/edit/{embellishment.id}', data={
+        'name': f'{name} renamed', 'description': '', 'product_types': category_ids})
+    assert response.status_code == 302
+
+    after = embellishment_usage(client)
+    assert name not in after
+    assert after[f'{name} renamed'] == uses
+
+
+@pytest.mark.parametrize('url', [
+    '/products/api/product/{product_id}',
+    '/products/api/product-embellishments/{product_id}',
+    '/products/api/embellishments-for-category?category_id={category_id}',
+    '/sales/api/products/{category_id}'
+])
+def test_catalog_api_answers_304_until_the_catalog_changes(app, small_company, url):
+    client = app.test_client()
+    login(client, small_company['admin_id'])
+    product = Product.query.filter_by(company_id=small_company['id']).order_by(Product.id).first()
+    url = url.format(product_id=product.id, category_id=product.category_id)
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+    etag = response.headers['ETag']
+
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+    embellishment = Embellishment.query.filter_by(company_id=small_company['id']).order_by(Embellishment.id).first()
+    response = client.post(f'/products/embellishments/edit/{embellishment.id}', data={
+        'name': f'{embellishment.name} {url}', 'description': 'changed', 'product_types': [product.category_id]})
+    assert response.status_code == 302
+
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
@@ -0,0 +1,58 @@
+"""The N+1 query guard fails per-row lookups and lets grouped or eager loads through"""
+
+from itertools import combinations
+
+import pytest
+
+from app import create_app, db
+from app.models import Embellishment
+from app.services.query_guard import NPlusOneError
+from app.services.sales_aggregates import QueryAggregates, SalesAggregates
+
+
+@pytest.fixture(scope='module')
+def guarded_client(app, company):
+    """Client of an app with routes that load the seeded company's embellishments in different ways"""
+    guarded_app = create_app('testing')
+    company_id = company['id']
+
+    def embellishments():
+        return Embellishment.query.filter_by(company_id=company_id).order_by(Embellishment.id)
+
+    @guarded_app.route('/guard/lazy-loop')
+    def lazy_loop():
+        # One SELECT on product_categories per embellishment
+        return str(sum(len(embellishment.product_types) for embellishment in embellishments()))
+
+    @guarded_app.route('/guard/eager')
+    def eager():
+        loaded = embellishments().options(db.selectinload(Embellishment.product_types))
+        return str(sum(len(embellishment.product_types) for embellishment in loaded))
+
+    @guarded_app.route('/guard/repeated')
+    def repeated():
+        return str(sum(embellishments().count() for _ in range(guarded_app.config['QUERY_GUARD_MAX_SELECTS'] + 5)))
+
+    @guarded_app.route('/guard/groupings')
+    def groupings():
+        # A different GROUP BY statement on sales per pair of dimensions
+        aggregates = QueryAggregates(company_id)
+        return str(sum(len(aggregates.group(*pair)) for pair in combinations(SalesAggregates.DIMENSIONS, 2)))
+
+    return guarded_app.test_client()
+
+
+def test_lazy_loads_in_a_loop_fail(guarded_client):
+    with pytest.raises(NPlusOneError, match='product_categories'):
+        guarded_client.get('/guard/lazy-loop')
+
+
+def test_eager_load_passes(guarded_client):
+    response = guarded_client.get('/guard/eager')
+    assert response.status_code == 200
+    assert int(response.data) >= 12 * 12
+
+
+@pytest.mark.parametrize('page', ['/guard/repeated', '/guard/groupings'])
+def test_repeated_query_and_different_statements_pass(guarded_client, page):
+    assert guarded_client.get(page).status_code == 200
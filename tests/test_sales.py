@@ -0,0 +1,67 @@
+"""Sales blueprint pages, with the N+1 guard on"""
+
+import json
+
+import pytest
+
+from app.models import ExportProgress, ProductCategory, Sale
+from app.services.progress_events import progress_events
+from app.services.sales_import_export import SalesImportExportService
+
+PAGES = [
+    '/sales/',
+    '/sales/new',
+    '/sales/view/{sale_id}',
+    '/sales/edit/{sale_id}',
+    '/sales/locations',
+    '/sales/api/products/{category_id}',
+    '/sales/export/form',
+    '/sales/import',
+    '/sales/import/template'
+]
+
+
+@pytest.fixture(scope='module')
+def ids(app, company):
+    with app.app_context():
+        return {
+            'sale_id': Sale.query.filter_by(company_id=company['id']).first().id,
+            'category_id': ProductCategory.query.filter_by(company_id=company['id']).first().id
+        }
+
+
+@pytest.mark.parametrize('page', PAGES)
+def test_page(client, ids, page):
+    response = client.get(page.format(**ids))
+    assert response.status_code == 200
+
+
+def test_export_streams_every_sale(app, client, company):
+    response = client.get('/sales/export')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0] == ','.join(SalesImportExportService.CSV_HEADERS)
+    with app.app_context():
+        assert len(lines) - 1 == Sale.query.filter_by(company_id=company['id']).count()
+
+
+def test_export_progress_reaches_a_worker_that_did_not_serve_the_download(app, client, company):
+    progress_id = 'test-export-progress'
+    response = client.get(f'/sales/export?progress_id={progress_id}')
+    assert response.status_code == 200
+    rows = len(response.get_data(as_text=True).splitlines()) - 1
+
+    # Another worker has none of this process's published states, only the saved row
+    progress_events._entries.pop(f"export:{company['id']}:{progress_id}")
+    with app.app_context():
+        assert ExportProgress.state_for(company['id'], progress_id)['state'] == 'completed'
+
+    response = client.get(f'/sales/export/events?progress_id={progress_id}')
+    assert response.mimetype == 'text/event-stream'
+    messages = [line[len('data: '):] for line in response.get_data(as_text=True).splitlines()
+                if line.startswith('data: ')]
+    state = json.loads(messages[-1])
+    assert state['state'] == 'completed'
+    assert state['processed_rows'] == state['total_rows'] == rows
@@ -0,0 +1,116 @@
+"""COPY import and export round trip; needs TEST_DATABASE_URL set to PostgreSQL"""
+
+import csv
+import io
+import threading
+import uuid
+
+import psycopg2
+import pytest
+from sqlalchemy import func, select, text
+
+from app import db
+from app.models import Company, Sale, User
+from app.services import sales_import_export
+from app.services.sales_import_export import SalesImportExportService
+
+HEADERS = SalesImportExportService.CSV_HEADERS
+
+ROWS = [
+    ['2024-01-05', 'Main Street', 'Rings', 'Gold Band', '1', '120.00', '120.00', '0.00', ''],
+    # The same sale twice: both are imported and both come back
+    ['2024-01-06', 'Main Street', 'Rings', 'Silver Band', '2', '80.50', '0.00', '80.50', 'gift'],
+    ['2024-01-06', 'Main Street', 'Rings', 'Silver Band', '2', '80.50', '0.00', '80.50', 'gift'],
+    ['2024-02-10', 'Mall Kiosk', 'Necklaces', 'Pearl "Classic"', '3', '45.00', '20.00', '25.00',
+     'engraved, "to M"\nsecond line'],
+    ['2024-03-01', 'Mall Kiosk', 'Necklaces', 'Chaîne', '1', '9.99', '9.99', '0.00', '\\N is not null'],
+]
+
+
+def to_csv(rows):
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(HEADERS)
+    writer.writerows(rows)
+    return output.getvalue()
+
+
+def import_rows(company_id, user_id, rows):
+    service = SalesImportExportService(company_id)
+    return service.import_sales_from_file(io.StringIO(to_csv(rows)), user_id)
+
+
+def company_sales(company_id):
+    return db.session.execute(select(func.count(Sale.id)).where(Sale.company_id == company_id)).scalar()
+
+
+def staged_rows():
+    """Rows left in this connection's staging table (0 when it does not exist)"""
+    if db.session.execute(text("SELECT to_regclass('pg_temp.sales_import_staging')")).scalar() is None:
+        return 0
+    return db.session.execute(text("SELECT count(*) FROM sales_import_staging")).scalar()
+
+
+@pytest.fixture
+def empty_company(app):
+    """A company with no stores, products or sales, and its admin's id"""
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            pytest.skip('COPY paths need TEST_DATABASE_URL to point at PostgreSQL')
+
+        slug = f'copy-co-{uuid.uuid4().hex[:8]}'
+        admin = User(email=f'{slug}@example.com', username=slug, role_website='subscriber')
+        admin.password = 'copy-password'
+        db.session.add(admin)
+        db.session.flush()
+        company = Company(admin_id=admin.id, company_name=slug, company_email=f'{slug}@example.com')
+        db.session.add(company)
+        db.session.flush()
+        admin.company_id, admin.role_company = company.id, 'admin'
+        db.session.commit()
+        yield company.id, admin.id
+
+
+def test_import_then_export_round_trips(empty_company):
+    company_id, user_id = empty_company
+
+    assert import_rows(company_id, user_id, ROWS) == (len(ROWS), 0, [])
+    assert company_sales(company_id) == len(ROWS)
+
+    exported = ''.join(SalesImportExportService(company_id).iter_sales_csv())
+    reader = csv.reader(io.StringIO(exported))
+    assert next(reader) == HEADERS
+    assert sorted(reader) == sorted(ROWS)
+
+
+def test_export_stops_its_copy_thread_when_the_client_goes_away(empty_company, monkeypatch):
+    company_id, user_id = empty_company
+    import_rows(company_id, user_id, ROWS * 50)
+    # Tiny chunks, so the COPY thread fills the queue and blocks before finishing
+    monkeypatch.setattr(sales_import_export, 'COPY_CHUNK_BYTES', 64)
+
+    chunks = SalesImportExportService(company_id).iter_sales_csv()
+    assert next(chunks).startswith(','.join(HEADERS))
+    chunks.close()
+
+    assert not [thread for thread in threading.enumerate() if thread.name == 'sales-export-copy']
+
+
+def test_failed_copy_batch_leaves_nothing_staged(empty_company, monkeypatch):
+    company_id, user_id = empty_company
+    monkeypatch.setattr(sales_import_export, 'IMPORT_BATCH_SIZE', 2)
+    # The second batch's last row overflows the INTEGER quantity column inside COPY
+    overflow = ['2024-04-01', 'Main Street', 'Rings', 'Gold Band', str(2 ** 40), '1.00', '1.00', '0.00', '']
+
+    with pytest.raises(psycopg2.DataError):
+        import_rows(company_id, user_id, ROWS[:3] + [overflow])
+    db.session.rollback()
+
+    # The first batch was committed; nothing of the failed one was kept or left staged
+    assert company_sales(company_id) == 2
+    assert staged_rows() == 0
+
+    # The next import on the same session only inserts its own rows
+    assert import_rows(company_id, user_id, ROWS[3:]) == (2, 0, [])
+    assert company_sales(company_id) == 4
+    assert staged_rows() == 0
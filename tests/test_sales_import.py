@@ -0,0 +1,67 @@
+"""CSV imports on the test database: good rows reach sales and the rollup, bad rows are reported"""
+
+import uuid
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app import db
+from app.models import Product, Sale, Store
+from app.models.sales_rollup import SalesDailyRollup
+from app.services import sales_import_export
+from app.services.sales_import_export import SalesImportExportService
+from app.services.sales_seeder import SalesSeeder
+from test_sales_rollup import assert_rollup_matches_sales
+
+CSV = '\n'.join([
+    'sale_date,store_name,product_category,product_name,quantity,total,card_amount,cash_amount,notes',
+    '2024-01-05,Main Street,Rings,Gold Band,1,120.00,120.00,0.00,',
+    '05/01/2024,Main Street,Rings,Gold Band,1,120.00,120.00,0.00,',
+    '2024-01-05,Harbour Road,Rings,Gold Band,2,80.50,0.00,80.50,gift',
+    '2024-01-06,Harbour Road,Necklaces,Pearl Drop,1,45.00,20.00,25.00,',
+    '2024-02-30,Harbour Road,Necklaces,Pearl Drop,1,45.00,20.00,25.00,',
+    '2024-02-01,,,,,,10.00,5.00,',
+]) + '\n'
+
+
+@pytest.fixture
+def company(app):
+    """A company of its own with no sales"""
+    with app.app_context():
+        company = SalesSeeder(seed=4).create_company(f'Import Co {uuid.uuid4().hex[:8]}', stores=1, products=1)
+        yield company.id, company.admin_id
+
+
+def test_import_inserts_good_rows_and_reports_bad_ones(company, monkeypatch):
+    company_id, user_id = company
+    # Three batches, the failing rows in the first two
+    monkeypatch.setattr(sales_import_export, 'IMPORT_BATCH_SIZE', 2)
+    progress = []
+
+    result = SalesImportExportService(company_id).import_sales_with_progress(
+        CSV, user_id, lambda percent, status, detail, **counts: progress.append((percent, counts)))
+
+    successful, failed, errors = result
+    assert (successful, failed) == (4, 2)
+    assert [error.split(':')[0] for error in errors] == ['Row 3', 'Row 6']
+    assert 'Invalid date format' in errors[0]
+    assert progress[-1] == (100, {'processed': 6, 'successful': 4, 'failed': 2, 'total': 6})
+    assert [counts['processed'] for _, counts in progress] == [2, 4, 6]
+
+    sales = Sale.query.filter_by(company_id=company_id).order_by(Sale.sale_date, Sale.id).all()
+    assert [(sale.sale_date, sale.store_name, sale.product_name, sale.total) for sale in sales] == [
+        (date(2024, 1, 5), 'Main Street', 'Gold Band', Decimal('120.00')),
+        (date(2024, 1, 5), 'Harbour Road', 'Gold Band', Decimal('80.50')),
+        (date(2024, 1, 6), 'Harbour Road', 'Pearl Drop', Decimal('45.00')),
+        (date(2024, 2, 1), 'Default Store', 'Unknown Product', Decimal('15.00')),
+    ]
+    # Stores and products are created once and every sale points at them
+    stores = {store.name: store.id for store in Store.query.filter_by(company_id=company_id)}
+    products = {product.name: product.id for product in Product.query.filter_by(company_id=company_id)}
+    assert [(sale.store_id, sale.product_id) for sale in sales] == [
+        (stores[sale.store_name], products[sale.product_name]) for sale in sales]
+    assert {'Main Street', 'Harbour Road', 'Default Store'} <= set(stores)
+
+    assert db.session.query(db.func.sum(SalesDailyRollup.sale_count)).filter_by(company_id=company_id).scalar() == 4
+    assert_rollup_matches_sales(company_id)
@@ -0,0 +1,79 @@
+"""The daily rollup stays equal to a GROUP BY over sales as sales are added, edited and deleted"""
+
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from app import db
+from app.models import Product, Sale, Store
+from app.models.sales_rollup import SalesDailyRollup
+from app.services.sales_aggregates import QueryAggregates, RollupAggregates
+from app.services.sales_rollup import SalesRollupService
+from conftest import login
+
+GROUPINGS = [
+    (),
+    ('sale_date', 'store_name', 'product_category', 'product_name', 'payment_method'),
+    ('store_name',),
+    ('year_month',),
+]
+
+MOVED_TO = date(1999, 1, 1)
+
+
+def assert_rollup_matches_sales(company_id):
+    for dimensions in GROUPINGS:
+        expected = QueryAggregates(company_id).group(*dimensions)
+        actual = RollupAggregates(company_id).group(*dimensions)
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+    assert not SalesDailyRollup.query.filter(SalesDailyRollup.company_id == company_id,
+                                             SalesDailyRollup.sale_count <= 0).count()
+
+
+@pytest.fixture
+def admin_client(app, small_company):
+    client = app.test_client()
+    login(client, small_company['admin_id'])
+    return client
+
+
+def test_rollup_follows_sale_writes(admin_client, small_company):
+    company_id = small_company['id']
+    stores = Store.query.filter_by(company_id=company_id).order_by(Store.id).all()
+    product = Product.query.filter_by(company_id=company_id).order_by(Product.id).first()
+    assert_rollup_matches_sales(company_id)
+
+    # Create
+    response = admin_client.post('/sales/new', data={
+        'store_id': stores[0].id, 'product_id': product.id, 'quantity': 2,
+        'total_price': '50.00', 'cash_amount': '50.00', 'card_amount': '0.00'})
+    assert response.status_code == 302
+    sale_id = db.session.query(db.func.max(Sale.id)).filter_by(company_id=company_id).scalar()
+    assert_rollup_matches_sales(company_id)
+
+    # Edit: another store, quantity and payment method
+    response = admin_client.post(f'/sales/edit/{sale_id}', data={
+        'store_id': stores[1].id, 'product_id': product.id, 'quantity': 3,
+        'total_price': '75.00', 'cash_amount': '0.00', 'card_amount': '75.00'})
+    assert response.status_code == 302
+    db.session.expire_all()
+    assert db.session.get(Sale, sale_id).store_name == stores[1].name
+    assert_rollup_matches_sales(company_id)
+
+    # Move to a day no other sale is on, the way the routes change a sale
+    sale = db.session.get(Sale, sale_id)
+    SalesRollupService.remove_sale(sale)
+    sale.sale_date = MOVED_TO
+    SalesRollupService.add_sale(sale)
+    db.session.commit()
+    assert SalesDailyRollup.query.filter_by(company_id=company_id, sale_date=MOVED_TO).one().sale_count == 1
+    assert_rollup_matches_sales(company_id)
+
+    # Delete: the moved sale's rollup row goes with it
+    response = admin_client.post(f'/sales/delete/{sale_id}')
+    assert response.status_code == 302
+    db.session.expire_all()
+    assert db.session.get(Sale, sale_id) is None
+    assert not SalesDailyRollup.query.filter_by(company_id=company_id, sale_date=MOVED_TO).count()
+    assert_rollup_matches_sales(company_id)
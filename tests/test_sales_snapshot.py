@@ -0,0 +1,151 @@
+"""SalesSnapshot refreshes: only real changes write a new generation, as a segment unless it is time to compact"""
+
+import os
+import uuid
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from app import db
+from app.models import Embellishment, ProductCategory, Sale
+from app.models.sale_tombstone import SaleTombstone
+from app.services import sales_snapshot
+from app.services.sales_frame import SalesFrameLoader
+from app.services.sales_seeder import SalesSeeder
+from app.services.sales_snapshot import SalesSnapshot
+from conftest import login
+
+
+def comparable(df):
+    df = df.sort_values('sale_id').reset_index(drop=True)
+    df['embellishments'] = df['embellishments'].map(sorted)
+    for column in ('store_name', 'product_category', 'product_name'):
+        df[column] = df[column].astype(str)
+    return df
+
+
+def assert_matches_table(snapshot):
+    pd.testing.assert_frame_equal(comparable(snapshot.load()),
+                                  comparable(SalesFrameLoader(snapshot.company_id).load()), check_dtype=False)
+
+
+@pytest.fixture
+def snapshot(app, tmp_path):
+    """Snapshot of a small company of its own, so its sales can be changed freely"""
+    with app.app_context():
+        seeder = SalesSeeder(seed=1)
+        company = seeder.create_company(f'Snapshot Co {uuid.uuid4().hex[:8]}', stores=3, products=3)
+        seeder.seed_sales(company.id, 50)
+        snapshot = SalesSnapshot(company.id, str(tmp_path))
+        snapshot.admin_id = company.admin_id
+        yield snapshot
+
+
+def test_loads_without_changes_keep_the_generation(snapshot):
+    assert len(snapshot.load()) == 50
+    generation = snapshot.refresh()['generation']
+
+    for _ in range(3):
+        assert len(snapshot.load()) == 50
+        assert snapshot.refresh()['generation'] == generation
+
+
+def test_changed_and_deleted_sales_write_a_new_generation(snapshot):
+    generation = snapshot.refresh()['generation']
+    sales = Sale.query.filter_by(company_id=snapshot.company_id).order_by(Sale.id).limit(2).all()
+    changed_id, deleted_id = sales[0].id, sales[1].id
+
+    sales[0].quantity += 7
+    db.session.commit()
+    df = snapshot.load()
+    assert snapshot.refresh()['generation'] != generation
+    assert df.loc[df['sale_id'] == changed_id, 'quantity'].item() == sales[0].quantity
+
+    generation = snapshot.refresh()['generation']
+    SaleTombstone.record(sales[1])
+    db.session.delete(sales[1])
+    db.session.commit()
+    df = snapshot.load()
+    assert snapshot.refresh()['generation'] != generation
+    assert deleted_id not in set(df['sale_id']) and len(df) == 49
+
+
+def test_changes_append_segments_until_compacted(snapshot, monkeypatch):
+    base = snapshot.refresh()['parts'][0]
+    base_file = os.path.join(snapshot.directory, base['directory'], 'sale_id.npy')
+    written = os.stat(base_file).st_mtime_ns
+    sales = Sale.query.filter_by(company_id=snapshot.company_id).order_by(Sale.id).limit(3).all()
+
+    for sale in sales[:2]:
+        sale.quantity += 1
+        db.session.commit()
+        assert_matches_table(snapshot)
+    SaleTombstone.record(sales[2])
+    db.session.delete(sales[2])
+    db.session.commit()
+    assert_matches_table(snapshot)
+
+    meta = snapshot.refresh()
+    assert meta['parts'][0] == base and len(meta['parts']) == 4 and meta['rows'] == 49
+    assert os.stat(base_file).st_mtime_ns == written
+
+    monkeypatch.setattr(sales_snapshot, 'SEGMENT_COMPACT_FRACTION', 0)
+    sales[0].quantity += 1
+    db.session.commit()
+    assert_matches_table(snapshot)
+    meta = snapshot.refresh()
+    assert len(meta['parts']) == 1 and meta['parts'][0] != base
+    assert sorted(os.listdir(snapshot.directory)) == sorted([meta['generation'], 'current.json'])
+
+
+def test_snapshot_follows_an_embellishment_rename(app, snapshot):
+    names = set(snapshot.load()['embellishments'].explode().dropna())
+    embellishment = Embellishment.query.filter_by(company_id=snapshot.company_id).filter(
+        Embellishment.name.in_(names)).first()
+    name = embellishment.name
+    category_ids = [category.id for category in ProductCategory.query.filter_by(company_id=snapshot.company_id)]
+    client = app.test_client()
+    login(client, snapshot.admin_id)
+
+    response = client.post(f'/products/embellishments/edit/{embellishment.id}', data={
+        'name': f'{name} renamed', 'description': '', 'product_types': category_ids})
+    assert response.status_code == 302
+
+    names = set(snapshot.load()['embellishments'].explode().dropna())
+    assert name not in names and f'{name} renamed' in names
+    assert_matches_table(snapshot)
+
+
+def test_row_count_is_checked_once_per_interval(snapshot, monkeypatch):
+    snapshot.refresh()
+    counts = []
+    count_sales = snapshot._count_sales
+    monkeypatch.setattr(snapshot, '_count_sales', lambda: counts.append(None) or count_sales())
+
+    for _ in range(3):
+        snapshot.load()
+    assert counts == []
+
+    # A delete that left no tombstone is caught by the next check
+    sale = Sale.query.filter_by(company_id=snapshot.company_id).first()
+    db.session.delete(sale)
+    db.session.commit()
+    meta = snapshot.refresh()
+    meta['verified_at'] = (datetime.utcnow() - sales_snapshot.VERIFY_INTERVAL * 2).isoformat()
+    snapshot._write_meta(meta)
+
+    assert len(snapshot.load()) == 49
+    assert counts == [None]
+    assert_matches_table(snapshot)
+
+
+def test_refresh_snapshots_command(app, snapshot, monkeypatch):
+    monkeypatch.setitem(app.config, 'ANALYTICS_SNAPSHOT_DIR', os.path.dirname(snapshot.directory))
+    monkeypatch.setitem(app.config, 'ANALYTICS_SNAPSHOT_MIN_ROWS', 10)
+
+    result = app.test_cli_runner().invoke(args=['refresh-snapshots', '--company-id', str(snapshot.company_id)])
+
+    assert result.exit_code == 0
+    assert f'Company {snapshot.company_id}: 50 sales in 1 parts' in result.output
+    assert snapshot.refresh()['rows'] == 50
@@ -0,0 +1,62 @@
+"""Weekly and quarterly series across a year boundary, and the average ticket metric"""
+
+import uuid
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app import db
+from app.models import Sale
+from app.services.sales_rollup import SalesRollupService
+from app.services.sales_seeder import SalesSeeder
+from app.services.sales_timeseries import SalesTimeSeries
+
+# (sale date, total): a Wednesday and a Sunday of the last week of 2023, two sales
+# on Monday 1 January 2024, then the Sunday and Monday either side of Q1's end
+SALES = [
+    (date(2023, 12, 27), '10.00'),
+    (date(2023, 12, 31), '20.00'),
+    (date(2024, 1, 1), '40.00'),
+    (date(2024, 1, 1), '60.00'),
+    (date(2024, 3, 31), '80.00'),
+    (date(2024, 4, 1), '160.00'),
+]
+
+
+@pytest.fixture
+def company_id(app):
+    """A company with only the SALES above"""
+    with app.app_context():
+        company = SalesSeeder(seed=3).create_company(f'Series Co {uuid.uuid4().hex[:8]}', stores=1, products=1)
+        sales = [Sale(company_id=company.id, user_id=company.admin_id, sale_date=sale_date,
+                      store_name='Main Street', product_category='Rings', product_name='Gold Band',
+                      quantity=1, total=Decimal(total), cash_amount=Decimal(total), card_amount=0)
+                 for sale_date, total in SALES]
+        db.session.add_all(sales)
+        SalesRollupService.add_sales(sales)
+        db.session.commit()
+        yield company.id
+
+
+@pytest.mark.parametrize('granularity, metric, labels, values', [
+    ('week', 'revenue', ['2023-12-25', '2024-01-01', '2024-03-25', '2024-04-01'], [30.0, 100.0, 80.0, 160.0]),
+    ('week', 'transactions', ['2023-12-25', '2024-01-01', '2024-03-25', '2024-04-01'], [2, 2, 1, 1]),
+    ('week', 'average_ticket', ['2023-12-25', '2024-01-01', '2024-03-25', '2024-04-01'], [15.0, 50.0, 80.0, 160.0]),
+    ('quarter', 'revenue', ['2023-Q4', '2024-Q1', '2024-Q2'], [30.0, 180.0, 160.0]),
+    ('quarter', 'average_ticket', ['2023-Q4', '2024-Q1', '2024-Q2'], [15.0, 60.0, 160.0]),
+    ('year', 'quantity', ['2023', '2024'], [2, 4]),
+])
+def test_series_buckets(company_id, granularity, metric, labels, values):
+    series = SalesTimeSeries(company_id).compute(granularity, metric)
+
+    assert series['labels'] == labels
+    assert series['values'] == values
+
+
+def test_filters_narrow_the_series(company_id):
+    series = SalesTimeSeries(company_id, start_date=date(2024, 1, 1), end_date=date(2024, 3, 31)).compute(
+        'quarter', 'average_ticket')
+
+    assert series['labels'] == ['2024-Q1']
+    assert series['values'] == [60.0]
@@ -0,0 +1,48 @@
+"""Booting the app leaves the scientific stack unloaded and stays within budget"""
+
+import json
+import os
+import subprocess
+import sys
+
+HEAVY_MODULES = ('pandas', 'numpy', 'matplotlib', 'seaborn')
+
+# About twice what create_app('testing') measures on SQLite (1.2-1.3s, 80MB);
+# with pandas and matplotlib loaded at import it took 2-2.5s and 150MB
+BOOT_SECONDS_BUDGET = 2.5
+BOOT_RSS_MB_BUDGET = 120
+
+# Linux only: RSS is read from /proc
+BOOT_SCRIPT = f"""
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+create_app('testing')
+# Resident set now, once booted; ru_maxrss would include the forking pytest process
+with open('/proc/self/status') as status:
+    rss_kb = next(int(line.split()[1]) for line in status if line.startswith('VmRSS:'))
+print(json.dumps({{
+    'seconds': time.perf_counter() - started,
+    'rss_mb': rss_kb / 1024,
+    'loaded': [name for name in {HEAVY_MODULES!r} if name in sys.modules]
+}}))
+"""
+
+
+def boot():
+    """Create the app in a fresh interpreter and return what it measured"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-c', BOOT_SCRIPT], cwd=root, env=os.environ.copy(),
+                            capture_output=True, text=True, timeout=60, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_create_app_does_not_import_the_scientific_stack():
+    assert boot()['loaded'] == []
+
+
+def test_create_app_stays_within_budget():
+    # Best of three, so one slow run on a busy machine does not fail the suite
+    runs = [boot() for _ in range(3)]
+    assert min(run['seconds'] for run in runs) < BOOT_SECONDS_BUDGET
+    assert min(run['rss_mb'] for run in runs) < BOOT_RSS_MB_BUDGET
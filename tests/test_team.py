@@ -0,0 +1,28 @@
+"""Team blueprint pages, with the N+1 guard on"""
+
+import pytest
+
+from app.models import User
+
+PAGES = [
+    '/team/',
+    '/team/member/{member_id}',
+    '/team/member/{member_id}/edit-permissions'
+]
+
+
+@pytest.fixture(scope='module')
+def member_id(app, company):
+    with app.app_context():
+        return User.query.filter(User.company_id == company['id'], User.id != company['admin_id']).first().id
+
+
+@pytest.mark.parametrize('page', PAGES)
+def test_page(client, member_id, page):
+    response = client.get(page.format(member_id=member_id))
+    assert response.status_code == 200
+
+
+def test_index_lists_every_member(client):
+    response = client.get('/team/')
+    assert response.data.count(b'@example.com') >= 12